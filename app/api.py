@@ -0,0 +1,460 @@
+# -*- coding: utf-8 -*-
+"""API FastAPI (`uvicorn app.main:api`): endpoints síncronos, asíncronos (/async), trabajos y métricas.
+
+Vive separada de la CLI (`app/main.py`) para que `python -m app.main --letter ...` no cargue
+FastAPI ni sus dependencias; `app.main` la reexporta como `api` al pedirla.
+"""
+# Importaciones necesarias de librerías y módulos locales.
+from fastapi import APIRouter, FastAPI, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel
+from typing import List, Literal, Optional
+from contextlib import asynccontextmanager
+import logging
+import os
+
+# Importaciones de nuestros propios módulos de la aplicación.
+from app.llm_extractor import extract_with_deadline, extract_with_deadline_async, extract_with_llm, extract_with_llm_async
+from app.rules import decide, evaluate
+from app.registry import registry, get_rules
+from app.schema import Decision, ScreeningDecision, ApplicationExtract, BatchItem, BatchRequest, BatchResponse, ExplainRequest, ExplainResponse, JobRequest, JobResults, JobStatus, RescoreRequest, RescoreResponse, SimulationRequest, SimulationResponse
+from app.batch import (BatchRecord, iter_batch_records, iter_batch_records_async, iter_batch_rows, iter_batch_rows_async,
+                       record_batch_row)
+from app.explain import explain_decision, explanation_cache_info, prime_explanations
+from app.cache import get_cache
+from app.features import get_feature_store, letter_hash
+from app.guards import guards_status
+from app import metrics, providers
+from app.jobs import get_jobs
+
+# --- Configuración de Logging ---
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# --- Ciclo de Vida: Precarga y Recarga en Caliente de Reglas, Trabajos y Clientes ---
+def preload_rules():
+    """Precarga los rulesets (RULES_PRELOAD, separados por coma) y arranca el vigilante de archivos."""
+    paths = [p.strip() for p in os.getenv("RULES_PRELOAD", "business_rules.yaml").split(",") if p.strip()]
+    registry.preload(paths)
+    # Las explicaciones dependen solo de las reglas fallidas: se arman todas las combinaciones de una vez.
+    for path in paths:
+        try:
+            prime_explanations(registry.get(path))
+        except Exception as e:
+            logger.warning(f"[API] No se pudieron precalcular las explicaciones de '{path}': {e}")
+    interval = float(os.getenv("RULES_WATCH_INTERVAL", "2.0"))
+    if interval > 0:
+        registry.start_watching(interval)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Al arrancar: precarga las reglas y arranca los workers de /jobs (que retoman los trabajos pendientes).
+    Al apagar: detiene el vigilante de reglas y los workers, y cierra los pools de conexiones de los clientes LLM.
+    """
+    preload_rules()
+    get_jobs().start()
+    try:
+        yield
+    finally:
+        registry.stop_watching()
+        get_jobs().stop()
+        await providers.aclose_clients()
+
+# --- Inicialización de la API FastAPI ---
+api = FastAPI( 
+    title="Credit Approval API", 
+    description="API para procesar cartas de crédito con LLM y reglas YAML. Incluye un fallback a regex.", 
+    version="1.0.0",
+    lifespan=lifespan,
+)
+# Solicitudes en curso y latencia por ruta (ver GET /metrics).
+api.add_middleware(metrics.MetricsMiddleware)
+
+# --- Modelos de Datos para la API ---
+class DecisionRequest(BaseModel): 
+    letter: str 
+    rules_path: str = "business_rules.yaml"
+    cache_mode: Literal["use", "refresh", "bypass"] = "use" # "bypass" ignora la caché, "refresh" la reemplaza.
+    deadline_ms: Optional[int] = None # Plazo de /decision; por defecto DECISION_DEADLINE_MS (0 = sin plazo).
+
+def _deadline(req: DecisionRequest) -> Optional[float]:
+    """Plazo de la solicitud en segundos, o None si espera al LLM sin límite."""
+    deadline_ms = req.deadline_ms if req.deadline_ms is not None else int(os.getenv("DECISION_DEADLINE_MS", "0"))
+    return deadline_ms / 1000 if deadline_ms > 0 else None
+
+_SERIALIZATION_SECONDS = metrics.STAGE_SECONDS.labels(stage="serialization")
+
+def _json_response(model: BaseModel) -> Response:
+    """Serializa el modelo (ya validado) directamente, midiendo la etapa de serialización.
+
+    FastAPI volvería a validar todo el modelo contra `response_model` antes de serializarlo;
+    el `response_model` de cada endpoint queda para la documentación.
+    """
+    with _SERIALIZATION_SECONDS.time():
+        return Response(content=model.model_dump_json(), media_type="application/json")
+
+# --- Endpoints de la API ---
+@api.post("/extract", response_model=ApplicationExtract)
+def extract(req: DecisionRequest):
+    """Extrae variables estructuradas de la carta usando LLM o fallback"""
+    logger.info(f"[API] Recibida solicitud /extract para carta (longitud: {len(req.letter)}).")
+    try: 
+        return _json_response(extract_with_llm(req.letter, cache_mode=req.cache_mode))
+    except Exception as e: 
+        logger.error(f"[API] Error en /extract: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api.post("/decision", response_model=Decision)
+def decision(req: DecisionRequest):
+    """Evalúa reglas de negocio y devuelve decisión Aprobado/Rechazado"""
+    logger.info(f"[API] Recibida solicitud /decision para carta (longitud: {len(req.letter)}).")
+    try: 
+        budget, fallback = _deadline(req), False
+        if budget is None:
+            ex = extract_with_llm(req.letter, cache_mode=req.cache_mode) 
+        else:
+            ex, fallback = extract_with_deadline(req.letter, budget, cache_mode=req.cache_mode)
+        cfg = get_rules(req.rules_path) 
+        dec = evaluate(ex, cfg) 
+        dec.fallback = fallback
+        return _json_response(_store_decision(dec, cfg, req.rules_path))
+    except Exception as e: 
+        logger.error(f"[API] Error en /decision: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _store_decision(dec: Decision, plan, rules_path: str) -> Decision:
+    """Con FEATURE_STORE=1 guarda la extracción (id = hash de la carta) y lo devuelve en `decision_id`."""
+    store = get_feature_store()
+    if store is not None:
+        dec.decision_id = letter_hash(dec.extracted.raw_letter)
+        store.save([(dec.decision_id, dec.extracted, dec.approved, dec.risk_score, dec.rationale)], plan, rules_path)
+    return dec
+
+_DETAIL_QUERY = Query(False, description="True: incluye `rule_results` completos (evalúa todas las reglas).")
+
+def _screening_response(ex: ApplicationExtract, rules_path: str, detail: bool) -> Response:
+    """Decide en modo rápido (`rules.decide`) y arma la `ScreeningDecision`."""
+    result = decide(ex, get_rules(rules_path))
+    return _json_response(ScreeningDecision(approved=result.approved, decisive_rule=result.decisive_rule,
+                                            ruleset_version=result.ruleset_version,
+                                            rule_results=result.rule_results if detail else None))
+
+@api.post("/decision/fast", response_model=ScreeningDecision)
+def decision_fast(req: DecisionRequest, detail: bool = _DETAIL_QUERY):
+    """Pre-screening: solo el veredicto, con las reglas en el orden de menor costo esperado y cortando en la primera decisiva."""
+    logger.info(f"[API] Recibida solicitud /decision/fast para carta (longitud: {len(req.letter)}).")
+    try:
+        return _screening_response(extract_with_llm(req.letter, cache_mode=req.cache_mode), req.rules_path, detail)
+    except Exception as e:
+        logger.error(f"[API] Error en /decision/fast: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _prepare_batch(req: BatchRequest, endpoint: str):
+    """Valida el lote y devuelve (cartas, concurrencia) para `evaluate_batch`."""
+    logger.info(f"[API] Recibida solicitud {endpoint} con {len(req.items)} ítems.")
+    if not req.items:
+        logger.warning(f"[API] Solicitud {endpoint} con 0 ítems.")
+        raise HTTPException(status_code=400, detail="La lista de ítems no puede estar vacía.")
+    
+    if len(req.items) > 100:
+        logger.warning(f"[API] Solicitud {endpoint} excede el límite de 100 ítems ({len(req.items)}).")
+        raise HTTPException(status_code=400, detail="El número máximo de ítems por lote es 100; para lotes más grandes use POST /jobs.")
+
+    metrics.BATCH_SIZE.observe(len(req.items), endpoint=endpoint)
+
+    # Convertir la lista de BatchItem a un formato que evaluate_batch pueda usar
+    letters_for_batch = [{'id': item.id, 'letter': item.letter} for item in req.items]
+    
+    return letters_for_batch, _batch_concurrency(req.concurrency)
+
+def _batch_concurrency(requested: Optional[int]) -> int:
+    """Concurrencia de extracción: la pedida por el cliente, acotada por BATCH_MAX_CONCURRENCY."""
+    concurrency = requested or int(os.getenv("BATCH_CONCURRENCY", "1"))
+    return min(concurrency, int(os.getenv("BATCH_MAX_CONCURRENCY", "16")))
+
+def _batch_response(records: List[BatchRecord]) -> Response:
+    """Serializa los registros del lote como `BatchResponse` (filas armadas desde los `Decision`)."""
+    return _json_response(BatchResponse(rows=[record_batch_row(record) for record in records]))
+
+def _ndjson_line(row: BaseModel) -> str:
+    with _SERIALIZATION_SECONDS.time():
+        return row.model_dump_json() + "\n"
+
+@api.post("/batch_decision", response_model=BatchResponse)
+def batch_decision(req: BatchRequest):
+    """Procesa un lote de cartas y devuelve los resultados en formato estructurado."""
+    letters_for_batch, concurrency = _prepare_batch(req, "/batch_decision")
+    try:
+        records = list(iter_batch_records(letters_for_batch, req.rules_path, concurrency=concurrency,
+                                          timeout=req.timeout_s, cache_mode=req.cache_mode))
+        logger.info(f"[API] Procesado /batch_decision: {len(records)} ítems.")
+        return _batch_response(records)
+    except Exception as e:
+        logger.error(f"[API] Error en /batch_decision: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _ndjson_stream(req: BatchRequest, endpoint: str, rows_fn, ordered: bool) -> StreamingResponse:
+    """Arma la respuesta NDJSON (una `BatchRow` por línea) de los endpoints de streaming."""
+    letters_for_batch, concurrency = _prepare_batch(req, endpoint)
+    try:
+        # Se valida el ruleset antes de empezar: una vez enviado el 200 ya no se puede reportar el error.
+        get_rules(req.rules_path)
+    except Exception as e:
+        logger.error(f"[API] Error en {endpoint}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    rows = rows_fn(letters_for_batch, req.rules_path, concurrency=concurrency, timeout=req.timeout_s,
+                   cache_mode=req.cache_mode, ordered=ordered)
+    if hasattr(rows, "__aiter__"):
+        async def lines():
+            async for row in rows:
+                yield _ndjson_line(row)
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+    return StreamingResponse((_ndjson_line(row) for row in rows), media_type="application/x-ndjson")
+
+@api.post("/batch_decision/stream")
+def batch_decision_stream(req: BatchRequest, ordered: bool = Query(True, description="False: cada fila se emite apenas termina su carta, identificada por `id`.")):
+    """Igual que /batch_decision, pero emite cada `BatchRow` como una línea NDJSON apenas se decide."""
+    return _ndjson_stream(req, "/batch_decision/stream", iter_batch_rows, ordered)
+
+def _explain_source(req: ExplainRequest, endpoint: str) -> str:
+    """Valida que la solicitud traiga exactamente uno de `letter`, `decision` o `decision_id` y lo devuelve."""
+    given = [name for name in ("letter", "decision", "decision_id") if getattr(req, name) is not None]
+    if len(given) != 1:
+        raise HTTPException(status_code=400, detail="Indique exactamente uno de: letter, decision, decision_id.")
+    source = given[0]
+    if source == "decision_id" and get_feature_store() is None:
+        raise HTTPException(status_code=400, detail="El almacén de extracciones está desactivado (FEATURE_STORE=1 para activarlo).")
+    logger.info(f"[API] Recibida solicitud {endpoint} ({source}), proveedor: {req.provider}.")
+    return source
+
+def _stored_decision(req: ExplainRequest) -> Decision:
+    """La decisión de la extracción guardada `decision_id`, reevaluada sin extraer (404 si no existe)."""
+    extracted_data = get_feature_store().get(req.decision_id)
+    if extracted_data is None:
+        raise HTTPException(status_code=404, detail=f"No existe la decisión '{req.decision_id}'.")
+    decision_obj = evaluate(extracted_data, get_rules(req.rules_path))
+    decision_obj.decision_id = req.decision_id
+    return decision_obj
+
+@api.post("/explain", response_model=ExplainResponse)
+def explain(req: ExplainRequest):
+    """Genera una explicación en lenguaje natural de la decisión de crédito."""
+    source = _explain_source(req, "/explain")
+    try:
+        decision_obj = req.decision if source == "decision" else None
+        if source == "decision_id":
+            decision_obj = _stored_decision(req)
+        elif decision_obj is None:
+            # Primero, obtener la decisión completa
+            extracted_data = extract_with_llm(req.letter, cache_mode=req.cache_mode)
+            rules_config = get_rules(req.rules_path)
+            decision_obj = evaluate(extracted_data, rules_config)
+        
+        # Luego, generar la explicación
+        explanation_text = explain_decision(decision_obj, req.provider)
+        
+        logger.info(f"[API] Explicación generada para decisión: {decision_obj.approved}.")
+        return _json_response(ExplainResponse(decision=decision_obj, explanation=explanation_text))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"[API] Error en /explain: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# --- Trabajos en Segundo Plano ---
+@api.post("/jobs", response_model=JobStatus, status_code=202)
+def create_job(req: JobRequest):
+    """Encola un lote de cualquier tamaño (ítems o un CSV local del servidor) y devuelve el trabajo creado."""
+    items = [{'id': item.id, 'letter': item.letter} for item in req.items] if req.items is not None else None
+    logger.info(f"[API] Recibida solicitud /jobs ({len(items) if items is not None else req.csv_path}).")
+    if items is not None:
+        metrics.BATCH_SIZE.observe(len(items), endpoint="/jobs")
+    try:
+        job_id = get_jobs().submit(items=items, csv_path=req.csv_path, rules_path=req.rules_path,
+                                   concurrency=_batch_concurrency(req.concurrency), timeout=req.timeout_s,
+                                   cache_mode=req.cache_mode)
+    except (ValueError, OSError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return get_jobs().status(job_id)
+
+@api.get("/jobs/{job_id}", response_model=JobStatus)
+def job_status(job_id: str):
+    """Estado y progreso (filas procesadas / total) de un trabajo."""
+    status = get_jobs().status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"No existe el trabajo '{job_id}'.")
+    return status
+
+@api.get("/jobs/{job_id}/results", response_model=JobResults)
+def job_results(job_id: str, offset: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000)):
+    """Página de resultados ya procesados (disponible mientras el trabajo avanza)."""
+    status = job_status(job_id)
+    rows = get_jobs().results(job_id, offset=offset, limit=limit)
+    return JobResults(job_id=job_id, offset=offset, limit=limit, done=status["done"], rows=rows)
+
+@api.post("/jobs/{job_id}/cancel", response_model=JobStatus)
+def job_cancel(job_id: str):
+    """Cancela un trabajo en cola o en curso; las filas ya procesadas se conservan."""
+    status = get_jobs().cancel(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"No existe el trabajo '{job_id}'.")
+    return status
+
+# --- Métricas ---
+@api.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    """Métricas del proceso en formato de texto de Prometheus (latencias por etapa y proveedor, fallbacks, lotes)."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@api.get("/providers/status")
+def providers_status():
+    """Estado del circuit breaker y cola del limitador de cada proveedor LLM usado por este proceso."""
+    return guards_status()
+
+# --- Caché de Extracciones ---
+@api.get("/cache/stats")
+def cache_stats():
+    """Contadores de la caché de extracciones (aciertos en memoria/disco, fallos, desalojos) y de la de explicaciones."""
+    cache = get_cache()
+    stats = cache.stats() if cache is not None else {"enabled": False}
+    return {**stats, "explanations": explanation_cache_info()}
+
+@api.delete("/cache")
+def cache_flush():
+    """Vacía la caché de extracciones (memoria de este proceso y almacén en disco)."""
+    cache = get_cache()
+    if cache is not None:
+        cache.flush()
+    logger.info("[API] Caché de extracciones vaciada.")
+    return {"flushed": cache is not None}
+
+# --- Almacén de Extracciones ---
+@api.post("/rescore", response_model=RescoreResponse)
+def rescore(req: RescoreRequest):
+    """Vuelve a decidir todas las cartas guardadas con otro ruleset, sin extraer de nuevo (opcionalmente con diff)."""
+    store = get_feature_store()
+    if store is None:
+        raise HTTPException(status_code=400, detail="El almacén de extracciones está desactivado (FEATURE_STORE=1 para activarlo).")
+    logger.info(f"[API] Recibida solicitud /rescore con '{req.rules_path}'.")
+    try:
+        plan = get_rules(req.rules_path)
+    except (OSError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        summary = store.rescore(plan, req.rules_path, diff=req.diff, compare_to=req.compare_to,
+                                changes_limit=req.changes_limit)
+    except Exception as e:
+        logger.error(f"[API] Error en /rescore: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    logger.info(f"[API] Procesado /rescore: {summary['rows']} cartas en {summary['seconds']:.2f}s.")
+    return _json_response(RescoreResponse(**summary))
+
+@api.post("/simulate", response_model=SimulationResponse)
+def simulate_policy(req: SimulationRequest):
+    """Tasa de aprobación, distribución del riesgo y fallas por regla para cada combinación de umbrales de la grilla."""
+    from app.simulate import population_from_store, simulate
+
+    store = get_feature_store()
+    if store is None:
+        raise HTTPException(status_code=400, detail="El almacén de extracciones está desactivado (FEATURE_STORE=1 para activarlo).")
+    logger.info(f"[API] Recibida solicitud /simulate con {len(req.grid)} umbrales.")
+    try:
+        plan = get_rules(req.rules_path)
+        columns = population_from_store(plan, store, req.limit)
+        result = simulate(columns, plan, req.grid)
+    except (OSError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    population = len(next(iter(columns.values())))
+    return _json_response(SimulationResponse(population=population, configs=result.to_dict(orient="records")))
+
+@api.get("/features/stats")
+def feature_stats():
+    """Cartas guardadas en el almacén de extracciones y corridas (versiones del ruleset) con decisiones."""
+    store = get_feature_store()
+    return store.stats() if store is not None else {"enabled": False}
+
+# --- Endpoints Asíncronos ---
+# Contrapartes de los endpoints anteriores que usan los clientes async de los LLM: no ocupan
+# un hilo del threadpool mientras esperan al proveedor.
+async_api = APIRouter(prefix="/async", tags=["async"])
+
+@async_api.post("/extract", response_model=ApplicationExtract)
+async def extract_async(req: DecisionRequest):
+    """Versión asíncrona de /extract."""
+    logger.info(f"[API] Recibida solicitud /async/extract para carta (longitud: {len(req.letter)}).")
+    try:
+        return _json_response(await extract_with_llm_async(req.letter, cache_mode=req.cache_mode))
+    except Exception as e:
+        logger.error(f"[API] Error en /async/extract: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@async_api.post("/decision", response_model=Decision)
+async def decision_async(req: DecisionRequest):
+    """Versión asíncrona de /decision."""
+    logger.info(f"[API] Recibida solicitud /async/decision para carta (longitud: {len(req.letter)}).")
+    try:
+        budget, fallback = _deadline(req), False
+        if budget is None:
+            ex = await extract_with_llm_async(req.letter, cache_mode=req.cache_mode)
+        else:
+            ex, fallback = await extract_with_deadline_async(req.letter, budget, cache_mode=req.cache_mode)
+        cfg = get_rules(req.rules_path)
+        dec = evaluate(ex, cfg)
+        dec.fallback = fallback
+        # La escritura en SQLite puede esperar el lock del almacén: se hace fuera del event loop.
+        return _json_response(await run_in_threadpool(_store_decision, dec, cfg, req.rules_path))
+    except Exception as e:
+        logger.error(f"[API] Error en /async/decision: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@async_api.post("/decision/fast", response_model=ScreeningDecision)
+async def decision_fast_async(req: DecisionRequest, detail: bool = _DETAIL_QUERY):
+    """Versión asíncrona de /decision/fast."""
+    logger.info(f"[API] Recibida solicitud /async/decision/fast para carta (longitud: {len(req.letter)}).")
+    try:
+        ex = await extract_with_llm_async(req.letter, cache_mode=req.cache_mode)
+        return _screening_response(ex, req.rules_path, detail)
+    except Exception as e:
+        logger.error(f"[API] Error en /async/decision/fast: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@async_api.post("/batch_decision", response_model=BatchResponse)
+async def batch_decision_async(req: BatchRequest):
+    """Versión asíncrona de /batch_decision (la concurrencia se controla con un semáforo)."""
+    letters_for_batch, concurrency = _prepare_batch(req, "/async/batch_decision")
+    try:
+        records = [record async for record in iter_batch_records_async(letters_for_batch, req.rules_path,
+                                                                       concurrency=concurrency, timeout=req.timeout_s,
+                                                                       cache_mode=req.cache_mode)]
+        logger.info(f"[API] Procesado /async/batch_decision: {len(records)} ítems.")
+        return _batch_response(records)
+    except Exception as e:
+        logger.error(f"[API] Error en /async/batch_decision: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@async_api.post("/batch_decision/stream")
+async def batch_decision_stream_async(req: BatchRequest, ordered: bool = Query(True, description="False: cada fila se emite apenas termina su carta, identificada por `id`.")):
+    """Versión asíncrona de /batch_decision/stream."""
+    return _ndjson_stream(req, "/async/batch_decision/stream", iter_batch_rows_async, ordered)
+
+@async_api.post("/explain", response_model=ExplainResponse)
+async def explain_async(req: ExplainRequest):
+    """Versión asíncrona de /explain."""
+    source = _explain_source(req, "/async/explain")
+    try:
+        decision_obj = req.decision if source == "decision" else None
+        if source == "decision_id":
+            decision_obj = await run_in_threadpool(_stored_decision, req)
+        elif decision_obj is None:
+            extracted_data = await extract_with_llm_async(req.letter, cache_mode=req.cache_mode)
+            decision_obj = evaluate(extracted_data, get_rules(req.rules_path))
+        explanation_text = explain_decision(decision_obj, req.provider)
+        return _json_response(ExplainResponse(decision=decision_obj, explanation=explanation_text))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"[API] Error en /async/explain: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+api.include_router(async_api)
@@ -1,66 +1,697 @@
 # -*- coding: utf-8 -*-
+import asyncio
 import os
-import glob
-from typing import List, Dict
-import pandas as pd
+import json
+import logging
+import math
+import multiprocessing
+import time
+from collections import deque
+from itertools import islice
+from concurrent.futures import (FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor,
+                                TimeoutError as FutureTimeoutError, wait)
+from typing import TYPE_CHECKING, Any, AsyncIterator, Deque, Iterable, Iterator, List, Dict, NamedTuple, Optional, Sized, Tuple
 
+from app.features import get_feature_store
+from app.ingest import iter_folder
 from app.llm_extractor import extract_with_llm
-from app.rules import load_rules, evaluate
+from app.rules import evaluate, RulePlan
+from app.registry import get_rules
+from app.schema import ApplicationExtract, BatchRow, Decision
+from app.writers import WRITERS, detect_format
+
+# pandas se importa en las funciones que arman DataFrames o leen CSVs: la API y el modo
+# streaming NDJSON trabajan con `BatchRecord` y no necesitan cargarlo.
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Orden de las columnas de resultados (el mismo que produce evaluate_batch fila por fila).
+RESULT_COLUMNS = ["id", "approved", "risk_score", "failed_rules", "income", "requested_amount",
+                  "amount_income_ratio", "age_years", "active_credits", "rating", "rejections_12m",
+                  "has_mora", "tenure_months"]
+ERROR_COLUMNS = ["id", "approved", "failed_rules"]
+# Columnas de los formatos tipados (NDJSON, Parquet, Arrow): `failed_rules` es una lista y el
+# detalle del parse_error va aparte, como en `BatchRow`.
+TYPED_COLUMNS = RESULT_COLUMNS + ["error"]
 
 def read_letters_from_folder(folder_path: str = "examples/") -> List[Dict[str, str]]:
-    """Lee todos los archivos .txt de una carpeta y los devuelve en una lista de diccionarios."""
-    letters = []
-    # Busca todos los archivos que terminen en .txt en la carpeta especificada.
-    for filepath in glob.glob(os.path.join(folder_path, "*.txt")):
-        with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
-        # Usa el nombre del archivo como ID.
-        filename = os.path.basename(filepath)
-        letters.append({"id": filename, "letter": content})
-    return letters
-
-def evaluate_batch(letters: List[Dict[str, str]], rules_path: str = "business_rules.yaml") -> pd.DataFrame:
-    """Procesa un lote de cartas y devuelve los resultados en un DataFrame de pandas."""
-    results = []
-    # Carga las reglas una sola vez.
-    rules_config = load_rules(rules_path)
-
-    for item in letters:
-        letter_id = item['id']
-        letter_text = item['letter']
-        
+    """Lee todos los archivos .txt de una carpeta (sin subcarpetas) y los devuelve en una lista de diccionarios.
+
+    Para carpetas grandes o archivos comprimidos conviene `app.ingest.iter_letters`, que las lee de a una.
+    """
+    # Usa el nombre del archivo como ID.
+    return list(iter_folder(folder_path, recursive=False))
+
+def _extract_one(letter: str, started: list, cache_mode: str) -> ApplicationExtract:
+    """Tarea del pool: marca el inicio (para medir el timeout) y extrae la carta."""
+    started.append(time.monotonic())
+    return extract_with_llm(letter, cache_mode=cache_mode)
+
+def _await_extraction(future: Future, started: list, timeout: Optional[float]) -> ApplicationExtract:
+    """Espera el resultado de una extracción; el timeout corre desde que la tarea empezó, no desde que se encoló."""
+    if timeout is None:
+        return future.result()
+    while not started and not future.done():
+        wait([future], timeout=0.01)
+    try:
+        return future.result(timeout=max(0.0, started[0] + timeout - time.monotonic()) if started else 0)
+    except FutureTimeoutError:
+        future.cancel()
+        raise TimeoutError(f"timeout: la extracción superó {timeout}s") from None
+
+def extract_all(letters: Iterable[Dict[str, str]], concurrency: int = 1, timeout: Optional[float] = None,
+                cache_mode: str = "use", pack: bool = False) -> Iterator[Tuple[str, Optional[ApplicationExtract], Optional[Exception]]]:
+    """Extrae cada carta del lote y devuelve (id, extracción, error) en el mismo orden de entrada.
+
+    Con `concurrency > 1` (o con `timeout`) las extracciones se reparten en un pool de hilos
+    acotado: el trabajo es de red, así que N cartas tardan ~N/concurrency veces la latencia del
+    proveedor. Solo se encolan `2 * concurrency` cartas por delante de la que se está devolviendo.
+    Con `pack=True` se envían varias cartas por solicitud al LLM (ver `_extract_packed`).
+    """
+    if pack:
+        yield from _extract_packed(letters, concurrency, timeout, cache_mode)
+        return
+    if concurrency <= 1 and timeout is None:
+        for item in letters:
+            try:
+                yield item['id'], extract_with_llm(item['letter'], cache_mode=cache_mode), None
+            except Exception as e:
+                yield item['id'], None, e
+        return
+
+    executor = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="extract")
+    pending: Deque[Tuple[str, Future, list]] = deque()
+    items = iter(letters)
+    try:
+        while True:
+            # Mantiene la ventana de tareas en vuelo llena.
+            while len(pending) < 2 * max(1, concurrency):
+                item = next(items, None)
+                if item is None:
+                    break
+                started: list = []
+                pending.append((item['id'], executor.submit(_extract_one, item['letter'], started, cache_mode), started))
+            if not pending:
+                return
+            letter_id, future, started = pending.popleft()
+            try:
+                yield letter_id, _await_extraction(future, started, timeout), None
+            except Exception as e:
+                yield letter_id, None, e
+    finally:
+        # No se espera a las tareas colgadas (timeouts): el lote no debe bloquearse por ellas.
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def _extract_packed(letters: Iterable[Dict[str, str]], concurrency: int = 1, timeout: Optional[float] = None,
+                    cache_mode: str = "use") -> Iterator[Tuple[str, Optional[ApplicationExtract], Optional[Exception]]]:
+    """Como `extract_all`, pero cada tarea del pool extrae un grupo de cartas con una sola solicitud.
+
+    Los grupos los arma `pack_letters` según el presupuesto de tokens (LLM_BATCH_TOKENS); el
+    `timeout` aplica a cada grupo, y si se vence, todas sus cartas quedan como error.
+    """
+    from app.llm_extractor import extract_many_with_llm, pack_letters
+
+    executor = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="extract")
+    pending: Deque[Tuple[List[Dict[str, str]], Future, list]] = deque()
+    groups = pack_letters(letters)
+
+    def extract_group(group: List[Dict[str, str]], started: list) -> List[ApplicationExtract]:
+        started.append(time.monotonic())
+        return extract_many_with_llm([item['letter'] for item in group], cache_mode=cache_mode)
+
+    try:
+        while True:
+            while len(pending) < 2 * max(1, concurrency):
+                group = next(groups, None)
+                if group is None:
+                    break
+                started: list = []
+                pending.append((group, executor.submit(extract_group, group, started), started))
+            if not pending:
+                return
+            group, future, started = pending.popleft()
+            try:
+                extracts = _await_extraction(future, started, timeout)
+            except Exception as e:
+                for item in group:
+                    yield item['id'], None, e
+                continue
+            for item, extracted in zip(group, extracts):
+                yield item['id'], extracted, None
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def _extract_as_completed(letters: Iterable[Dict[str, str]], concurrency: int = 1, timeout: Optional[float] = None,
+                          cache_mode: str = "use") -> Iterator[Tuple[str, Optional[ApplicationExtract], Optional[Exception]]]:
+    """Como `extract_all`, pero devuelve cada carta apenas termina su extracción (no en el orden de entrada)."""
+    executor = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="extract")
+    pending: Dict[Future, Tuple[str, list]] = {}
+    items = iter(letters)
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(pending) < 2 * max(1, concurrency):
+                item = next(items, None)
+                if item is None:
+                    exhausted = True
+                    break
+                started: list = []
+                pending[executor.submit(_extract_one, item['letter'], started, cache_mode)] = (item['id'], started)
+            if not pending:
+                return
+
+            # Espera a la primera que termine o, con timeout, al vencimiento más próximo.
+            wait_s = None
+            if timeout is not None:
+                deadlines = [started[0] + timeout for _, started in pending.values() if started]
+                wait_s = max(0.0, min(deadlines) - time.monotonic()) if deadlines else 0.01
+            done, _ = wait(list(pending), timeout=wait_s, return_when=FIRST_COMPLETED)
+            for future in done:
+                letter_id, _ = pending.pop(future)
+                try:
+                    yield letter_id, future.result(), None
+                except Exception as e:
+                    yield letter_id, None, e
+            if timeout is not None:
+                now = time.monotonic()
+                for future, (letter_id, started) in list(pending.items()):
+                    if started and now - started[0] >= timeout:
+                        future.cancel()
+                        del pending[future]
+                        yield letter_id, None, TimeoutError(f"timeout: la extracción superó {timeout}s")
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+async def _extract_async(item: Dict[str, str], semaphore: asyncio.Semaphore, timeout: Optional[float],
+                         cache_mode: str) -> Tuple[str, Optional[ApplicationExtract], Optional[Exception]]:
+    """Extrae una carta con el cliente async, con a lo sumo `semaphore` extracciones a la vez."""
+    from app.llm_extractor import extract_with_llm_async
+
+    async with semaphore:
+        try:
+            extracted = await asyncio.wait_for(extract_with_llm_async(item['letter'], cache_mode=cache_mode), timeout)
+            return item['id'], extracted, None
+        except asyncio.TimeoutError:
+            return item['id'], None, TimeoutError(f"timeout: la extracción superó {timeout}s")
+        except Exception as e:
+            return item['id'], None, e
+
+# --- Registros Tipados ---
+
+class BatchRecord(NamedTuple):
+    """Resultado de una carta del lote: el `Decision` completo o el motivo por el que no se obtuvo.
+
+    Es la forma intermedia de todos los modos de lote: la API serializa `BatchRow` desde aquí y
+    el CSV/DataFrame aplana las mismas columnas, sin ida y vuelta por pandas.
+    """
+    id: Any
+    decision: Optional[Decision]
+    error: Optional[str] = None
+
+def _store_features(rows: Iterable[Tuple[Any, ApplicationExtract, bool, float, List[str]]], plan: RulePlan) -> None:
+    """Guarda las extracciones y decisiones de un bloque en el almacén de `app.features`, si está activo."""
+    store = get_feature_store()
+    if store is not None:
+        store.save(rows, plan)
+
+def build_record(letter_id: Any, extracted: Optional[ApplicationExtract], error: Optional[Exception],
+                 plan: RulePlan) -> BatchRecord:
+    """Evalúa una extracción; si la extracción o la evaluación fallan, el registro lleva el error."""
+    if error is None:
         try:
-            # Ejecuta el pipeline de extracción y evaluación para cada carta.
-            extracted_data = extract_with_llm(letter_text)
-            decision = evaluate(extracted_data, rules_config)
-
-            # Calcula el ratio de deuda sobre ingresos.
-            ratio = (decision.extracted.financials.requested_amount / decision.extracted.financials.income_monthly 
-                     if decision.extracted.financials.income_monthly > 0 else float('inf'))
-
-            # Recopila los resultados en un diccionario.
-            results.append({
-                "id": letter_id,
-                "approved": decision.approved,
-                "risk_score": decision.risk_score,
-                "failed_rules": ", ".join(decision.rationale),
-                "income": decision.extracted.financials.income_monthly,
-                "requested_amount": decision.extracted.financials.requested_amount,
-                "amount_income_ratio": ratio,
-                "age_years": decision.extracted.applicant.age_years,
-                "active_credits": decision.extracted.financials.active_credits,
-                "rating": decision.extracted.credit.credit_rating,
-                "rejections_12m": decision.extracted.credit.rejections_last_12m,
-                "has_mora": decision.extracted.credit.has_delinquencies_last_6m,
-                "tenure_months": decision.extracted.employment.employment_tenure_months
-            })
+            decision = evaluate(extracted, plan)
         except Exception as e:
-            # Si una carta falla, se registra el error y se continúa con las demás.
-            results.append({"id": letter_id, "approved": False, "failed_rules": f"parse_error: {e}"})
+            error = e
+        else:
+            _store_features([(letter_id, extracted, decision.approved, decision.risk_score, decision.rationale)], plan)
+            return BatchRecord(letter_id, decision)
+    return BatchRecord(letter_id, None, str(error))
+
+def record_row(record: BatchRecord, list_rules: bool = False) -> Dict[str, object]:
+    """Aplana un registro en la fila del DataFrame/CSV de resultados.
+
+    Con `list_rules=True` (formatos tipados) `failed_rules` es la lista de razones y un parse_error
+    queda como `["parse_error"]` con el detalle en `error`.
+    """
+    decision = record.decision
+    if decision is None:
+        # Si una carta falla, se registra el error y se continúa con las demás.
+        if list_rules:
+            return {"id": record.id, "approved": False, "failed_rules": ["parse_error"], "error": record.error}
+        return {"id": record.id, "approved": False, "failed_rules": f"parse_error: {record.error}"}
+
+    financials = decision.extracted.financials
+    # Calcula el ratio de deuda sobre ingresos.
+    ratio = financials.requested_amount / financials.income_monthly if financials.income_monthly > 0 else float('inf')
+    return {
+        "id": record.id,
+        "approved": decision.approved,
+        "risk_score": decision.risk_score,
+        "failed_rules": list(decision.rationale) if list_rules else ", ".join(decision.rationale),
+        "income": financials.income_monthly,
+        "requested_amount": financials.requested_amount,
+        "amount_income_ratio": ratio,
+        "age_years": decision.extracted.applicant.age_years,
+        "active_credits": financials.active_credits,
+        "rating": decision.extracted.credit.credit_rating,
+        "rejections_12m": decision.extracted.credit.rejections_last_12m,
+        "has_mora": decision.extracted.credit.has_delinquencies_last_6m,
+        "tenure_months": decision.extracted.employment.employment_tenure_months
+    }
+
+def record_batch_row(record: BatchRecord) -> BatchRow:
+    """Arma la fila de la respuesta de la API directamente desde el `Decision` (sin revalidar la extracción)."""
+    decision = record.decision
+    if decision is None:
+        # Máximo riesgo para los errores de parseo.
+        return BatchRow(id=str(record.id), approved=False, risk_score=1.0, failed_rules=["parse_error"], error=record.error)
+    return BatchRow(id=str(record.id), approved=decision.approved, risk_score=decision.risk_score,
+                    failed_rules=decision.rationale, extracted=decision.extracted)
+
+def iter_batch_records(letters: Iterable[Dict[str, str]], rules_path: str = "business_rules.yaml", concurrency: int = 1,
+                       timeout: Optional[float] = None, cache_mode: str = "use", ordered: bool = True,
+                       pack: bool = False) -> Iterator[BatchRecord]:
+    """Evalúa un lote y devuelve cada `BatchRecord` apenas su carta está decidida.
+
+    Con `ordered=False` los registros salen en el orden en que terminan las extracciones (cada uno
+    lleva su `id`), así que el primero llega después de la carta más rápida y no de la primera.
+    Con `pack=True` las cartas se extraen en grupos (una solicitud al LLM por grupo, en orden).
+    """
+    plan = get_rules(rules_path)
+    if pack:
+        extractions = extract_all(letters, concurrency, timeout, cache_mode, pack=True)
+    else:
+        extract = extract_all if ordered else _extract_as_completed
+        extractions = extract(letters, concurrency, timeout, cache_mode)
+    for letter_id, extracted, error in extractions:
+        yield build_record(letter_id, extracted, error, plan)
+
+async def iter_batch_records_async(letters: List[Dict[str, str]], rules_path: str = "business_rules.yaml",
+                                   concurrency: int = 1, timeout: Optional[float] = None, cache_mode: str = "use",
+                                   ordered: bool = True) -> AsyncIterator[BatchRecord]:
+    """Versión asíncrona de `iter_batch_records` (extracciones con los clientes async y un semáforo)."""
+    plan = get_rules(rules_path)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    tasks = [asyncio.ensure_future(_extract_async(item, semaphore, timeout, cache_mode)) for item in letters]
+    try:
+        for next_extraction in (tasks if ordered else asyncio.as_completed(tasks)):
+            letter_id, extracted, error = await next_extraction
+            yield build_record(letter_id, extracted, error, plan)
+    finally:
+        # Si el cliente se desconecta, no se siguen extrayendo las cartas restantes.
+        for task in tasks:
+            task.cancel()
+
+def iter_batch_rows(letters: Iterable[Dict[str, str]], rules_path: str = "business_rules.yaml", concurrency: int = 1,
+                    timeout: Optional[float] = None, cache_mode: str = "use", ordered: bool = True) -> Iterator[BatchRow]:
+    """`iter_batch_records` convertido a las filas (`BatchRow`) de la API."""
+    for record in iter_batch_records(letters, rules_path, concurrency, timeout, cache_mode, ordered):
+        yield record_batch_row(record)
+
+async def iter_batch_rows_async(letters: List[Dict[str, str]], rules_path: str = "business_rules.yaml",
+                                concurrency: int = 1, timeout: Optional[float] = None, cache_mode: str = "use",
+                                ordered: bool = True) -> AsyncIterator[BatchRow]:
+    """Versión asíncrona de `iter_batch_rows`."""
+    async for record in iter_batch_records_async(letters, rules_path, concurrency, timeout, cache_mode, ordered):
+        yield record_batch_row(record)
+
+# --- Evaluación por Lotes ---
+
+def evaluate_batch(letters: Iterable[Dict[str, str]], rules_path: str = "business_rules.yaml", columnar: bool = False,
+                   concurrency: int = 1, timeout: Optional[float] = None, cache_mode: str = "use",
+                   pack: bool = False, workers: int = 1) -> "pd.DataFrame":
+    """Procesa un lote de cartas y devuelve los resultados en un DataFrame de pandas.
+
+    Con `columnar=True` las reglas se evalúan de forma vectorizada sobre todo el lote
+    (ver `evaluate_batch_columnar`); el DataFrame resultante es idéntico.
+    `concurrency` y `timeout` (segundos por carta) controlan la extracción en paralelo;
+    una carta que excede el timeout queda como `parse_error`. `cache_mode` se pasa a
+    `extract_with_llm` ("use", "refresh" o "bypass"). Con `pack=True` se envían varias cartas
+    por solicitud al LLM (`extract_many_with_llm`), con grupos ajustados a LLM_BATCH_TOKENS.
+    Con `workers > 1` el lote se reparte en bloques entre procesos (ver `evaluate_in_processes`).
+    `letters` puede ser un generador (ej. `app.ingest.iter_letters`): las cartas se consumen a
+    medida que se procesan y solo las filas de resultados quedan en memoria.
+    """
+    import pandas as pd
+
+    if workers > 1:
+        chunk_size = WORKER_CHUNK_SIZE
+        if isinstance(letters, Sized):
+            # Unos 4 bloques por worker: reparte la carga sin que el envío de cada bloque domine.
+            chunk_size = max(1, min(WORKER_CHUNK_SIZE, math.ceil(len(letters) / (workers * 4))))
+        frames = list(evaluate_in_processes(letters, rules_path, workers, chunk_size, columnar=columnar,
+                                            concurrency=concurrency, timeout=timeout, cache_mode=cache_mode, pack=pack))
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    if columnar:
+        return evaluate_batch_columnar(letters, rules_path, concurrency=concurrency, timeout=timeout,
+                                       cache_mode=cache_mode, pack=pack).frame
 
     # Convierte la lista de resultados a un DataFrame de pandas.
-    return pd.DataFrame(results)
+    return pd.DataFrame([record_row(record) for record in
+                         iter_batch_records(letters, rules_path, concurrency, timeout, cache_mode, pack=pack)])
+
+async def evaluate_batch_async(letters: List[Dict[str, str]], rules_path: str = "business_rules.yaml",
+                               concurrency: int = 1, timeout: Optional[float] = None,
+                               cache_mode: str = "use") -> "pd.DataFrame":
+    """Versión asíncrona de `evaluate_batch`: las extracciones usan los clientes async de los LLM.
+
+    Hasta `concurrency` cartas se extraen a la vez (un semáforo, no hilos); el DataFrame
+    conserva el orden de entrada y tiene las mismas columnas que `evaluate_batch`.
+    """
+    import pandas as pd
+
+    return pd.DataFrame([record_row(record) async for record in
+                         iter_batch_records_async(letters, rules_path, concurrency, timeout, cache_mode)])
+
+# --- Modo Columnar ---
+
+class BatchResult:
+    """Resultado de `evaluate_batch_columnar`.
+
+    `frame` contiene las mismas columnas que `evaluate_batch`. Los objetos `Decision` no se
+    construyen durante la evaluación: `decision(i)` los arma solo cuando se piden.
+    """
 
-def to_csv(df: pd.DataFrame, path: str = "decisions.csv"):
+    def __init__(self, frame: "pd.DataFrame", extracts: List[Optional[ApplicationExtract]], plan: RulePlan):
+        self.frame = frame
+        self._extracts = extracts
+        self._plan = plan
+
+    def __len__(self) -> int:
+        return len(self._extracts)
+
+    def decision(self, index: int) -> Optional[Decision]:
+        """Construye el `Decision` de la fila `index` (None si la carta tuvo un parse_error)."""
+        extracted = self._extracts[index]
+        return evaluate(extracted, self._plan) if extracted is not None else None
+
+    def decisions(self) -> Iterator[Optional[Decision]]:
+        """Itera perezosamente sobre los `Decision` de todas las filas, en orden."""
+        for index in range(len(self._extracts)):
+            yield self.decision(index)
+
+def evaluate_batch_columnar(letters: Iterable[Dict[str, str]], rules_path: str = "business_rules.yaml",
+                            plan: Optional[RulePlan] = None, concurrency: int = 1,
+                            timeout: Optional[float] = None, cache_mode: str = "use", pack: bool = False) -> BatchResult:
+    """Procesa un lote evaluando cada regla como una comparación vectorizada sobre todas las cartas.
+
+    La extracción sigue siendo carta por carta; a partir de ahí los campos se pasan a columnas
+    de NumPy y `approved`, `risk_score`, `failed_rules` y `amount_income_ratio` se calculan
+    directamente como columnas.
+    """
+    ids, extracts, errors = [], [], []
+    for letter_id, extracted_data, error in extract_all(letters, concurrency, timeout, cache_mode, pack):
+        ids.append(letter_id)
+        extracts.append(extracted_data)
+        errors.append(error)
+    plan = plan or get_rules(rules_path)
+    return BatchResult(columnar_frame(ids, extracts, errors, plan), extracts, plan)
+
+def columnar_frame(ids: List[str], extracts: List[Optional[ApplicationExtract]], errors: List[Optional[Exception]],
+                   plan: RulePlan, list_rules: bool = False) -> "pd.DataFrame":
+    """Arma el DataFrame de resultados de forma vectorizada (mismas columnas y tipos que `evaluate_batch`).
+
+    `list_rules` tiene el mismo efecto que en `record_row` (formatos tipados).
+    """
+    import numpy as np
+    import pandas as pd
+    from app.vectorized import OUTPUT_FIELDS, column, evaluate_columns, extracts_to_columns, required_fields
+
+    valid = [i for i, ex in enumerate(extracts) if ex is not None]
+    if not ids:
+        return pd.DataFrame()
+
+    data: Dict[str, object] = {"id": ids}
+    if valid:
+        columns = extracts_to_columns([extracts[i] for i in valid], required_fields(plan))
+        result = evaluate_columns(columns, plan)
+        _store_features(zip([ids[i] for i in valid], [extracts[i] for i in valid], result["approved"],
+                            result["risk_score"], result["failed_rules_list"]), plan)
+        valid_columns = {
+            "approved": result["approved"],
+            "risk_score": result["risk_score"],
+            "failed_rules": result["failed_rules_list" if list_rules else "failed_rules"],
+            **{name: column(columns, path) for name, path in OUTPUT_FIELDS.items()},
+        }
+    else:
+        valid_columns = {}
+
+    if len(valid) == len(ids):
+        data.update(valid_columns)
+        return pd.DataFrame(data, columns=RESULT_COLUMNS)
+
+    # Hay cartas con parse_error: sus columnas numéricas quedan en NaN, igual que en el modo fila por fila.
+    index = np.asarray(valid, dtype=np.int64)
+    for name, values in valid_columns.items():
+        data[name] = pd.Series(values, index=index).reindex(range(len(ids))).to_numpy()
+    approved = np.zeros(len(ids), dtype=bool)
+    failed = np.empty(len(ids), dtype=object)
+    if valid:
+        approved[index] = valid_columns["approved"]
+        failed[index] = valid_columns["failed_rules"]
+    messages = np.full(len(ids), None, dtype=object)
+    for i, error in enumerate(errors):
+        if error is not None:
+            failed[i] = ["parse_error"] if list_rules else f"parse_error: {error}"
+            messages[i] = str(error)
+    data["approved"] = approved
+    data["failed_rules"] = failed
+    if list_rules:
+        data["error"] = messages
+
+    # El orden de columnas sigue el de la primera fila, como hace pd.DataFrame con una lista de dicts.
+    if not valid:
+        order = ERROR_COLUMNS
+    elif errors[0] is not None:
+        order = ERROR_COLUMNS + [c for c in RESULT_COLUMNS if c not in ERROR_COLUMNS]
+    else:
+        order = RESULT_COLUMNS
+    if list_rules:
+        order = order + ["error"]
+    return pd.DataFrame({name: data[name] for name in order})
+
+def to_csv(df: "pd.DataFrame", path: str = "decisions.csv"):
     """Guarda un DataFrame en un archivo CSV."""
     df.to_csv(path, index=False)
+
+def _block_frame(block: List[Tuple[Any, Optional[ApplicationExtract], Optional[Exception]]], plan: RulePlan,
+                 columnar: bool = False, list_rules: bool = False) -> "pd.DataFrame":
+    """DataFrame de resultados de un bloque de extracciones (id, extracción, error)."""
+    import pandas as pd
+
+    if columnar:
+        return columnar_frame([b[0] for b in block], [b[1] for b in block], [b[2] for b in block], plan, list_rules)
+    return pd.DataFrame([record_row(build_record(letter_id, extracted, error, plan), list_rules)
+                         for letter_id, extracted, error in block])
+
+# --- Modo Multiproceso ---
+
+# Cartas por bloque enviado a cada proceso (tope; `evaluate_batch` usa bloques más chicos en lotes pequeños).
+WORKER_CHUNK_SIZE = 1000
+
+# Ruleset compilado del proceso worker, cargado una sola vez por `_init_worker`.
+_worker_plan: Optional[RulePlan] = None
+
+def _worker_context():
+    """Contexto de multiprocessing de los workers: "forkserver" con `app.batch` y pandas precargados.
+
+    No se usa "fork": el proceso principal puede tener hilos activos (lectura anticipada de
+    `app.ingest`, pools de extracción) y un fork con un lock tomado puede colgar al worker. El
+    servidor de forkserver arranca una sola vez por proceso, así que los workers de los lotes
+    siguientes no vuelven a pagar los imports. Donde no existe (Windows) se usa "spawn".
+    """
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("spawn")
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload(["app.batch", "pandas"])
+    return context
+
+def _init_worker(rules_path: str) -> None:
+    global _worker_plan
+    _worker_plan = get_rules(rules_path)
+
+def _evaluate_chunk(chunk: List[Dict[str, str]], columnar: bool, concurrency: int, timeout: Optional[float],
+                    cache_mode: str, pack: bool, list_rules: bool) -> "pd.DataFrame":
+    """Tarea del worker: extrae y evalúa un bloque; solo vuelve al proceso principal el DataFrame de resultados."""
+    block = list(extract_all(chunk, concurrency, timeout, cache_mode, pack))
+    return _block_frame(block, _worker_plan, columnar, list_rules)
+
+def evaluate_in_processes(letters: Iterable[Dict[str, str]], rules_path: str = "business_rules.yaml", workers: int = 2,
+                          chunk_size: int = WORKER_CHUNK_SIZE, columnar: bool = False, concurrency: int = 1,
+                          timeout: Optional[float] = None, cache_mode: str = "use", pack: bool = False,
+                          list_rules: bool = False) -> Iterator["pd.DataFrame"]:
+    """Reparte el lote en bloques de `chunk_size` cartas entre `workers` procesos y devuelve el DataFrame de cada bloque en orden.
+
+    El fallback por regex y la construcción de los modelos Pydantic son CPU puro y el GIL los
+    deja en un solo núcleo; con procesos escalan con los núcleos. Cada worker carga el ruleset
+    compilado una sola vez al arrancar y devuelve solo las filas aplanadas (no los `Decision`),
+    así que lo que cruza entre procesos es la carta de ida y una fila por carta de vuelta.
+    Solo hay `2 * workers` bloques en vuelo: la entrada puede ser un generador (ej. un CSV por bloques).
+    `concurrency`, `timeout`, `cache_mode` y `pack` se aplican dentro de cada worker; `list_rules`
+    como en `record_row`.
+    """
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=_worker_context(),
+                                   initializer=_init_worker, initargs=(rules_path,))
+    pending: Deque[Future] = deque()
+    items = iter(letters)
+    try:
+        while True:
+            while len(pending) < 2 * workers:
+                chunk = list(islice(items, chunk_size))
+                if not chunk:
+                    break
+                pending.append(executor.submit(_evaluate_chunk, chunk, columnar, concurrency, timeout, cache_mode, pack,
+                                               list_rules))
+            if not pending:
+                return
+            yield pending.popleft().result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+# --- Modo Streaming (por bloques, reanudable) ---
+
+# Tipos fijos de las columnas en modo streaming: así todos los bloques se escriben igual, tengan o
+# no filas con parse_error (los enteros no pasan a float por los NaN de esas filas).
+STREAM_DTYPES = {"approved": "bool", "risk_score": "float64", "income": "Int64", "requested_amount": "Int64",
+                 "amount_income_ratio": "float64", "age_years": "Int64", "active_credits": "Int64",
+                 "rejections_12m": "Int64", "has_mora": "boolean", "tenure_months": "Int64"}
+
+def stream_frame(df: "pd.DataFrame", list_rules: bool = False) -> "pd.DataFrame":
+    """Lleva un bloque de resultados a las columnas y tipos fijos del modo streaming."""
+    df = df.reindex(columns=TYPED_COLUMNS if list_rules else RESULT_COLUMNS)
+    df["approved"] = df["approved"].fillna(False)
+    return df.astype(STREAM_DTYPES)
+
+def _input_signature(path: str) -> Dict[str, object]:
+    st = os.stat(path)
+    return {"input": os.path.abspath(path), "input_size": st.st_size, "input_mtime_ns": st.st_mtime_ns}
+
+def _read_checkpoint(path: str) -> Optional[Dict[str, object]]:
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def _write_checkpoint(path: str, state: Dict[str, object]) -> None:
+    """Escribe el checkpoint de forma atómica (archivo temporal + os.replace)."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def csv_letters(input_path: str, chunksize: int, skip: int) -> Iterator[Dict[str, object]]:
+    """Lee el CSV de entrada por bloques y devuelve las cartas una a una, saltando las `skip` primeras."""
+    import pandas as pd
+
+    reader = pd.read_csv(input_path, chunksize=chunksize, skiprows=(lambda i: 0 < i <= skip) if skip else None)
+    with reader:
+        for chunk in reader:
+            # Asegurarse de que el CSV tiene las columnas correctas
+            if 'id' not in chunk.columns or 'letter' not in chunk.columns:
+                raise ValueError("El archivo CSV debe contener las columnas 'id' y 'letter'.")
+            for letter_id, letter in zip(chunk['id'], chunk['letter']):
+                yield {"id": letter_id, "letter": letter}
+
+def _evaluate_blocks(letters: Iterable[Dict[str, str]], plan: RulePlan, rules_path: str, chunksize: int,
+                     columnar: bool, concurrency: int, timeout: Optional[float], cache_mode: str, pack: bool,
+                     workers: int, list_rules: bool) -> Iterator["pd.DataFrame"]:
+    """DataFrames de resultados de bloques de `chunksize` cartas, en orden (en procesos si `workers > 1`)."""
+    if workers > 1:
+        yield from evaluate_in_processes(letters, rules_path, workers, chunksize, columnar=columnar,
+                                         concurrency=concurrency, timeout=timeout, cache_mode=cache_mode, pack=pack,
+                                         list_rules=list_rules)
+        return
+    extractions = extract_all(letters, concurrency, timeout, cache_mode, pack)
+    for block in iter(lambda: list(islice(extractions, chunksize)), []):
+        yield _block_frame(block, plan, columnar, list_rules)
+
+def evaluate_to_file(letters: Iterable[Dict[str, str]], output_path: str, rules_path: str = "business_rules.yaml",
+                     fmt: Optional[str] = None, chunksize: int = 1000, columnar: bool = False, concurrency: int = 1,
+                     timeout: Optional[float] = None, cache_mode: str = "use", pack: bool = False,
+                     workers: int = 1) -> Dict[str, int]:
+    """Evalúa un lote (lista o generador) y escribe cada bloque de `chunksize` filas apenas se decide.
+
+    El formato sale de `fmt` o de la extensión de `output_path` (ver `app.writers`); nunca se arma
+    el DataFrame completo del lote. Sin checkpoint: para reanudar un CSV grande use `evaluate_csv_stream`.
+
+    Returns:
+        dict: `rows`, `approved` y `rejected`.
+    """
+    plan = get_rules(rules_path)
+    writer_cls = WRITERS[detect_format(output_path, fmt)]
+    rows = approved = 0
+    with writer_cls(output_path) as writer:
+        for frame in _evaluate_blocks(letters, plan, rules_path, chunksize, columnar, concurrency, timeout,
+                                      cache_mode, pack, workers, writer.list_rules):
+            frame = stream_frame(frame, writer.list_rules)
+            writer.write(frame)
+            rows += len(frame)
+            approved += int(frame["approved"].sum())
+    return {"rows": rows, "approved": approved, "rejected": rows - approved}
+
+def evaluate_csv_stream(input_path: str, output_path: str, rules_path: str = "business_rules.yaml",
+                        chunksize: int = 1000, columnar: bool = False, concurrency: int = 1,
+                        timeout: Optional[float] = None, cache_mode: str = "use",
+                        checkpoint_path: Optional[str] = None, restart: bool = False, pack: bool = False,
+                        workers: int = 1, fmt: Optional[str] = None) -> Dict[str, int]:
+    """Procesa un CSV de cartas por bloques y agrega los resultados a `output_path` a medida que avanza.
+
+    Solo hay un bloque de `chunksize` cartas en memoria a la vez. Después de escribir cada bloque se
+    actualiza el checkpoint (`<output_path>.checkpoint` por defecto) con las filas completadas y el
+    tamaño del archivo de salida; si el proceso se interrumpe, la siguiente ejecución trunca la salida
+    a ese tamaño y continúa desde la fila siguiente. Con `restart=True` se ignora el checkpoint.
+    `pack=True` extrae varias cartas por solicitud al LLM, como en `evaluate_batch`. Con `workers > 1`
+    cada bloque se extrae y evalúa en un proceso aparte (`evaluate_in_processes`), con hasta
+    `2 * workers` bloques en memoria; se escriben y se marcan en el checkpoint en el orden de entrada.
+    La salida puede ser CSV, NDJSON, Parquet o Arrow (`fmt` o la extensión, ver `app.writers`);
+    Parquet no se puede reanudar, así que en ese formato no hay checkpoint y cada ejecución empieza de cero.
+
+    Returns:
+        dict: `rows`, `approved`, `rejected` (incluyendo lo hecho en ejecuciones anteriores) y `resumed_from`.
+    """
+    checkpoint_path = checkpoint_path or f"{output_path}.checkpoint"
+    plan = get_rules(rules_path)
+    signature = {**_input_signature(input_path), "rules_version": plan.version}
+    writer_cls = WRITERS[detect_format(output_path, fmt)]
+    resumable = writer_cls.appendable
+
+    state = None if restart or not resumable else _read_checkpoint(checkpoint_path)
+    if state is not None:
+        if any(state.get(k) != v for k, v in signature.items()):
+            raise ValueError(f"El checkpoint '{checkpoint_path}' corresponde a otra entrada o a otro ruleset; "
+                             "use restart=True (--restart) para empezar de nuevo.")
+        # Sin la salida completa hasta el checkpoint (borrada o truncada), reanudar la dejaría con huecos.
+        if not os.path.exists(output_path) or os.path.getsize(output_path) < state["output_bytes"]:
+            raise ValueError(f"La salida '{output_path}' no contiene las filas registradas en el checkpoint "
+                             f"'{checkpoint_path}'; use restart=True (--restart) para empezar de nuevo.")
+        # Descarta lo que se haya escrito después del último checkpoint (un bloque a medias).
+        with open(output_path, 'r+b') as f:
+            f.truncate(state["output_bytes"])
+        logger.info(f"[BATCH] Reanudando '{input_path}' desde la fila {state['rows_done']}.")
+    else:
+        state = {**signature, "rows_done": 0, "output_bytes": 0, "approved": 0, "rejected": 0}
+    resumed_from = state["rows_done"]
+
+    with writer_cls(output_path, append=resumed_from > 0) as writer:
+        for frame in _evaluate_blocks(csv_letters(input_path, chunksize, resumed_from), plan, rules_path, chunksize,
+                                      columnar, concurrency, timeout, cache_mode, pack, workers, writer.list_rules):
+            frame = stream_frame(frame, writer.list_rules)
+            writer.write(frame)
+            writer.flush()
+
+            approved = int(frame["approved"].sum())
+            state.update(rows_done=state["rows_done"] + len(frame), output_bytes=writer.tell(),
+                         approved=state["approved"] + approved,
+                         rejected=state["rejected"] + len(frame) - approved)
+            if resumable:
+                _write_checkpoint(checkpoint_path, state)
+
+    # Terminado: el checkpoint ya no hace falta (una nueva ejecución vuelve a empezar).
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return {"rows": state["rows_done"], "approved": state["approved"], "rejected": state["rejected"],
+            "resumed_from": resumed_from}
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""Caché de extracciones direccionada por contenido.
+
+La clave es el hash de (proveedor, modelo, versión del extractor, texto de la carta), así que la
+misma carta enviada a /extract, /decision, /explain o a un lote paga una sola llamada al LLM.
+
+Dos niveles:
+- Memoria: LRU acotado con TTL (por proceso).
+- Disco: SQLite en modo WAL, compartido entre los workers de uvicorn de la misma máquina.
+
+Variables de entorno: EXTRACTION_CACHE (1/0), EXTRACTION_CACHE_PATH, EXTRACTION_CACHE_SIZE,
+EXTRACTION_CACHE_TTL (segundos).
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from app.schema import ApplicationExtract
+
+# Modos de uso por solicitud: "use" lee y escribe, "refresh" ignora lo guardado y lo reemplaza,
+# "bypass" no toca la caché.
+CACHE_MODES = ("use", "refresh", "bypass")
+
+def cache_key(letter: str, provider: str, model: str, extractor_version: str) -> str:
+    """Clave de la caché: SHA-256 del proveedor, el modelo, la versión del extractor y la carta."""
+    h = hashlib.sha256()
+    for part in (provider, model, extractor_version, letter):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+class ExtractionCache:
+    """LRU en memoria con TTL delante de un almacén SQLite persistente."""
+
+    def __init__(self, path: Optional[str] = None, max_items: int = 1024, ttl: Optional[float] = 86400.0):
+        self.path = path
+        self.max_items = max_items
+        self.ttl = ttl
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._counters = {"hits_memory": 0, "hits_disk": 0, "misses": 0, "evictions": 0, "writes": 0}
+
+    # --- SQLite ---
+
+    def _db(self) -> Optional[sqlite3.Connection]:
+        """Conexión SQLite de este hilo (se abre la primera vez que se usa)."""
+        if not self.path:
+            return None
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS extractions (key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)")
+            self._local.conn = conn
+        return conn
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    # --- Operaciones ---
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += n
+
+    def _remember(self, key: str, created: float, value: str) -> None:
+        """Guarda en el LRU de memoria, desalojando las entradas más viejas si se llena."""
+        with self._lock:
+            self._memory[key] = (created, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_items:
+                self._memory.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def get(self, key: str) -> Optional[ApplicationExtract]:
+        """Busca una extracción: primero en memoria, luego en disco (y la sube a memoria)."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if self._expired(entry[0]):
+                    del self._memory[key]
+                    self._counters["evictions"] += 1
+                    entry = None
+                else:
+                    self._memory.move_to_end(key)
+                    self._counters["hits_memory"] += 1
+        if entry is not None:
+            return ApplicationExtract.model_validate_json(entry[1])
+
+        db = self._db()
+        if db is not None:
+            row = db.execute("SELECT value, created FROM extractions WHERE key = ?", (key,)).fetchone()
+            if row is not None and not self._expired(row[1]):
+                self._count("hits_disk")
+                self._remember(key, row[1], row[0])
+                return ApplicationExtract.model_validate_json(row[0])
+
+        self._count("misses")
+        return None
+
+    def put(self, key: str, extracted: ApplicationExtract) -> None:
+        """Guarda una extracción en ambos niveles."""
+        value = extracted.model_dump_json()
+        created = time.time()
+        self._remember(key, created, value)
+        db = self._db()
+        if db is not None:
+            db.execute("INSERT OR REPLACE INTO extractions (key, value, created) VALUES (?, ?, ?)", (key, value, created))
+        self._count("writes")
+
+    def flush(self) -> None:
+        """Vacía la memoria y el almacén en disco."""
+        with self._lock:
+            self._memory.clear()
+        db = self._db()
+        if db is not None:
+            db.execute("DELETE FROM extractions")
+
+    def stats(self) -> Dict[str, object]:
+        """Contadores de aciertos, fallos y desalojos, más el tamaño actual de cada nivel."""
+        with self._lock:
+            stats: Dict[str, object] = dict(self._counters)
+            stats["memory_items"] = len(self._memory)
+        db = self._db()
+        stats["disk_items"] = db.execute("SELECT COUNT(*) FROM extractions").fetchone()[0] if db is not None else 0
+        stats["path"] = self.path
+        return stats
+
+# --- Instancia del Proceso ---
+
+_cache: Optional[ExtractionCache] = None
+_cache_lock = threading.Lock()
+
+def get_cache() -> Optional[ExtractionCache]:
+    """Devuelve la caché del proceso (creada desde las variables de entorno), o None si está desactivada."""
+    global _cache
+    if os.getenv("EXTRACTION_CACHE", "1") == "0":
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                ttl = float(os.getenv("EXTRACTION_CACHE_TTL", "86400"))
+                _cache = ExtractionCache(
+                    path=os.getenv("EXTRACTION_CACHE_PATH", os.path.join(".cache", "extractions.sqlite3")),
+                    max_items=int(os.getenv("EXTRACTION_CACHE_SIZE", "1024")),
+                    ttl=ttl if ttl > 0 else None,
+                )
+    return _cache
+
+def set_cache(cache: Optional[ExtractionCache]) -> None:
+    """Reemplaza la caché del proceso (útil en pruebas o para configurarla por código)."""
+    global _cache
+    with _cache_lock:
+        _cache = cache
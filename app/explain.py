@@ -1,9 +1,28 @@
 # -*- coding: utf-8 -*-
+"""Explicaciones en lenguaje natural de las decisiones.
+
+El texto depende solo del veredicto, de las reglas fallidas (id y razón, en orden) y del
+proveedor: esa es la firma con la que se memoizan las explicaciones ya armadas. Con 8 reglas hay
+a lo sumo 2^8 firmas por ruleset, así que `prime_explanations` las arma todas al arrancar la API.
+Variable de entorno: EXPLANATION_CACHE_SIZE (firmas en memoria, por defecto 4096).
+"""
+import itertools
+import logging
 import os
-from typing import Optional
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Tuple
 
+from app import metrics
 from app.schema import Decision
 
+logger = logging.getLogger(__name__)
+
+# Firma de una explicación: (aprobado, ((id, razón), ...) de las reglas fallidas en orden).
+Signature = Tuple[bool, Tuple[Tuple[str, str], ...]]
+
+# Rulesets con más reglas que esto no se precalculan completos (2^n firmas).
+PRIME_MAX_RULES = 12
+
 # --- Plantillas para Explicaciones (Fallback) ---
 
 FALLBACK_TEMPLATE_APPROVED = """
@@ -39,43 +58,74 @@ RECOMMENDATIONS_MAP = {
     "rejections_max": "Evitar realizar múltiples solicitudes de crédito en un corto período de tiempo."
 }
 
-def _generate_fallback_explanation(decision: Decision) -> str:
-    """Genera una explicación basada en plantillas locales usando los resultados de las reglas."""
-    if decision.approved:
+def explanation_signature(decision: Decision) -> Signature:
+    """La firma de la que depende la explicación: veredicto y reglas fallidas (id, razón) en orden."""
+    return decision.approved, tuple((rule.id, rule.reason) for rule in decision.rule_results if not rule.passed)
+
+def _generate_fallback_explanation(signature: Signature) -> str:
+    """Genera una explicación basada en plantillas locales usando las reglas fallidas de la firma."""
+    approved, failed = signature
+    if approved:
         return FALLBACK_TEMPLATE_APPROVED
     else:
         # Une las razones del rechazo en una lista con viñetas.
-        failed_rules_str = "\n- ".join(decision.rationale)
+        failed_rules_str = "\n- ".join(reason for _, reason in failed)
         
         # Genera recomendaciones basadas en las reglas fallidas.
-        recs = [RECOMMENDATIONS_MAP[rule.id] for rule in decision.rule_results if not rule.passed and rule.id in RECOMMENDATIONS_MAP]
+        recs = [RECOMMENDATIONS_MAP[rule_id] for rule_id, _ in failed if rule_id in RECOMMENDATIONS_MAP]
         recommendations_str = "\n- ".join(recs) if recs else "Revisar el perfil crediticio y financiero general."
 
         return FALLBACK_TEMPLATE_REJECTED.format(failed_rules_list=failed_rules_str, recommendations=recommendations_str)
 
-def explain_decision(decision: Decision, provider: Optional[str] = None) -> str:
-    """Genera una explicación de la decisión, usando un LLM si se especifica, o un fallback local."""
-    google_api_key = os.getenv("GOOGLE_API_KEY")
-    openai_api_key = os.getenv("OPENAI_API_KEY")
-
-    use_llm = False
-    if provider == "gemini" and google_api_key:
-        use_llm = True
-        # TODO: Implementar lógica para llamar a la API de Gemini
-        # Por ahora, usará el fallback.
-        pass
-    elif provider == "openai" and openai_api_key:
-        use_llm = True
-        # TODO: Implementar lógica para llamar a la API de OpenAI
-        # Por ahora, usará el fallback.
-        pass
-
-    if use_llm:
+def _effective_provider(provider: Optional[str]) -> Optional[str]:
+    """El proveedor que se usará de verdad: None (plantilla local) si no se pidió o no tiene API key."""
+    if provider == "gemini" and os.getenv("GOOGLE_API_KEY"):
+        return provider
+    if provider == "openai" and os.getenv("OPENAI_API_KEY"):
+        return provider
+    return None
+
+@lru_cache(maxsize=int(os.getenv("EXPLANATION_CACHE_SIZE", "4096")))
+def _render(signature: Signature, provider: Optional[str]) -> str:
+    """Arma la explicación de una firma (memoizada por firma y proveedor efectivo)."""
+    if provider is not None:
+        # TODO: Implementar lógica para llamar a la API de Gemini / OpenAI.
         # Esta es una implementación de placeholder. La lógica real del LLM iría aquí.
         print(f"(Simulando llamada a LLM con proveedor: {provider}...)")
         # En una implementación real, aquí se construiría el prompt y se llamaría al LLM.
         # Si la llamada al LLM falla, también debería caer en el fallback.
-        return _generate_fallback_explanation(decision) # Placeholder, devuelve el fallback por ahora.
-    else:
-        # Genera la explicación usando la plantilla local si no se especifica un proveedor o no hay API key.
-        return _generate_fallback_explanation(decision)
+        return _generate_fallback_explanation(signature) # Placeholder, devuelve el fallback por ahora.
+    # Genera la explicación usando la plantilla local si no se especifica un proveedor o no hay API key.
+    return _generate_fallback_explanation(signature)
+
+@metrics.timed(metrics.STAGE_SECONDS, stage="explanation")
+def explain_decision(decision: Decision, provider: Optional[str] = None) -> str:
+    """Genera una explicación de la decisión, usando un LLM si se especifica, o un fallback local.
+
+    Dos decisiones con el mismo veredicto y las mismas reglas fallidas comparten la explicación.
+    """
+    return _render(explanation_signature(decision), _effective_provider(provider))
+
+def prime_explanations(plan, providers: Iterable[Optional[str]] = (None,)) -> int:
+    """Arma y memoiza las explicaciones de todas las combinaciones de reglas fallidas del plan.
+
+    Returns:
+        int: Cantidad de firmas precalculadas (0 si el plan tiene más de PRIME_MAX_RULES reglas).
+    """
+    rules = [(rule.id, rule.failure_reason) for rule in plan.rules]
+    if len(rules) > PRIME_MAX_RULES:
+        logger.info(f"[EXPLAIN] {len(rules)} reglas: no se precalculan las 2^{len(rules)} explicaciones.")
+        return 0
+    primed = 0
+    for provider in {_effective_provider(p) for p in providers}:
+        for passed in itertools.product((True, False), repeat=len(rules)):
+            approved = all(passed) if plan.logic == 'all' else any(passed)
+            failed = tuple(rule for rule, ok in zip(rules, passed) if not ok)
+            _render((approved, failed), provider)
+            primed += 1
+    return primed
+
+def explanation_cache_info() -> Dict[str, int]:
+    """Aciertos, fallos y tamaño de la caché de explicaciones."""
+    info = _render.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "max_size": info.maxsize}
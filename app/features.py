@@ -0,0 +1,337 @@
+# -*- coding: utf-8 -*-
+"""Almacén persistente de extracciones para volver a decidir sin volver a extraer.
+
+Cada carta procesada en lote deja su `ApplicationExtract` en un SQLite local, con una columna
+por campo de la extracción (ej. "financials.income_monthly", "raw_letter") y la clave
+`letter_id`, más el hash de la carta. Junto a ella se guarda la decisión de cada versión del
+ruleset (`decisions`, por `rules_version`).
+
+`rescore` aplica un ruleset nuevo solo sobre lo guardado: lee únicamente las columnas que usa
+el plan (`vectorized.required_fields`), las evalúa por bloques con `vectorized.evaluate_columns`
+y guarda las decisiones nuevas. Con `diff=True` las compara con las de otra versión (por defecto,
+la corrida anterior): cuántas pasan de aprobadas a rechazadas, al revés, y cuántas cambian de
+reglas fallidas.
+
+Variables de entorno: FEATURE_STORE (1/0, por defecto 0), FEATURE_STORE_PATH.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import typing
+from operator import attrgetter
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from pydantic import BaseModel
+
+from app.rules import RulePlan
+from app.schema import ApplicationExtract
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Filas por bloque de lectura en `rescore`.
+RESCORE_CHUNK_SIZE = 100_000
+
+_SQL_TYPES = {int: "INTEGER", bool: "INTEGER", float: "REAL", str: "TEXT"}
+
+def _leaf_fields(model: type, prefix: str = "") -> List[Tuple[str, type]]:
+    """Rutas con puntos de los campos hoja de un modelo y su tipo base (sin Optional)."""
+    leaves = []
+    for name, info in model.model_fields.items():
+        annotation = info.annotation
+        if typing.get_origin(annotation) is typing.Union:
+            annotation = next(arg for arg in typing.get_args(annotation) if arg is not type(None))
+        if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+            leaves.extend(_leaf_fields(annotation, f"{prefix}{name}."))
+        else:
+            leaves.append((f"{prefix}{name}", annotation))
+    return leaves
+
+# Campo de la extracción -> tipo; cada uno es una columna de la tabla `features`.
+FEATURE_FIELDS: Dict[str, type] = dict(_leaf_fields(ApplicationExtract))
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+def letter_hash(letter: str) -> str:
+    """SHA-256 del texto de la carta (detecta si un mismo id cambió de contenido)."""
+    return hashlib.sha256(letter.encode("utf-8")).hexdigest()
+
+def _nest(paths: Sequence[str], values: Sequence[Any]) -> Dict[str, Any]:
+    """Arma el diccionario anidado del modelo a partir de columnas con rutas con puntos."""
+    data: Dict[str, Any] = {}
+    for path, value in zip(paths, values):
+        *parents, leaf = path.split(".")
+        node = data
+        for parent in parents:
+            node = node.setdefault(parent, {})
+        node[leaf] = value
+    return data
+
+class FeatureStore:
+    """Extracciones por carta y decisiones por versión del ruleset, en SQLite (WAL)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._getters = [(path, attrgetter(path)) for path in FEATURE_FIELDS]
+
+    # --- SQLite ---
+
+    def _db(self) -> sqlite3.Connection:
+        """Conexión SQLite de este hilo (se abre y se migra la primera vez que se usa)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            columns = ", ".join(f"{_quote(path)} {_SQL_TYPES.get(kind, 'TEXT')}" for path, kind in FEATURE_FIELDS.items())
+            conn.execute("CREATE TABLE IF NOT EXISTS features (letter_id TEXT PRIMARY KEY, letter_hash TEXT NOT NULL, "
+                         f"extractor_version TEXT, updated_at REAL NOT NULL, {columns})")
+            # Campos agregados al modelo después de crear la tabla: columnas nuevas (NULL en las filas viejas).
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(features)")}
+            for path, kind in FEATURE_FIELDS.items():
+                if path not in existing:
+                    conn.execute(f"ALTER TABLE features ADD COLUMN {_quote(path)} {_SQL_TYPES.get(kind, 'TEXT')}")
+            conn.execute("CREATE TABLE IF NOT EXISTS decisions (rules_version TEXT NOT NULL, letter_id TEXT NOT NULL, "
+                         "approved INTEGER NOT NULL, risk_score REAL NOT NULL, failed_rules TEXT NOT NULL, "
+                         "PRIMARY KEY (rules_version, letter_id))")
+            conn.execute("CREATE TABLE IF NOT EXISTS runs (rules_version TEXT PRIMARY KEY, rules_path TEXT, "
+                         "rows INTEGER, updated_at REAL NOT NULL)")
+            self._local.conn = conn
+        return conn
+
+    # --- Escritura ---
+
+    def save(self, rows: Iterable[Tuple[Any, ApplicationExtract, bool, float, List[str]]], plan: RulePlan,
+             rules_path: Optional[str] = None) -> int:
+        """Guarda (id, extracción, aprobado, riesgo, reglas fallidas) de un bloque en una sola transacción.
+
+        Si el id ya existía se reemplaza su extracción; la decisión queda bajo `plan.version`.
+        """
+        from app.llm_extractor import EXTRACTOR_VERSION
+
+        now = time.time()
+        version = plan.version or ""
+        features, decisions = [], []
+        for letter_id, extracted, approved, risk_score, failed_rules in rows:
+            letter_id = str(letter_id)
+            features.append((letter_id, letter_hash(extracted.raw_letter), EXTRACTOR_VERSION, now,
+                             *(get(extracted) for _, get in self._getters)))
+            decisions.append((version, letter_id, bool(approved), float(risk_score), json.dumps(list(failed_rules))))
+        if not features:
+            return 0
+        columns = ", ".join(_quote(path) for path in FEATURE_FIELDS)
+        placeholders = ", ".join("?" * (4 + len(FEATURE_FIELDS)))
+        db = self._db()
+        db.execute("BEGIN")
+        try:
+            db.executemany(f"INSERT OR REPLACE INTO features (letter_id, letter_hash, extractor_version, updated_at, "
+                           f"{columns}) VALUES ({placeholders})", features)
+            self._save_decisions(db, decisions, version, rules_path, now)
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        return len(features)
+
+    @staticmethod
+    def _save_decisions(db: sqlite3.Connection, decisions: List[tuple], version: str, rules_path: Optional[str],
+                        now: float) -> None:
+        db.executemany("INSERT OR REPLACE INTO decisions (rules_version, letter_id, approved, risk_score, failed_rules) "
+                       "VALUES (?, ?, ?, ?, ?)", decisions)
+        db.execute("INSERT INTO runs (rules_version, rules_path, rows, updated_at) VALUES (?, ?, NULL, ?) "
+                   "ON CONFLICT(rules_version) DO UPDATE SET updated_at = excluded.updated_at, "
+                   "rules_path = COALESCE(excluded.rules_path, runs.rules_path)", (version, rules_path, now))
+
+    # --- Lectura ---
+
+    def get(self, letter_id: Any) -> Optional[ApplicationExtract]:
+        """Reconstruye la extracción guardada de una carta (None si no está)."""
+        columns = ", ".join(_quote(path) for path in FEATURE_FIELDS)
+        row = self._db().execute(f"SELECT {columns} FROM features WHERE letter_id = ?", (str(letter_id),)).fetchone()
+        return ApplicationExtract.model_validate(_nest(list(FEATURE_FIELDS), row)) if row is not None else None
+
+    def previous_version(self, rules_version: str) -> Optional[str]:
+        """La versión del ruleset de la corrida más reciente distinta de `rules_version`."""
+        row = self._db().execute("SELECT rules_version FROM runs WHERE rules_version != ? ORDER BY updated_at DESC "
+                                 "LIMIT 1", (rules_version,)).fetchone()
+        return row[0] if row is not None else None
+
+    def stats(self) -> Dict[str, object]:
+        """Cantidad de cartas guardadas y corridas (versiones del ruleset) con sus decisiones."""
+        db = self._db()
+        runs = [{"rules_version": version, "rules_path": path, "decisions": count, "updated_at": updated}
+                for version, path, updated, count in db.execute(
+                    "SELECT r.rules_version, r.rules_path, r.updated_at, "
+                    "(SELECT COUNT(*) FROM decisions d WHERE d.rules_version = r.rules_version) "
+                    "FROM runs r ORDER BY r.updated_at DESC")]
+        return {"path": self.path, "letters": db.execute("SELECT COUNT(*) FROM features").fetchone()[0], "runs": runs}
+
+    # --- Re-evaluación ---
+
+    def _columns(self, rows: List[tuple], fields: Sequence[str]) -> Dict[str, "np.ndarray"]:
+        """Pasa las filas leídas de SQLite a columnas de NumPy (los booleanos vuelven a bool)."""
+        import numpy as np
+        from app.vectorized import as_column
+
+        columns = {}
+        for path, values in zip(fields, zip(*rows)):
+            values = list(values)
+            if FEATURE_FIELDS[path] is bool and None not in values:
+                columns[path] = np.asarray(values, dtype=bool)
+            else:
+                columns[path] = as_column(values)
+        return columns
+
+    def columns(self, fields: Sequence[str], limit: Optional[int] = None) -> Tuple[List[str], Dict[str, "np.ndarray"]]:
+        """Ids y columnas (campo -> arreglo) de las cartas guardadas, leyendo solo los campos pedidos."""
+        unknown = [path for path in fields if path not in FEATURE_FIELDS]
+        if unknown:
+            raise ValueError(f"Campos que no están en el almacén de extracciones: {', '.join(unknown)}.")
+        query = f"SELECT letter_id, {', '.join(_quote(path) for path in fields)} FROM features"
+        rows = self._db().execute(query + (" LIMIT ?" if limit is not None else ""),
+                                  (limit,) if limit is not None else ()).fetchall()
+        return [row[0] for row in rows], self._columns([row[1:] for row in rows], fields) if rows else {}
+
+    def rescore(self, plan: RulePlan, rules_path: Optional[str] = None, diff: bool = False,
+                compare_to: Optional[str] = None, output_path: Optional[str] = None, fmt: Optional[str] = None,
+                chunksize: int = RESCORE_CHUNK_SIZE, changes_limit: int = 100) -> Dict[str, Any]:
+        """Vuelve a decidir todas las cartas guardadas con `plan`, sin extraer de nuevo.
+
+        Args:
+            plan (RulePlan): El ruleset a aplicar (ver `app.registry.get_rules`).
+            rules_path (str, opcional): Ruta del ruleset, solo para registrar la corrida.
+            diff (bool): Si se comparan las decisiones nuevas con las de otra versión.
+            compare_to (str, opcional): Versión contra la que comparar (por defecto, la corrida anterior).
+            output_path (str, opcional): Archivo de resultados (CSV, NDJSON, Parquet o Arrow, ver `app.writers`).
+            chunksize (int): Filas leídas y evaluadas por bloque.
+            changes_limit (int): Máximo de cartas con cambios que se listan en `diff.changes`.
+
+        Returns:
+            dict: `rules_version`, `rows`, `approved`, `rejected`, `seconds` y `diff` (None sin `diff=True`
+            o si no hay otra versión con la que comparar).
+        """
+        import pandas as pd
+        from app.vectorized import OUTPUT_FIELDS, column, evaluate_columns, required_fields
+
+        start = time.perf_counter()
+        fields = required_fields(plan)
+        unknown = [path for path in fields if path not in FEATURE_FIELDS]
+        if unknown:
+            raise ValueError(f"El ruleset usa campos que no están en el almacén de extracciones: {', '.join(unknown)}.")
+        version = plan.version or ""
+        diff = diff or compare_to is not None
+        if diff and compare_to is None:
+            compare_to = self.previous_version(version)
+
+        writer = None
+        if output_path is not None:
+            from app.batch import RESULT_COLUMNS, stream_frame
+            from app.writers import open_writer
+            writer = open_writer(output_path, fmt)
+
+        db = self._db()
+        rows = approved_total = 0
+        now = time.time()
+        # Un bloque por consulta (en orden de letter_id) y una transacción por bloque: el lock de escritura de
+        # SQLite se suelta entre bloques, así /decision con FEATURE_STORE=1 puede guardar durante el rescore.
+        select = f"SELECT letter_id, {', '.join(_quote(path) for path in fields)} FROM features"
+        last_id = None
+        try:
+            while True:
+                if last_id is None:
+                    chunk = db.execute(f"{select} ORDER BY letter_id LIMIT ?", (chunksize,)).fetchall()
+                else:
+                    chunk = db.execute(f"{select} WHERE letter_id > ? ORDER BY letter_id LIMIT ?",
+                                       (last_id, chunksize)).fetchall()
+                if not chunk:
+                    break
+                ids = [row[0] for row in chunk]
+                last_id = ids[-1]
+                columns = self._columns([row[1:] for row in chunk], fields)
+                result = evaluate_columns(columns, plan)
+                # El JSON de las reglas fallidas se arma una vez por combinación (las listas se comparten entre filas).
+                encoded: Dict[int, str] = {}
+                failed_json = [encoded.get(id(rules)) or encoded.setdefault(id(rules), json.dumps(rules))
+                               for rules in result["failed_rules_list"]]
+                db.execute("BEGIN")
+                try:
+                    self._save_decisions(db, list(zip([version] * len(ids), ids, result["approved"].tolist(),
+                                                      result["risk_score"].tolist(), failed_json)),
+                                         version, rules_path, now)
+                    db.execute("COMMIT")
+                except BaseException:
+                    db.execute("ROLLBACK")
+                    raise
+                if writer is not None:
+                    frame = pd.DataFrame({
+                        "id": ids,
+                        "approved": result["approved"],
+                        "risk_score": result["risk_score"],
+                        "failed_rules": result["failed_rules_list" if writer.list_rules else "failed_rules"],
+                        **{name: column(columns, path) for name, path in OUTPUT_FIELDS.items()},
+                    }, columns=RESULT_COLUMNS)
+                    writer.write(stream_frame(frame, writer.list_rules))
+                rows += len(ids)
+                approved_total += int(result["approved"].sum())
+            db.execute("UPDATE runs SET rows = ? WHERE rules_version = ?", (rows, version))
+        finally:
+            if writer is not None:
+                writer.close()
+
+        summary: Dict[str, Any] = {"rules_version": version, "rows": rows, "approved": approved_total,
+                                   "rejected": rows - approved_total, "diff": None}
+        if diff and compare_to is not None:
+            summary["diff"] = self.diff(version, compare_to, changes_limit)
+        summary["seconds"] = time.perf_counter() - start
+        return summary
+
+    def diff(self, rules_version: str, compare_to: str, changes_limit: int = 100) -> Dict[str, Any]:
+        """Compara las decisiones guardadas de dos versiones del ruleset sobre las cartas que tienen ambas."""
+        db = self._db()
+        compared, to_rejected, to_approved, rules_changed = db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(o.approved > n.approved), 0), COALESCE(SUM(o.approved < n.approved), 0), "
+            "COALESCE(SUM(o.failed_rules != n.failed_rules), 0) FROM decisions n "
+            "JOIN decisions o ON o.rules_version = ? AND o.letter_id = n.letter_id WHERE n.rules_version = ?",
+            (compare_to, rules_version)).fetchone()
+        changes = [{"id": letter_id, "previous_approved": bool(old_approved), "approved": bool(new_approved),
+                    "previous_failed_rules": json.loads(old_rules), "failed_rules": json.loads(new_rules)}
+                   for letter_id, old_approved, new_approved, old_rules, new_rules in db.execute(
+                       "SELECT n.letter_id, o.approved, n.approved, o.failed_rules, n.failed_rules FROM decisions n "
+                       "JOIN decisions o ON o.rules_version = ? AND o.letter_id = n.letter_id "
+                       "WHERE n.rules_version = ? AND o.approved != n.approved LIMIT ?",
+                       (compare_to, rules_version, changes_limit))]
+        return {"compare_to": compare_to, "compared": compared, "approved_to_rejected": to_rejected,
+                "rejected_to_approved": to_approved, "failed_rules_changed": rules_changed, "changes": changes}
+
+# --- Instancia del Proceso ---
+
+_store: Optional[FeatureStore] = None
+_store_lock = threading.Lock()
+
+def feature_store_path() -> str:
+    return os.getenv("FEATURE_STORE_PATH", os.path.join(".cache", "features.sqlite3"))
+
+def get_feature_store() -> Optional[FeatureStore]:
+    """Devuelve el almacén del proceso (creado desde las variables de entorno), o None si está desactivado."""
+    global _store
+    if os.getenv("FEATURE_STORE", "0") != "1":
+        return None
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = FeatureStore(feature_store_path())
+    return _store
+
+def set_feature_store(store: Optional[FeatureStore]) -> None:
+    """Reemplaza el almacén del proceso (útil en pruebas o para configurarlo por código)."""
+    global _store
+    with _store_lock:
+        _store = store
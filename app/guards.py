@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""Protección por proveedor LLM: circuit breaker y limitador token-bucket.
+
+Un `ProviderGuard` por proveedor ("gemini", "openai"), compartido por todo el proceso: la API,
+`evaluate_batch` y los workers de /jobs pasan por las mismas instancias (`get_guard`).
+
+- Circuit breaker: después de `FAILURES` errores dentro de `WINDOW` segundos se abre y, durante
+  `COOLDOWN` segundos, `app.llm_extractor` manda las cartas al otro proveedor configurado o
+  directo al fallback por regex, sin pagar una llamada de red fallida por carta. Pasado el
+  cooldown queda medio abierto: deja pasar una sola llamada de prueba, que lo cierra si sale bien
+  o lo vuelve a abrir si falla.
+- Limitador: dos cubetas de tokens, solicitudes por segundo (`RPS`) y tokens por minuto (`TPM`,
+  estimados del prompt más la salida reservada). Cada llamada reserva su cupo y espera lo que
+  falte; si la espera supera `MAX_WAIT` segundos no reserva nada y la carta va al fallback
+  (`ProviderBusy`) en lugar de terminar en un 429 del proveedor.
+
+Variables de entorno (`LLM_<NOMBRE>`, o `GEMINI_<NOMBRE>` / `OPENAI_<NOMBRE>` para un proveedor):
+BREAKER_FAILURES (5), BREAKER_WINDOW (60), BREAKER_COOLDOWN (30), RPS (0 = sin límite),
+TPM (0 = sin límite), LIMIT_MAX_WAIT (30).
+
+El estado de cada breaker y la cola del limitador se ven en `GET /providers/status` y en
+`/metrics` (`credit_llm_breaker_state`, `credit_llm_limiter_queue`). Con varios workers de
+uvicorn cada proceso tiene sus propios contadores.
+"""
+import os
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from app import metrics
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+class ProviderBusy(Exception):
+    """El limitador del proveedor no tiene cupo dentro de la espera máxima."""
+
+def _setting(provider: str, name: str, default: str) -> float:
+    """Valor de `<PROVEEDOR>_<NOMBRE>`, o de `LLM_<NOMBRE>` si no está definido para el proveedor."""
+    return float(os.getenv(f"{provider.upper()}_{name}", os.getenv(f"LLM_{name}", default)))
+
+# --- Circuit Breaker ---
+
+class CircuitBreaker:
+    """Se abre tras `failures` errores en `window` segundos y se mantiene abierto `cooldown` segundos."""
+
+    def __init__(self, failures: int = 5, window: float = 60.0, cooldown: float = 30.0):
+        self.failures = max(1, failures)
+        self.window = window
+        self.cooldown = cooldown
+        self._errors: Deque[float] = deque()
+        self._opened_at: Optional[float] = None
+        self._probe_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _state(self, now: float) -> str:
+        if self._opened_at is None:
+            return CLOSED
+        return OPEN if now - self._opened_at < self.cooldown else HALF_OPEN
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state(time.monotonic())
+
+    def allow(self) -> bool:
+        """True si se puede llamar al proveedor (medio abierto: solo una llamada de prueba a la vez)."""
+        now = time.monotonic()
+        with self._lock:
+            state = self._state(now)
+            if state == CLOSED:
+                return True
+            if state == OPEN:
+                return False
+            # Una prueba que no reportó resultado en un cooldown (ej. respondió la caché) no bloquea a las siguientes.
+            if self._probe_at is not None and now - self._probe_at < self.cooldown:
+                return False
+            self._probe_at = now
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._errors.clear()
+            self._opened_at = self._probe_at = None
+
+    def record_failure(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if self._state(now) == HALF_OPEN:
+                # Falló la llamada de prueba: otro cooldown completo.
+                self._opened_at, self._probe_at = now, None
+                return
+            self._errors.append(now)
+            while self._errors and now - self._errors[0] > self.window:
+                self._errors.popleft()
+            if len(self._errors) >= self.failures:
+                self._errors.clear()
+                self._opened_at, self._probe_at = now, None
+
+    def snapshot(self) -> Dict[str, object]:
+        now = time.monotonic()
+        with self._lock:
+            state = self._state(now)
+            return {"state": state, "recent_failures": len(self._errors),
+                    "reopens_in_s": round(self.cooldown - (now - self._opened_at), 3) if state == OPEN else 0.0}
+
+# --- Limitador Token-Bucket ---
+
+class TokenBucket:
+    """Cubeta de `capacity` unidades que se recarga a `rate` unidades por segundo (rate <= 0: sin límite).
+
+    `RateLimiter.reserve` descuenta el cupo aunque quede negativo y devuelve cuánto hay que esperar hasta que
+    la deuda se pague: las llamadas quedan en fila en orden de llegada.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self._level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_for(self, amount: float, now: float) -> float:
+        """Segundos hasta que haya `amount` unidades (sin reservarlas)."""
+        if self.rate <= 0:
+            return 0.0
+        self._refill(now)
+        return max(0.0, (min(amount, self.capacity) - self._level) / self.rate)
+
+    def take(self, amount: float) -> None:
+        if self.rate > 0:
+            self._level -= min(amount, self.capacity)
+
+class RateLimiter:
+    """Solicitudes por segundo y tokens por minuto de un proveedor, con una espera máxima por llamada."""
+
+    def __init__(self, rps: float = 0.0, tpm: float = 0.0, max_wait: float = 30.0):
+        self.requests = TokenBucket(rps, rps)
+        self.tokens = TokenBucket(tpm / 60, tpm)
+        self.max_wait = max_wait
+        self.waiting = 0
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: int) -> float:
+        """Reserva una solicitud y `tokens` tokens; devuelve los segundos a esperar.
+
+        Raises:
+            ProviderBusy: si la espera supera `max_wait` (en ese caso no se reserva nada).
+        """
+        now = time.monotonic()
+        with self._lock:
+            wait = max(self.requests.wait_for(1, now), self.tokens.wait_for(tokens, now))
+            if wait > self.max_wait:
+                raise ProviderBusy(f"sin cupo en el limitador durante {self.max_wait:g}s")
+            self.requests.take(1)
+            self.tokens.take(tokens)
+            return wait
+
+# --- Protección por Proveedor ---
+
+class ProviderGuard:
+    """Breaker + limitador de un proveedor, con su estado publicado en las métricas."""
+
+    def __init__(self, provider: str, breaker: CircuitBreaker, limiter: RateLimiter):
+        self.provider = provider
+        self.breaker = breaker
+        self.limiter = limiter
+
+    @classmethod
+    def from_env(cls, provider: str) -> "ProviderGuard":
+        breaker = CircuitBreaker(int(_setting(provider, "BREAKER_FAILURES", "5")),
+                                 _setting(provider, "BREAKER_WINDOW", "60"), _setting(provider, "BREAKER_COOLDOWN", "30"))
+        limiter = RateLimiter(_setting(provider, "RPS", "0"), _setting(provider, "TPM", "0"),
+                              _setting(provider, "LIMIT_MAX_WAIT", "30"))
+        return cls(provider, breaker, limiter)
+
+    def _publish(self) -> None:
+        metrics.LLM_BREAKER_STATE.set(_STATE_VALUES[self.breaker.state], provider=self.provider)
+
+    def allow(self) -> bool:
+        allowed = self.breaker.allow()
+        if not allowed:
+            metrics.LLM_BREAKER_REJECTIONS.inc(provider=self.provider)
+        self._publish()
+        return allowed
+
+    def record_success(self) -> None:
+        self.breaker.record_success()
+        self._publish()
+
+    def record_failure(self) -> None:
+        self.breaker.record_failure()
+        self._publish()
+
+    def _queued(self, delta: int) -> None:
+        with self.limiter._lock:
+            self.limiter.waiting += delta
+            waiting = self.limiter.waiting
+        metrics.LLM_LIMITER_QUEUE.set(waiting, provider=self.provider)
+
+    def acquire(self, tokens: int) -> None:
+        """Espera (bloqueando el hilo) el cupo del limitador para una llamada de `tokens` tokens."""
+        wait = self.limiter.reserve(tokens)
+        if wait > 0:
+            self._queued(1)
+            try:
+                time.sleep(wait)
+            finally:
+                self._queued(-1)
+
+    async def acquire_async(self, tokens: int) -> None:
+        """Igual que `acquire`, sin bloquear el event loop."""
+        import asyncio
+
+        wait = self.limiter.reserve(tokens)
+        if wait > 0:
+            self._queued(1)
+            try:
+                await asyncio.sleep(wait)
+            finally:
+                self._queued(-1)
+
+    def snapshot(self) -> Dict[str, object]:
+        return {"provider": self.provider, **self.breaker.snapshot(), "limiter_queue": self.limiter.waiting,
+                "rps": self.limiter.requests.rate, "tpm": self.limiter.tokens.rate * 60}
+
+_guards: Dict[str, ProviderGuard] = {}
+_guards_lock = threading.Lock()
+
+def get_guard(provider: str) -> ProviderGuard:
+    """La protección del proveedor para todo el proceso (creada desde las variables de entorno)."""
+    guard = _guards.get(provider)
+    if guard is None:
+        with _guards_lock:
+            guard = _guards.get(provider)
+            if guard is None:
+                guard = _guards[provider] = ProviderGuard.from_env(provider)
+    return guard
+
+def set_guard(provider: str, guard: Optional[ProviderGuard]) -> None:
+    """Reemplaza la protección de un proveedor (None: se vuelve a crear desde el entorno al pedirla)."""
+    with _guards_lock:
+        if guard is None:
+            _guards.pop(provider, None)
+        else:
+            _guards[provider] = guard
+
+def guards_status() -> Dict[str, Dict[str, object]]:
+    """Estado del breaker y del limitador de cada proveedor usado en este proceso."""
+    with _guards_lock:
+        guards = list(_guards.values())
+    return {guard.provider: guard.snapshot() for guard in guards}
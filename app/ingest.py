@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""Lectura incremental de cartas desde carpetas y archivos comprimidos.
+
+`iter_letters` recorre una carpeta con `os.scandir` (recursivo), un `.tar`/`.tar.gz`/`.tgz` o un
+`.zip` y devuelve las cartas una a una como `{"id", "letter"}`, la misma forma que recibe
+`evaluate_batch`. Nunca hay más de una carta leída por delante de la que se procesa, salvo con
+`prefetch`: un hilo lector adelanta hasta N cartas para superponer la E/S con la extracción.
+
+Los ids son la ruta relativa a la carpeta (con `/`) o el nombre del miembro dentro del archivo;
+para los `.txt` del primer nivel coinciden con el nombre de archivo. Los archivos que superan
+`max_bytes` o que no son UTF-8 válido se saltan con una advertencia en el log.
+
+Variables de entorno:
+- INGEST_MAX_BYTES: tamaño máximo por carta, en bytes (por defecto 1 MiB).
+- INGEST_PREFETCH: cartas leídas por adelantado en la CLI (por defecto 64; 0 lee en el mismo hilo).
+"""
+import fnmatch
+import logging
+import os
+import queue
+import tarfile
+import threading
+import zipfile
+from typing import Dict, Iterable, Iterator, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+
+def max_bytes() -> int:
+    return int(os.getenv("INGEST_MAX_BYTES", str(1 << 20)))
+
+def prefetch_size() -> int:
+    return int(os.getenv("INGEST_PREFETCH", "64"))
+
+def _decode(letter_id: str, data: bytes, encoding: str) -> Optional[Dict[str, str]]:
+    try:
+        return {"id": letter_id, "letter": data.decode(encoding)}
+    except UnicodeDecodeError as e:
+        logger.warning(f"[INGEST] Se omite '{letter_id}': no es {encoding} válido ({e}).")
+        return None
+
+def _too_large(letter_id: str, size: int, limit: int) -> bool:
+    if size > limit:
+        logger.warning(f"[INGEST] Se omite '{letter_id}': {size} bytes superan el límite de {limit}.")
+        return True
+    return False
+
+# --- Fuentes ---
+
+def iter_folder(folder_path: str, pattern: str = "*.txt", recursive: bool = True,
+                limit: Optional[int] = None, encoding: str = "utf-8") -> Iterator[Dict[str, str]]:
+    """Cartas de una carpeta (y sus subcarpetas), en orden alfabético dentro de cada carpeta."""
+    limit = max_bytes() if limit is None else limit
+    pending = [folder_path]
+    while pending:
+        directory = pending.pop()
+        with os.scandir(directory) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
+        subdirs = []
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.path)
+            elif entry.is_file() and fnmatch.fnmatch(entry.name, pattern):
+                letter_id = os.path.relpath(entry.path, folder_path).replace(os.sep, "/")
+                # El tamaño viene del propio scandir (sin un stat extra en la mayoría de los sistemas).
+                if _too_large(letter_id, entry.stat().st_size, limit):
+                    continue
+                with open(entry.path, 'rb') as f:
+                    item = _decode(letter_id, f.read(), encoding)
+                if item is not None:
+                    yield item
+        if recursive:
+            # Pila en orden inverso: las subcarpetas se recorren en orden alfabético.
+            pending.extend(reversed(subdirs))
+
+def iter_tar(archive_path: str, pattern: str = "*.txt", limit: Optional[int] = None,
+             encoding: str = "utf-8") -> Iterator[Dict[str, str]]:
+    """Cartas de un archivo tar (comprimido o no), leído en modo secuencial sin descomprimir a disco."""
+    limit = max_bytes() if limit is None else limit
+    # "r|*" lee el tar como un flujo: no hace falta recorrer el índice completo antes de la primera carta.
+    with tarfile.open(archive_path, "r|*") as tar:
+        for member in tar:
+            if not member.isfile() or not fnmatch.fnmatch(os.path.basename(member.name), pattern):
+                continue
+            if _too_large(member.name, member.size, limit):
+                continue
+            item = _decode(member.name, tar.extractfile(member).read(), encoding)
+            if item is not None:
+                yield item
+
+def iter_zip(archive_path: str, pattern: str = "*.txt", limit: Optional[int] = None,
+             encoding: str = "utf-8") -> Iterator[Dict[str, str]]:
+    """Cartas de un archivo zip, una a una (el tamaño se valida con el índice antes de descomprimir)."""
+    limit = max_bytes() if limit is None else limit
+    with zipfile.ZipFile(archive_path) as archive:
+        for info in archive.infolist():
+            if info.is_dir() or not fnmatch.fnmatch(os.path.basename(info.filename), pattern):
+                continue
+            if _too_large(info.filename, info.file_size, limit):
+                continue
+            item = _decode(info.filename, archive.read(info), encoding)
+            if item is not None:
+                yield item
+
+def iter_letters(path: str, pattern: str = "*.txt", recursive: bool = True, limit: Optional[int] = None,
+                 prefetch: int = 0, encoding: str = "utf-8") -> Iterator[Dict[str, str]]:
+    """Cartas de una carpeta, un tar, un zip o un único archivo, como generador de `{"id", "letter"}`.
+
+    Args:
+        path: carpeta, archivo `.tar*`/`.tgz`/`.zip` o archivo de texto suelto.
+        pattern: patrón de nombre de archivo (fnmatch) de las cartas.
+        recursive: en carpetas, si se recorren también las subcarpetas.
+        limit: tamaño máximo por carta en bytes (por defecto INGEST_MAX_BYTES).
+        prefetch: cartas leídas por adelantado en un hilo aparte (0 = sin hilo).
+    """
+    lower = path.lower()
+    if os.path.isdir(path):
+        letters = iter_folder(path, pattern, recursive, limit, encoding)
+    elif lower.endswith(TAR_SUFFIXES):
+        letters = iter_tar(path, pattern, limit, encoding)
+    elif lower.endswith(".zip"):
+        letters = iter_zip(path, pattern, limit, encoding)
+    elif os.path.isfile(path):
+        letters = _iter_file(path, limit, encoding)
+    else:
+        raise FileNotFoundError(f"No existe la carpeta o archivo de cartas '{path}'.")
+    return read_ahead(letters, prefetch) if prefetch > 0 else letters
+
+def _iter_file(path: str, limit: Optional[int], encoding: str) -> Iterator[Dict[str, str]]:
+    limit = max_bytes() if limit is None else limit
+    letter_id = os.path.basename(path)
+    if not _too_large(letter_id, os.path.getsize(path), limit):
+        with open(path, 'rb') as f:
+            item = _decode(letter_id, f.read(), encoding)
+        if item is not None:
+            yield item
+
+# --- Lectura Anticipada ---
+
+class _Failure:
+    """Excepción del hilo lector, que se vuelve a lanzar en el consumidor."""
+    __slots__ = ("error",)
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+_END = object()
+
+def read_ahead(items: Iterable[T], size: int = 64) -> Iterator[T]:
+    """Consume `items` en un hilo aparte con hasta `size` elementos adelantados (cola acotada).
+
+    Mientras el consumidor procesa una carta, el hilo ya está leyendo las siguientes del disco o
+    del archivo comprimido. Si el consumidor deja de iterar, el hilo se detiene en la siguiente carta.
+    """
+    buffer: "queue.Queue" = queue.Queue(maxsize=max(1, size))
+    stop = threading.Event()
+
+    def put(value) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(value, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put(item):
+                    return
+            put(_END)
+        except BaseException as e:
+            put(_Failure(e))
+
+    reader = threading.Thread(target=produce, name="ingest-prefetch", daemon=True)
+    reader.start()
+    try:
+        while True:
+            value = buffer.get()
+            if value is _END:
+                return
+            if isinstance(value, _Failure):
+                raise value.error
+            yield value
+    finally:
+        stop.set()
@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+"""Cola de trabajos por lotes en segundo plano, persistida en SQLite.
+
+`POST /jobs` guarda el lote (o la ruta del CSV) y devuelve un id; un pool de hilos locales lo
+procesa por bloques y va guardando cada fila de resultados junto con el progreso en la misma
+transacción. Si el proceso se reinicia, los trabajos pendientes o a medias se retoman desde la
+última fila guardada. No hace falta ningún broker externo.
+
+Variables de entorno: JOBS_DB_PATH, JOBS_WORKERS, JOBS_CSV_DIR (carpeta de la que se permiten
+leer CSVs del servidor).
+"""
+import json
+import logging
+import math
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, Iterator, List, Optional
+
+from app import batch
+from app.registry import get_rules
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    source TEXT NOT NULL,
+    csv_path TEXT,
+    options TEXT NOT NULL,
+    total INTEGER,
+    done INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS job_items (
+    job_id TEXT NOT NULL, seq INTEGER NOT NULL, item_id TEXT NOT NULL, letter TEXT NOT NULL,
+    PRIMARY KEY (job_id, seq)
+);
+CREATE TABLE IF NOT EXISTS job_results (
+    job_id TEXT NOT NULL, seq INTEGER NOT NULL, row TEXT NOT NULL,
+    PRIMARY KEY (job_id, seq)
+);
+"""
+
+_STATUS_FIELDS = ("id", "status", "total", "done", "created_at", "started_at", "finished_at", "error")
+
+def _json_row(row: Dict[str, object]) -> str:
+    """Serializa una fila de resultados; los valores no finitos (ej. ratio con ingreso 0) quedan en null."""
+    return json.dumps({k: (None if isinstance(v, float) and not math.isfinite(v) else v) for k, v in row.items()},
+                      ensure_ascii=False)
+
+class JobManager:
+    """Guarda los trabajos en SQLite y los ejecuta en `workers` hilos."""
+
+    def __init__(self, path: str, workers: int = 2, block_size: int = 100, csv_dir: Optional[str] = None):
+        self.path = path
+        self.workers = workers
+        self.block_size = block_size
+        self.csv_dir = os.path.realpath(csv_dir or ".")
+        self._local = threading.local()
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue()  # Avisos para despertar a los workers.
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+
+    # --- SQLite ---
+
+    def _db(self) -> sqlite3.Connection:
+        """Conexión SQLite de este hilo (se abre la primera vez que se usa)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def _update(self, job_id: str, **fields) -> None:
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        self._db().execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def _job(self, job_id: str) -> Optional[sqlite3.Row]:
+        cursor = self._db().cursor()
+        cursor.row_factory = sqlite3.Row
+        return cursor.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+    def _finish(self, job_id: str, status: str, error: Optional[str] = None) -> bool:
+        """Cierra un trabajo que sigue activo (no pisa una cancelación que llegó mientras terminaba)."""
+        cursor = self._db().execute(
+            "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ? AND status IN ('queued', 'running')",
+            (status, error, time.time(), job_id))
+        return cursor.rowcount > 0
+
+    # --- API Pública ---
+
+    def submit(self, items: Optional[List[Dict[str, str]]] = None, csv_path: Optional[str] = None,
+               rules_path: str = "business_rules.yaml", concurrency: int = 1, timeout: Optional[float] = None,
+               cache_mode: str = "use") -> str:
+        """Registra un trabajo (cartas en línea o un CSV local) y lo encola. Devuelve su id."""
+        if (items is None) == (csv_path is None):
+            raise ValueError("Se debe indicar 'items' o 'csv_path' (solo uno de los dos).")
+        if csv_path is not None:
+            csv_path = os.path.realpath(csv_path)
+            if os.path.commonpath([csv_path, self.csv_dir]) != self.csv_dir:
+                raise ValueError(f"El CSV debe estar dentro de '{self.csv_dir}'.")
+            if not os.path.isfile(csv_path):
+                raise ValueError(f"No existe el archivo '{csv_path}'.")
+        elif not items:
+            raise ValueError("La lista de ítems no puede estar vacía.")
+        get_rules(rules_path)  # Falla aquí (y no en el worker) si el ruleset no existe o es inválido.
+
+        job_id = uuid.uuid4().hex
+        options = {"rules_path": rules_path, "concurrency": concurrency, "timeout": timeout, "cache_mode": cache_mode}
+        db = self._db()
+        db.execute("BEGIN")
+        try:
+            db.execute("INSERT INTO jobs (id, status, source, csv_path, options, total, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                       (job_id, "queued", "csv" if csv_path else "items", csv_path, json.dumps(options),
+                        None if csv_path else len(items), time.time()))
+            if items:
+                db.executemany("INSERT INTO job_items (job_id, seq, item_id, letter) VALUES (?, ?, ?, ?)",
+                               ((job_id, seq, str(item["id"]), item["letter"]) for seq, item in enumerate(items)))
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        self._queue.put(job_id)
+        logger.info(f"[JOBS] Trabajo {job_id} encolado ({len(items) if items else csv_path}).")
+        return job_id
+
+    def status(self, job_id: str) -> Optional[Dict[str, object]]:
+        """Estado y progreso del trabajo, o None si no existe."""
+        job = self._job(job_id)
+        return {name: job[name] for name in _STATUS_FIELDS} if job is not None else None
+
+    def results(self, job_id: str, offset: int = 0, limit: int = 100) -> List[Dict[str, object]]:
+        """Filas de resultados ya procesadas, en el orden de entrada."""
+        rows = self._db().execute("SELECT row FROM job_results WHERE job_id = ? AND seq >= ? ORDER BY seq LIMIT ?",
+                                  (job_id, offset, limit)).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, object]]:
+        """Cancela el trabajo; las filas ya procesadas se conservan."""
+        job = self._job(job_id)
+        if job is None:
+            return None
+        if self._finish(job_id, "cancelled"):
+            logger.info(f"[JOBS] Trabajo {job_id} cancelado en la fila {job['done']}.")
+        return self.status(job_id)
+
+    # --- Workers ---
+
+    def start(self, poll_interval: float = 1.0) -> None:
+        """Arranca los workers; los trabajos que quedaron a medias (proceso caído) vuelven a la cola.
+
+        Los workers deben correr en un solo proceso por base de datos: con varios workers de uvicorn,
+        dejar JOBS_WORKERS=0 en todos menos uno (los demás igual pueden encolar y consultar).
+        """
+        if self._threads or self.workers <= 0:
+            return
+        self._stop.clear()
+        self._db().execute("UPDATE jobs SET status = 'queued' WHERE status = 'running'")
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, args=(poll_interval,), name=f"jobs-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        """Detiene los workers; los trabajos en curso se retoman en el próximo `start`."""
+        self._stop.set()
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def _claim(self) -> Optional[str]:
+        """Toma el trabajo encolado más antiguo y lo marca como 'running' (de forma atómica)."""
+        row = self._db().execute(
+            "UPDATE jobs SET status = 'running', started_at = COALESCE(started_at, ?) "
+            "WHERE id = (SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1) RETURNING id",
+            (time.time(),)).fetchone()
+        return row[0] if row is not None else None
+
+    def _work(self, poll_interval: float) -> None:
+        while not self._stop.is_set():
+            job_id = self._claim()
+            if job_id is None:
+                # Espera a un aviso de `submit` (o revisa la base cada `poll_interval`, por si otro proceso encoló).
+                try:
+                    self._queue.get(timeout=poll_interval)
+                except queue.Empty:
+                    pass
+                continue
+            try:
+                self._run(job_id)
+            except Exception as e:
+                logger.error(f"[JOBS] Trabajo {job_id} falló: {e}")
+                self._finish(job_id, "failed", error=str(e))
+
+    def _halted(self, job_id: str) -> bool:
+        """True si hay que dejar de procesar el trabajo (cancelado, o el gestor se está deteniendo)."""
+        if self._stop.is_set():
+            return True
+        row = self._db().execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row is None or row[0] != "running"
+
+    def _letters(self, job: sqlite3.Row, skip: int) -> Iterator[Dict[str, object]]:
+        """Cartas del trabajo a partir de la fila `skip` (leídas por páginas, no todas a la vez)."""
+        if job["source"] == "csv":
+            yield from batch.csv_letters(job["csv_path"], self.block_size, skip)
+            return
+        db = self._db()
+        seq = skip
+        while True:
+            page = db.execute("SELECT item_id, letter FROM job_items WHERE job_id = ? AND seq >= ? ORDER BY seq LIMIT ?",
+                              (job["id"], seq, self.block_size)).fetchall()
+            if not page:
+                return
+            for item_id, letter in page:
+                yield {"id": item_id, "letter": letter}
+            seq += len(page)
+
+    def _count_csv(self, path: str) -> int:
+        import pandas as pd
+
+        with pd.read_csv(path, usecols=["id"], chunksize=10_000) as reader:
+            return sum(len(chunk) for chunk in reader)
+
+    def _run(self, job_id: str) -> None:
+        """Procesa un trabajo desde su última fila guardada hasta terminar, cancelarse o detenerse."""
+        job = self._job(job_id)
+        options = json.loads(job["options"])
+        plan = get_rules(options["rules_path"])
+        if job["total"] is None:
+            self._update(job_id, total=self._count_csv(job["csv_path"]))
+
+        done = job["done"]
+        extractions = batch.extract_all(self._letters(job, done), options["concurrency"], options["timeout"],
+                                        options["cache_mode"])
+        block = []
+
+        def flush():
+            # Las filas y el progreso se guardan en la misma transacción: al retomar no hay huecos ni duplicados.
+            nonlocal done, block
+            db = self._db()
+            db.execute("BEGIN")
+            try:
+                db.executemany("INSERT OR REPLACE INTO job_results (job_id, seq, row) VALUES (?, ?, ?)",
+                               ((job_id, done + i, _json_row(row)) for i, row in enumerate(block)))
+                db.execute("UPDATE jobs SET done = ? WHERE id = ?", (done + len(block), job_id))
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+            done += len(block)
+            block = []
+
+        # La cancelación (o la detención) se revisa una vez por bloque, antes de guardarlo.
+        halted = False
+        try:
+            for letter_id, extracted, error in extractions:
+                block.append(batch.record_row(batch.build_record(letter_id, extracted, error, plan)))
+                if len(block) >= self.block_size:
+                    if self._halted(job_id):
+                        halted = True
+                        break
+                    flush()
+            if block and not halted:
+                if self._halted(job_id):
+                    halted = True
+                else:
+                    flush()
+        finally:
+            extractions.close()
+
+        if not halted and self._finish(job_id, "completed"):
+            logger.info(f"[JOBS] Trabajo {job_id} completado ({done} filas).")
+
+# --- Instancia del Proceso ---
+
+_jobs: Optional[JobManager] = None
+_jobs_lock = threading.Lock()
+
+def get_jobs() -> JobManager:
+    """Devuelve el gestor de trabajos del proceso (creado desde las variables de entorno)."""
+    global _jobs
+    if _jobs is None:
+        with _jobs_lock:
+            if _jobs is None:
+                _jobs = JobManager(
+                    path=os.getenv("JOBS_DB_PATH", os.path.join(".cache", "jobs.sqlite3")),
+                    workers=int(os.getenv("JOBS_WORKERS", "2")),
+                    csv_dir=os.getenv("JOBS_CSV_DIR", "."),
+                )
+    return _jobs
+
+def set_jobs(manager: Optional[JobManager]) -> None:
+    """Reemplaza el gestor de trabajos del proceso (útil en pruebas)."""
+    global _jobs
+    with _jobs_lock:
+        _jobs = manager
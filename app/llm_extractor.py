@@ -1,108 +1,565 @@
 # -*- coding: utf-8 -*-
 # Importaciones necesarias.
+import logging
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
 import re
 import json
-
-import google.generativeai as genai
-import openai
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 from app.schema import ApplicationExtract, Applicant, Employment, Financials, CreditProfile
+from app import metrics, providers
+from app.cache import CACHE_MODES, cache_key, get_cache
+from app.guards import ProviderBusy, get_guard
 
 # Carga las variables de entorno desde un archivo .env (si existe).
 # Aquí es donde buscará las claves de API.
 load_dotenv()
 
-# --- Funcin Principal de Extraccin ---
+logger = logging.getLogger(__name__)
 
-def extract_with_llm(letter: str) -> ApplicationExtract:
-    """Intenta extraer datos usando un LLM (Google o OpenAI) y si falla, usa un fallback de regex."""
-    # Lee las claves de API desde las variables de entorno.
-    google_api_key = os.getenv("GOOGLE_API_KEY")
-    openai_api_key = os.getenv("OPENAI_API_KEY")
+# --- Prompt y Parseo de la Respuesta ---
 
-    # Prioridad 1: Intentar con Google Gemini.
-    if google_api_key:
-        try:
-            # Configura la API de Google.
-            genai.configure(api_key=google_api_key)
-            model = genai.GenerativeModel(os.getenv("GOOGLE_MODEL", "gemini-1.5-flash"))
-            # El prompt le da al LLM el contexto y la estructura JSON deseada.
-            prompt = f"""Extract the following information from the letter below and provide the output in a valid JSON format. 
+# Estructura JSON pedida al LLM (la misma para una carta o para varias).
+_SCHEMA = "{'applicant': {'full_name': 'str', 'age_years': 'int'}, 'employment': {'employment_tenure_months': 'int', 'employment_type': 'str (e.g., \"dependiente\", \"independiente\", \"emprendedor\", \"autónomo\", \"contratista\", \"freelance\")'}, 'financials': {'income_monthly': 'int', 'requested_amount': 'int', 'active_credits': 'int'}, 'credit': {'has_delinquencies_last_6m': 'bool', 'credit_rating': 'str', 'rejections_last_12m': 'int'}, 'raw_letter': 'str'}"
+
+def _build_prompt(letter: str) -> str:
+    """Construye el prompt de extracción (es el mismo para Gemini y OpenAI)."""
+    # El prompt le da al LLM el contexto y la estructura JSON deseada.
+    return f"""Extract the following information from the letter below and provide the output in a valid JSON format. 
             The JSON object should conform to the following structure:
-            {{'applicant': {{'full_name': 'str', 'age_years': 'int'}}, 'employment': {{'employment_tenure_months': 'int', 'employment_type': 'str (e.g., "dependiente", "independiente", "emprendedor", "autónomo", "contratista", "freelance")'}}, 'financials': {{'income_monthly': 'int', 'requested_amount': 'int', 'active_credits': 'int'}}, 'credit': {{'has_delinquencies_last_6m': 'bool', 'credit_rating': 'str', 'rejections_last_12m': 'int'}}, 'raw_letter': 'str'}}
+            {_SCHEMA}
             
             Letter:
             {letter}
             """
-            response = model.generate_content(prompt)
-            # Limpia la respuesta del LLM para asegurar que sea un JSON vlido.
-            cleaned_response = response.text.strip().replace('`', '').replace('json', '')
-            extracted_data = json.loads(cleaned_response)
-            extracted_data['raw_letter'] = letter # Aade la carta original a los datos.
-            # Valida y estructura los datos usando el modelo Pydantic.
-            return ApplicationExtract(**extracted_data)
-        except Exception as e:
-            print(f"Error with Gemini: {e}")
-            # Si algo falla, se llama al mtodo de fallback.
-            return extract_with_fallback(letter)
-
-    # Prioridad 2: Si no hay clave de Google, intentar con OpenAI.
-    elif openai_api_key:
-        try:
-            client = openai.OpenAI(api_key=openai_api_key)
-            model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
-            # El prompt es similar, pidiendo una extraccin estructurada.
-            prompt = f"""Extract the following information from the letter below and provide the output in a valid JSON format. 
-            The JSON object should conform to the following structure:
-            {{'applicant': {{'full_name': 'str', 'age_years': 'int'}}, 'employment': {{'employment_tenure_months': 'int', 'employment_type': 'str (e.g., "dependiente", "independiente", "emprendedor", "autónomo", "contratista", "freelance")'}}, 'financials': {{'income_monthly': 'int', 'requested_amount': 'int', 'active_credits': 'int'}}, 'credit': {{'has_delinquencies_last_6m': 'bool', 'credit_rating': 'str', 'rejections_last_12m': 'int'}}, 'raw_letter': 'str'}}
-            
-            Letter:
-            {letter}
+
+def _parse_llm_response(text: str, letter: str) -> ApplicationExtract:
+    """Convierte el texto devuelto por el LLM en un `ApplicationExtract` validado."""
+    # Limpia la respuesta del LLM para asegurar que sea un JSON válido.
+    cleaned_response = text.strip().replace('`', '').replace('json', '')
+    extracted_data = json.loads(cleaned_response)
+    extracted_data['raw_letter'] = letter # Añade la carta original a los datos.
+    # Valida y estructura los datos usando el modelo Pydantic.
+    return ApplicationExtract(**extracted_data)
+
+# --- Llamadas a los Proveedores ---
+
+# Versión del extractor: forma parte de la clave de la caché, así que cambiarla (por ejemplo al
+# modificar el prompt) invalida las extracciones guardadas.
+EXTRACTOR_VERSION = "1"
+
+def _provider_config():
+    """Devuelve (proveedor, modelo, api_key) según las variables de entorno, o (None, None, None).
+
+    Se saltean los proveedores con el circuit breaker abierto (`app.guards`): con Gemini caído se
+    usa OpenAI si tiene clave, y si ninguno está disponible se va directo al fallback por regex.
+    """
+    # Prioridad 1: Google Gemini. Prioridad 2: OpenAI.
+    google_api_key = os.getenv("GOOGLE_API_KEY")
+    if google_api_key and get_guard("gemini").allow():
+        return "gemini", os.getenv("GOOGLE_MODEL", "gemini-1.5-flash"), google_api_key
+    openai_api_key = os.getenv("OPENAI_API_KEY")
+    if openai_api_key and get_guard("openai").allow():
+        return "openai", os.getenv("OPENAI_MODEL", "gpt-4o-mini"), openai_api_key
+    return None, None, None
+
+def _complete_gemini(prompt: str, model_name: str, api_key: str) -> str:
+    # El modelo (y la configuración de la API de Google) se reutiliza entre llamadas.
+    model = providers.get_gemini_model(api_key, model_name)
+    response = model.generate_content(prompt, request_options=providers.gemini_request_options())
+    return response.text
+
+def _complete_openai(prompt: str, model_name: str, api_key: str) -> str:
+    client = providers.get_openai_client(api_key)
+    response = client.chat.completions.create(
+        model=model_name,
+        messages=[{"role": "user", "content": prompt}]
+    )
+    return response.choices[0].message.content
+
+def _complete(provider: str, prompt: str, model_name: str, api_key: str) -> str:
+    """Envía un prompt al proveedor y devuelve el texto de la respuesta."""
+    if provider == "gemini":
+        return _complete_gemini(prompt, model_name, api_key)
+    return _complete_openai(prompt, model_name, api_key)
+
+def _call_gemini(letter: str, model_name: str, api_key: str) -> ApplicationExtract:
+    return _parse_llm_response(_complete_gemini(_build_prompt(letter), model_name, api_key), letter)
+
+def _call_openai(letter: str, model_name: str, api_key: str) -> ApplicationExtract:
+    return _parse_llm_response(_complete_openai(_build_prompt(letter), model_name, api_key), letter)
+
+async def _call_gemini_async(letter: str, model_name: str, api_key: str) -> ApplicationExtract:
+    model = providers.get_gemini_model(api_key, model_name)
+    response = await model.generate_content_async(_build_prompt(letter), request_options=providers.gemini_request_options())
+    return _parse_llm_response(response.text, letter)
+
+async def _call_openai_async(letter: str, model_name: str, api_key: str) -> ApplicationExtract:
+    client = providers.get_async_openai_client(api_key)
+    response = await client.chat.completions.create(
+        model=model_name,
+        messages=[{"role": "user", "content": _build_prompt(letter)}]
+    )
+    return _parse_llm_response(response.choices[0].message.content, letter)
+
+# Series de latencia por proveedor, resueltas una sola vez.
+_EXTRACTION_SECONDS = {name: metrics.EXTRACTION_SECONDS.labels(provider=name) for name in ("gemini", "openai", "regex")}
+
+def _letter_tokens(letter: str) -> int:
+    """Tokens que el limitador reserva para extraer una carta (prompt + salida estimada)."""
+    return _SINGLE_PROMPT_TOKENS + _estimate_tokens(letter) + OUTPUT_TOKENS_PER_LETTER
+
+def _call_provider(provider: str, letter: str, model_name: str, api_key: str) -> ApplicationExtract:
+    """Llama al proveedor respetando su limitador; el resultado alimenta su circuit breaker.
+
+    Raises:
+        ProviderBusy: si el limitador no tiene cupo a tiempo (no cuenta como error del proveedor).
+    """
+    guard = get_guard(provider)
+    guard.acquire(_letter_tokens(letter))
+    try:
+        with _EXTRACTION_SECONDS[provider].time():
+            if provider == "gemini":
+                extracted = _call_gemini(letter, model_name, api_key)
+            else:
+                extracted = _call_openai(letter, model_name, api_key)
+    except Exception:
+        guard.record_failure()
+        raise
+    guard.record_success()
+    return extracted
+
+async def _call_provider_async(provider: str, letter: str, model_name: str, api_key: str) -> ApplicationExtract:
+    guard = get_guard(provider)
+    await guard.acquire_async(_letter_tokens(letter))
+    try:
+        with _EXTRACTION_SECONDS[provider].time():
+            if provider == "gemini":
+                extracted = await _call_gemini_async(letter, model_name, api_key)
+            else:
+                extracted = await _call_openai_async(letter, model_name, api_key)
+    except Exception:
+        guard.record_failure()
+        raise
+    guard.record_success()
+    return extracted
+
+_PROVIDER_NAMES = {"gemini": "Gemini", "openai": "OpenAI"}
+
+def _extract_regex(letter: str) -> ApplicationExtract:
+    """`extract_with_fallback` medido como la extracción del proveedor "regex"."""
+    start = time.perf_counter()
+    extracted = extract_with_fallback(letter)
+    _EXTRACTION_SECONDS["regex"].observe(time.perf_counter() - start)
+    return extracted
+
+def _fallback_after_error(provider: str, error: Exception, letter: str) -> ApplicationExtract:
+    """Registra el error del proveedor y extrae la carta con el fallback (ese resultado no se cachea)."""
+    logger.warning(f"Error with {_PROVIDER_NAMES[provider]}: {error}")
+    metrics.LLM_FALLBACKS.inc(provider=provider)
+    return _extract_regex(letter)
+
+def _cache_lookup(letter: str, provider: str, model_name: str, cache_mode: str):
+    """Devuelve (caché, clave, extracción guardada) según el modo de caché de la solicitud."""
+    if cache_mode not in CACHE_MODES:
+        raise ValueError(f"Modo de caché desconocido: {cache_mode!r}")
+    cache = get_cache() if cache_mode != "bypass" else None
+    if cache is None:
+        return None, None, None
+    key = cache_key(letter, provider, model_name, EXTRACTOR_VERSION)
+    return cache, key, (cache.get(key) if cache_mode == "use" else None)
+
+# --- Función Principal de Extracción ---
+
+def extract_with_llm(letter: str, cache_mode: str = "use") -> ApplicationExtract:
+    """Intenta extraer datos usando un LLM (Google o OpenAI) y si falla, usa un fallback de regex.
+
+    Las extracciones exitosas del LLM se guardan en la caché de extracciones (`app.cache`);
+    `cache_mode` permite ignorarla ("bypass") o forzar una nueva extracción ("refresh").
+    """
+    provider, model_name, api_key = _provider_config()
+
+    # Si no hay ninguna clave de API (o todos los breakers están abiertos), usar directamente el
+    # fallback (no se cachea: es local y barato).
+    if provider is None:
+        return _extract_regex(letter)
+
+    cache, key, cached = _cache_lookup(letter, provider, model_name, cache_mode)
+    if cached is not None:
+        return cached
+
+    try:
+        extracted = _call_provider(provider, letter, model_name, api_key)
+    except Exception as e:
+        # Si algo falla, se llama al método de fallback (y ese resultado no se guarda en caché).
+        return _fallback_after_error(provider, e, letter)
+
+    if cache is not None:
+        cache.put(key, extracted)
+    return extracted
+
+# --- Extracción Multi-Carta ---
+
+# Tokens de salida que se reservan por carta (un objeto JSON de la extracción, sin `raw_letter`).
+OUTPUT_TOKENS_PER_LETTER = 150
+
+def batch_token_budget() -> int:
+    """Tokens (entrada + salida estimada) que puede ocupar una solicitud multi-carta (LLM_BATCH_TOKENS)."""
+    return int(os.getenv("LLM_BATCH_TOKENS", "8000"))
+
+def batch_max_letters() -> int:
+    """Tope de cartas por solicitud multi-carta (LLM_BATCH_MAX_LETTERS), aunque quepan más en el presupuesto."""
+    return int(os.getenv("LLM_BATCH_MAX_LETTERS", "20"))
+
+def _estimate_tokens(text: str) -> int:
+    """Estimación conservadora de tokens (~3 caracteres por token en español), sin tokenizador."""
+    return len(text) // 3 + 1
+
+def _build_batch_prompt(letters: List[str]) -> str:
+    """Prompt con varias cartas: el esquema va una sola vez y cada carta lleva su id (su posición)."""
+    body = "\n".join(f'<letter id="{i}">\n{letter}\n</letter>' for i, letter in enumerate(letters))
+    return f"""Extract the following information from each of the letters below and provide the output as a valid JSON array with exactly one object per letter.
+            Each object must include an "id" field with the id of its letter and otherwise conform to the following structure (omit 'raw_letter'):
+            {_SCHEMA}
+
+            Letters:
+            {body}
             """
-            response = client.chat.completions.create(
-                model=model,
-                messages=[{"role": "user", "content": prompt}]
-            )
-            cleaned_response = response.choices[0].message.content.strip().replace('`', '').replace('json', '')
-            extracted_data = json.loads(cleaned_response)
-            extracted_data['raw_letter'] = letter
-            return ApplicationExtract(**extracted_data)
-        except Exception as e:
-            print(f"Error with OpenAI: {e}")
-            return extract_with_fallback(letter)
-    
-    # Opcin final: Si no hay ninguna clave de API, usar directamente el fallback.
-    else:
-        return extract_with_fallback(letter)
+
+_BATCH_PROMPT_TOKENS = _estimate_tokens(_build_batch_prompt([]))
+_SINGLE_PROMPT_TOKENS = _estimate_tokens(_build_prompt(""))
+
+def pack_letters(items: Iterable[Dict[str, str]], token_budget: Optional[int] = None,
+                 max_letters: Optional[int] = None) -> Iterator[List[Dict[str, str]]]:
+    """Agrupa las cartas (`{"id", "letter"}`) en grupos que caben en una solicitud multi-carta.
+
+    K es adaptativo: se agregan cartas mientras el esquema, las cartas y la salida estimada quepan
+    en `token_budget`, así que las cartas cortas viajan en grupos grandes y una carta que por sí
+    sola excede el presupuesto va sola.
+    """
+    token_budget = token_budget or batch_token_budget()
+    max_letters = max_letters or batch_max_letters()
+    group: List[Dict[str, str]] = []
+    used = _BATCH_PROMPT_TOKENS
+    for item in items:
+        cost = _estimate_tokens(item["letter"]) + OUTPUT_TOKENS_PER_LETTER
+        if group and (used + cost > token_budget or len(group) >= max_letters):
+            yield group
+            group, used = [], _BATCH_PROMPT_TOKENS
+        group.append(item)
+        used += cost
+    if group:
+        yield group
+
+def _parse_batch_response(text: str, letters: List[str]) -> Dict[int, ApplicationExtract]:
+    """Valida cada elemento del arreglo devuelto; los que falten o no validen simplemente no aparecen."""
+    cleaned_response = text.strip().replace('`', '').replace('json', '')
+    data = json.loads(cleaned_response)
+    if isinstance(data, dict):
+        # Algunos modelos envuelven el arreglo en un objeto ({"letters": [...]}).
+        data = next((value for value in data.values() if isinstance(value, list)), [])
+    extracted: Dict[int, ApplicationExtract] = {}
+    for element in data:
+        try:
+            index = int(element.pop("id"))
+            if 0 <= index < len(letters) and index not in extracted:
+                element["raw_letter"] = letters[index]
+                extracted[index] = ApplicationExtract(**element)
+        except (AttributeError, KeyError, TypeError, ValueError):
+            continue
+    return extracted
+
+def extract_many_with_llm(letters: List[str], cache_mode: str = "use") -> List[ApplicationExtract]:
+    """Extrae un grupo de cartas con una sola solicitud al LLM y devuelve las extracciones en orden.
+
+    Las cartas que ya están en la caché no se envían. Si la respuesta no trae el elemento de una
+    carta (o no valida), solo esa carta se vuelve a extraer con `extract_with_llm`, que a su vez
+    cae en el fallback si el proveedor falla. Los grupos se arman con `pack_letters`.
+    """
+    provider, model_name, api_key = _provider_config()
+    if provider is None:
+        return [_extract_regex(letter) for letter in letters]
+
+    results: List[Optional[ApplicationExtract]] = [None] * len(letters)
+    pending: List[Tuple[int, Optional[str]]] = []
+    cache = None
+    for i, letter in enumerate(letters):
+        cache, key, cached = _cache_lookup(letter, provider, model_name, cache_mode)
+        if cached is not None:
+            results[i] = cached
+        else:
+            pending.append((i, key))
+    if not pending:
+        return results
+
+    sent = [letters[i] for i, _ in pending]
+    guard = get_guard(provider)
+    try:
+        prompt = _build_batch_prompt(sent)
+        guard.acquire(_estimate_tokens(prompt) + OUTPUT_TOKENS_PER_LETTER * len(sent))
+        try:
+            text = _complete(provider, prompt, model_name, api_key)
+        except Exception:
+            guard.record_failure()
+            raise
+        guard.record_success()
+        parsed = _parse_batch_response(text, sent)
+    except Exception as e:
+        logger.warning(f"Error with {_PROVIDER_NAMES[provider]} ({len(sent)} cartas): {e}")
+        parsed = {}
+
+    for position, (i, key) in enumerate(pending):
+        extracted = parsed.get(position)
+        if extracted is None:
+            results[i] = extract_with_llm(letters[i], cache_mode=cache_mode)
+            continue
+        results[i] = extracted
+        if cache is not None:
+            cache.put(key, extracted)
+    return results
+
+# --- Versión Asíncrona ---
+
+async def extract_with_llm_async(letter: str, cache_mode: str = "use") -> ApplicationExtract:
+    """Igual que `extract_with_llm`, pero con los clientes asíncronos de Gemini y OpenAI.
+
+    No bloquea el event loop mientras espera al proveedor, así que un solo worker de uvicorn
+    puede sostener cientos de extracciones concurrentes.
+    """
+    provider, model_name, api_key = _provider_config()
+    if provider is None:
+        # El fallback es CPU puro y muy rápido: se ejecuta directamente en el loop.
+        return _extract_regex(letter)
+
+    cache, key, cached = _cache_lookup(letter, provider, model_name, cache_mode)
+    if cached is not None:
+        return cached
+
+    try:
+        extracted = await _call_provider_async(provider, letter, model_name, api_key)
+    except Exception as e:
+        return _fallback_after_error(provider, e, letter)
+
+    if cache is not None:
+        cache.put(key, extracted)
+    return extracted
+
+# --- Extracción con Plazo (Hedging) ---
+
+def hedge_percentile() -> float:
+    """Fracción del plazo que se espera al LLM antes de responder con el fallback (LLM_HEDGE_PERCENTILE)."""
+    return float(os.getenv("LLM_HEDGE_PERCENTILE", "0.8"))
+
+_hedge_pool = None
+_hedge_pool_lock = threading.Lock()
+# Llamadas async que siguen después del plazo: se guarda la referencia para que no se recolecten a medias.
+_late_tasks: set = set()
+
+def _hedge_executor():
+    """Pool de hilos (LLM_HEDGE_WORKERS) donde corren las llamadas al LLM de las extracciones con plazo."""
+    global _hedge_pool
+    from concurrent.futures import ThreadPoolExecutor
+
+    with _hedge_pool_lock:
+        if _hedge_pool is None:
+            _hedge_pool = ThreadPoolExecutor(max_workers=int(os.getenv("LLM_HEDGE_WORKERS", "32")),
+                                             thread_name_prefix="llm-hedge")
+        return _hedge_pool
+
+def _hedge_wait(start: float, budget_s: float) -> float:
+    """Segundos que todavía se puede esperar al LLM (el percentil del plazo menos lo ya transcurrido)."""
+    return max(0.0, start + budget_s * hedge_percentile() - time.monotonic())
+
+def _cache_late_result(provider: str, cache, key: Optional[str]):
+    """Callback que guarda en la caché la respuesta del LLM que llegó después del plazo."""
+    def done(future) -> None:
+        if future.cancelled() or future.exception() is not None:
+            return
+        metrics.LLM_HEDGES.inc(provider=provider, outcome="late")
+        if cache is not None:
+            cache.put(key, future.result())
+    return done
+
+def _use_hedge(provider: str, future, cache, key: Optional[str], hedge: ApplicationExtract) -> ApplicationExtract:
+    """El LLM no respondió a tiempo: se devuelve el fallback y su respuesta, si llega, queda para la caché."""
+    logger.info(f"{_PROVIDER_NAMES[provider]} no respondió dentro del plazo: se usa el fallback.")
+    metrics.LLM_HEDGES.inc(provider=provider, outcome="hedged")
+    future.add_done_callback(_cache_late_result(provider, cache, key))
+    return hedge
+
+def extract_with_deadline(letter: str, budget_s: float, cache_mode: str = "use") -> Tuple[ApplicationExtract, bool]:
+    """Como `extract_with_llm`, pero con un plazo: el fallback por regex corre en paralelo como cobertura.
+
+    La llamada al LLM va a un pool de hilos mientras este hilo extrae con el fallback. Si el LLM
+    no respondió al llegar a `LLM_HEDGE_PERCENTILE` del plazo (el resto queda para evaluar y
+    responder), se devuelve el fallback; la respuesta tardía del LLM se guarda igual en la caché,
+    así la próxima solicitud por la misma carta ya no espera.
+
+    Returns:
+        tuple: (extracción, True si la extracción es la del fallback).
+    """
+    from concurrent.futures import TimeoutError as FutureTimeout
+
+    start = time.monotonic()
+    provider, model_name, api_key = _provider_config()
+    if provider is None:
+        return _extract_regex(letter), True
+
+    cache, key, cached = _cache_lookup(letter, provider, model_name, cache_mode)
+    if cached is not None:
+        return cached, False
+
+    future = _hedge_executor().submit(_call_provider, provider, letter, model_name, api_key)
+    hedge = _extract_regex(letter)
+    try:
+        extracted = future.result(timeout=_hedge_wait(start, budget_s))
+    except FutureTimeout:
+        # Si la llamada todavía estaba en cola del pool no se llega a enviar.
+        future.cancel()
+        return _use_hedge(provider, future, cache, key, hedge), True
+    except Exception as e:
+        logger.warning(f"Error with {_PROVIDER_NAMES[provider]}: {e}")
+        metrics.LLM_FALLBACKS.inc(provider=provider)
+        return hedge, True
+
+    if cache is not None:
+        cache.put(key, extracted)
+    return extracted, False
+
+async def extract_with_deadline_async(letter: str, budget_s: float,
+                                      cache_mode: str = "use") -> Tuple[ApplicationExtract, bool]:
+    """Versión asíncrona de `extract_with_deadline` (la llamada al LLM es una tarea del event loop)."""
+    import asyncio
+
+    start = time.monotonic()
+    provider, model_name, api_key = _provider_config()
+    if provider is None:
+        return _extract_regex(letter), True
+
+    cache, key, cached = _cache_lookup(letter, provider, model_name, cache_mode)
+    if cached is not None:
+        return cached, False
+
+    task = asyncio.ensure_future(_call_provider_async(provider, letter, model_name, api_key))
+    hedge = _extract_regex(letter)
+    done, _ = await asyncio.wait({task}, timeout=_hedge_wait(start, budget_s))
+    if not done:
+        _late_tasks.add(task)
+        task.add_done_callback(_late_tasks.discard)
+        return _use_hedge(provider, task, cache, key, hedge), True
+    try:
+        extracted = task.result()
+    except Exception as e:
+        logger.warning(f"Error with {_PROVIDER_NAMES[provider]}: {e}")
+        metrics.LLM_FALLBACKS.inc(provider=provider)
+        return hedge, True
+
+    if cache is not None:
+        cache.put(key, extracted)
+    return extracted, False
 
 # --- Fallback: Extraccin Heurstica con Regex ---
 
+# Patrones compilados una sola vez al importar el módulo.
+_WORD_TO_NUM = {"un": 1, "uno": 1, "dos": 2, "tres": 3, "cuatro": 4, "cinco": 5}
+_RE_INCOME = re.compile(r"ingresos mensuales.*?([\d\.,]+)", re.IGNORECASE)
+_RE_AMOUNT = re.compile(r"(?:valor|monto) de \$?([\d\.,]+)", re.IGNORECASE)
+_RE_AGE = re.compile(r"tengo (\d{2})\s*a[nñ]os", re.IGNORECASE)
+_RE_EXPERIENCE_YEARS = re.compile(r"experiencia laboral de (\d+|un|uno|dos|tres|cuatro|cinco)\s*a[ñn]o(s)?")
+_RE_EXPERIENCE_MONTHS = re.compile(r"(\d+)\s*mes(es)? de experiencia")
+_RE_ACTIVE_CREDITS = re.compile(r"mantengo\s+(\w+)\s+crdito(s)?\s+activo(s)?", re.IGNORECASE)
+_RE_REJECTIONS = re.compile(r"crdito en (\w+) ocasiones", re.IGNORECASE)
+_RE_NO_REJECTIONS = re.compile(r"no he recibido ning.n rechazo")
+_RE_NEGATED_MORA = re.compile(r"(sin|no).{0,40}mora")
+_RE_RATING = re.compile(r'calificacin.*?"(.*?)"', re.IGNORECASE | re.DOTALL)
+_RE_FULL_NAME = re.compile(r"Mi nombre es (.*?)[,.]")
+_RE_NON_DIGIT = re.compile(r'[^\d]')
+
+class KeywordMatcher:
+    """Vocabulario de palabras clave con prioridad: devuelve la etiqueta del primer término presente.
+
+    Reúne en una sola tabla los tipos de empleo y las palabras de emprendimiento, para que cada
+    término se busque una sola vez. La búsqueda usa `in` (subcadenas en C), que en cartas de ~1 KB
+    es más rápida que una alternación de regex o un autómata Aho-Corasick escrito en Python.
+    """
+
+    def __init__(self, terms: List[Tuple[str, str]]):
+        self.terms = tuple(terms)
+
+    def match(self, text: str) -> Optional[str]:
+        for term, label in self.terms:
+            if term in text:
+                return label
+        return None
+
+# Orden = prioridad del tipo de empleo; las palabras genéricas de emprendimiento cuentan como "emprendedor".
+EMPLOYMENT_KEYWORDS = KeywordMatcher([
+    ("independiente", "independiente"),
+    ("autónomo", "autónomo"),
+    ("contratista", "contratista"),
+    ("freelance", "freelance"),
+    ("emprendedor", "emprendedor"),
+    ("emprendimiento propio", "emprendedor"),
+    ("negocio propio", "emprendedor"),
+    ("propietario", "emprendedor"),
+    ("dueño", "emprendedor"),
+])
+
+def _search_from(pattern: re.Pattern, text: str, *anchors: str, exact: bool = True) -> Optional[re.Match]:
+    """Equivale a `pattern.search(text)`, pero empieza en la primera aparición de sus literales iniciales.
+
+    Todo match del patrón empieza con uno de los `anchors`, así que no hace falta probarlo en cada
+    posición anterior. Con `exact=False` se hace la búsqueda completa.
+    """
+    if not exact:
+        return pattern.search(text)
+    start = -1
+    for anchor in anchors:
+        i = text.find(anchor)
+        if i >= 0 and (start < 0 or i < start):
+            start = i
+    return pattern.search(text, start) if start >= 0 else None
+
+def _search_months(text: str) -> Optional[re.Match]:
+    """`_RE_EXPERIENCE_MONTHS.search(text)` anclado en "s de experiencia".
+
+    En el texto normalizado, entre el inicio del match y ese literal solo hay dígitos, a lo sumo un
+    espacio y "me"/"mese", así que el match no puede empezar antes del segundo espacio previo.
+    """
+    j = text.find("s de experiencia")
+    if j < 0:
+        return None
+    space = text.rfind(" ", 0, j)
+    start = text.rfind(" ", 0, max(space, 0)) + 1
+    return _RE_EXPERIENCE_MONTHS.search(text, start)
+
 def extract_with_fallback(letter: str) -> ApplicationExtract:
     """Extrae datos de la carta usando expresiones regulares (regex).
     
     Este es el motor de extraccin offline. Es menos flexible que un LLM pero es determinista y gratuito.
     """
     # Normaliza la carta a minsculas y quita espacios extra para facilitar la bsqueda de patrones.
+    # Es la única pasada completa sobre el texto: los patrones se anclan en sus literales (ver `_search_from`).
     normalized_letter = " ".join(letter.lower().split())
-    # Diccionario para convertir nmeros escritos con letra a dgitos.
-    word_to_num = {"un": 1, "uno": 1, "dos": 2, "tres": 3, "cuatro": 4, "cinco": 5}
+    # Con "ı" o "ſ" en la carta, re.IGNORECASE puede coincidir donde `find` no: se busca sin anclar.
+    exact = "ı" not in normalized_letter and "ſ" not in normalized_letter
 
-    # Funcin auxiliar para buscar y limpiar nmeros.
-    def find_number(pattern, text, is_money=False):
-        match = re.search(pattern, text, re.IGNORECASE) # Busca el patrn sin importar maysculas/minsculas.
+    # Función auxiliar para limpiar números.
+    def to_number(match, is_money=False):
         if not match:
             return 0
         
         val = match.group(1) # Obtiene el valor capturado por el parntesis en el regex.
         if is_money:
             # Si es dinero, elimina puntos y comas (ej. "1.800.000" -> "1800000").
-            return int(re.sub(r'[^\d]', '', val))
+            return int(_RE_NON_DIGIT.sub('', val))
 
-        if val in word_to_num:
-            return word_to_num[val] # Convierte "tres" a 3.
+        if val in _WORD_TO_NUM:
+            return _WORD_TO_NUM[val] # Convierte "tres" a 3.
         
         if val.isdigit():
             return int(val) # Convierte "5" a 5.
@@ -110,77 +567,55 @@ def extract_with_fallback(letter: str) -> ApplicationExtract:
         return 0
 
     # Aplicacin de los patrones de regex para cada campo.
-    income = find_number(r"ingresos mensuales.*?([\d\.,]+)", normalized_letter, is_money=True)
-    amount = find_number(r"(?:valor|monto) de \$?([\d\.,]+)", normalized_letter, is_money=True)
-    age = find_number(r"tengo (\d{2})\s*a[nñ]os", normalized_letter)
+    income = to_number(_search_from(_RE_INCOME, normalized_letter, "ingresos mensuales", exact=exact), is_money=True)
+    amount = to_number(_search_from(_RE_AMOUNT, normalized_letter, "valor de ", "monto de ", exact=exact), is_money=True)
+    age = to_number(_search_from(_RE_AGE, normalized_letter, "tengo ", exact=exact))
 
     # Lgica para experiencia (ms compleja).
     experience_in_months = 0
     # Intenta encontrar "experiencia laboral de 5 aos".
-    exp_match = re.search(r"experiencia laboral de (\d+|un|uno|dos|tres|cuatro|cinco)\s*a[ñn]o(s)?", normalized_letter)
+    exp_match = _search_from(_RE_EXPERIENCE_YEARS, normalized_letter, "experiencia laboral de ")
     if exp_match:
         val = exp_match.group(1)
-        years = int(val) if val.isdigit() else word_to_num.get(val, 0)
+        years = int(val) if val.isdigit() else _WORD_TO_NUM.get(val, 0)
         experience_in_months = years * 12
     
     # Si no encontr aos, busca meses o frases como "menos de un ao".
     if experience_in_months == 0:
-        months_match = re.search(r"(\d+)\s*mes(es)? de experiencia", normalized_letter)
+        months_match = _search_months(normalized_letter)
         if months_match:
             experience_in_months = int(months_match.group(1))
         elif "menos de un ao" in normalized_letter or "<12 meses" in normalized_letter:
             experience_in_months = 6 # Asigna un valor por defecto (6 meses).
 
     # Regex corregido para crditos activos.
-    active_credits = find_number(r"mantengo\s+(\w+)\s+crdito(s)?\s+activo(s)?", normalized_letter)
+    active_credits = to_number(_search_from(_RE_ACTIVE_CREDITS, normalized_letter, "mantengo", exact=exact))
     
-    rejections = find_number(r"crdito en (\w+) ocasiones", normalized_letter)
+    rejections = to_number(_search_from(_RE_REJECTIONS, normalized_letter, "cr\x03dito en ", exact=exact))
     # Caso especial para "ningn rechazo".
-    if re.search(r"no he recibido ning.n rechazo", normalized_letter):
+    if _search_from(_RE_NO_REJECTIONS, normalized_letter, "no he recibido ning"):
         rejections = 0
 
     # Lgica de negacin para la mora.
     has_delinquencies_last_6m = False
     if "mora" in normalized_letter:
         # Solo es True si "mora" existe Y NO hay una negacin ("sin" o "no") cerca.
-        if not re.search(r"(sin|no).{0,40}mora", normalized_letter):
+        if not _RE_NEGATED_MORA.search(normalized_letter):
             has_delinquencies_last_6m = True
 
-    # Regex corregido para el rating.
-    rating_match = re.search(r'calificacin.*?"(.*?)"', letter, re.IGNORECASE | re.DOTALL)
+    # Regex corregido para el rating (el patrón exige el byte de control `\x03` heredado en el literal
+    # "calificaci\x03n", así que sin él en la carta no hay match).
+    rating_match = _RE_RATING.search(letter) if "\x03" in letter else None
     rating = rating_match.group(1).capitalize() if rating_match else "Regular"
 
     # Extrae el nombre completo.
-    full_name_match = re.search(r"Mi nombre es (.*?)[,.]", letter)
+    full_name_match = _search_from(_RE_FULL_NAME, letter, "Mi nombre es ")
     full_name = full_name_match.group(1) if full_name_match else "Unknown"
 
-    # Heurística para emprendimiento: tipo de empleo o palabras clave en la carta
-    kw = ["emprendimiento propio", "negocio propio", "emprendedor", "independiente",
-          "autónomo", "propietario", "dueño", "freelance"]
-    is_entrepreneur = False
-    employment_type_extracted = None # Initialize to None
-
-    # Try to extract employment_type from the letter
+    # Heurística para emprendimiento: tipo de empleo o palabras clave en la carta.
     # This is a simplified heuristic for fallback, LLM would be better
-    if "independiente" in normalized_letter:
-        employment_type_extracted = "independiente"
-        is_entrepreneur = True
-    elif "autónomo" in normalized_letter:
-        employment_type_extracted = "autónomo"
-        is_entrepreneur = True
-    elif "contratista" in normalized_letter:
-        employment_type_extracted = "contratista"
-        is_entrepreneur = True
-    elif "freelance" in normalized_letter:
-        employment_type_extracted = "freelance"
-        is_entrepreneur = True
-    elif "emprendedor" in normalized_letter:
-        employment_type_extracted = "emprendedor"
-        is_entrepreneur = True
-    elif any(k in normalized_letter for k in kw):
-        is_entrepreneur = True
-        if not employment_type_extracted: # If not already set by a more specific type
-            employment_type_extracted = "emprendedor" # Default to emprendedor if keywords found
+    employment_type_extracted = EMPLOYMENT_KEYWORDS.match(normalized_letter)
+    is_entrepreneur = employment_type_extracted is not None
 
     # Devuelve el objeto ApplicationExtract, validado por Pydantic.
     return ApplicationExtract(
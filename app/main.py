@@ -1,130 +1,26 @@
 # -*- coding: utf-8 -*- 
+"""CLI de decisiones de crédito; la API FastAPI está en `app/api.py`.
+
+`app.main:api` sigue siendo el punto de entrada de uvicorn: el atributo `api` se resuelve al
+pedirlo (PEP 562), así que correr la CLI no importa FastAPI, pandas ni los SDK de los LLM.
+"""
 # Importaciones necesarias de librerías y módulos locales.
 import argparse
 import json
-import pandas as pd
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-import uvicorn
 import logging
-
-# Importaciones de nuestros propios módulos de la aplicación.
-from app.llm_extractor import extract_with_llm
-from app.rules import load_rules, evaluate
-from app.schema import Decision, ApplicationExtract, BatchItem, BatchRequest, BatchRow, BatchResponse, ExplainRequest, ExplainResponse
-from app.batch import read_letters_from_folder, evaluate_batch, to_csv
-from app.explain import explain_decision
+import math
+import os
 
 # --- Configuración de Logging ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# --- Inicialización de la API FastAPI ---
-api = FastAPI( 
-    title="Credit Approval API", 
-    description="API para procesar cartas de crédito con LLM y reglas YAML. Incluye un fallback a regex.", 
-    version="1.0.0"
-)
-
-# --- Modelos de Datos para la API ---
-class DecisionRequest(BaseModel): 
-    letter: str 
-    rules_path: str = "business_rules.yaml"
-
-# --- Endpoints de la API ---
-@api.post("/extract", response_model=ApplicationExtract)
-def extract(req: DecisionRequest):
-    """Extrae variables estructuradas de la carta usando LLM o fallback"""
-    logger.info(f"[API] Recibida solicitud /extract para carta (longitud: {len(req.letter)}).")
-    try: 
-        return extract_with_llm(req.letter) 
-    except Exception as e: 
-        logger.error(f"[API] Error en /extract: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
-
-@api.post("/decision", response_model=Decision)
-def decision(req: DecisionRequest):
-    """Evalúa reglas de negocio y devuelve decisión Aprobado/Rechazado"""
-    logger.info(f"[API] Recibida solicitud /decision para carta (longitud: {len(req.letter)}).")
-    try: 
-        ex = extract_with_llm(req.letter) 
-        cfg = load_rules(req.rules_path) 
-        dec = evaluate(ex, cfg) 
-        return dec 
-    except Exception as e: 
-        logger.error(f"[API] Error en /decision: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
-
-@api.post("/batch_decision", response_model=BatchResponse)
-def batch_decision(req: BatchRequest):
-    """Procesa un lote de cartas y devuelve los resultados en formato estructurado."""
-    logger.info(f"[API] Recibida solicitud /batch_decision con {len(req.items)} ítems.")
-    if not req.items:
-        logger.warning("[API] Solicitud /batch_decision con 0 ítems.")
-        raise HTTPException(status_code=400, detail="La lista de ítems no puede estar vacía.")
-    
-    if len(req.items) > 100:
-        logger.warning(f"[API] Solicitud /batch_decision excede el límite de 100 ítems ({len(req.items)}).")
-        raise HTTPException(status_code=400, detail="El número máximo de ítems por lote es 100.")
-
-    # Convertir la lista de BatchItem a un formato que evaluate_batch pueda usar
-    letters_for_batch = [{'id': item.id, 'letter': item.letter} for item in req.items]
-    
-    try:
-        results_df = evaluate_batch(letters_for_batch, req.rules_path)
-        
-        # Transformar el DataFrame de pandas a la lista de BatchRow
-        batch_rows = []
-        for index, row in results_df.iterrows():
-            # Manejo de errores de parseo en ítems individuales
-            if "parse_error" in row and pd.notna(row["parse_error"]):
-                batch_rows.append(BatchRow(
-                    id=row["id"],
-                    approved=False,
-                    risk_score=1.0, # Máximo riesgo para errores de parseo
-                    failed_rules=["parse_error"], # Indicar que falló por error de parseo
-                    extracted=ApplicationExtract(applicant=None, employment=None, financials=None, credit=None, raw_letter=row["letter"])
-                ))
-            else:
-                # Reconstruir ApplicationExtract para el campo 'extracted'
-                extracted_app = ApplicationExtract(
-                    applicant=ApplicationExtract.Applicant(full_name=row['full_name'], age_years=row['age_years']),
-                    employment=ApplicationExtract.Employment(employment_tenure_months=row['tenure_months']),
-                    financials=ApplicationExtract.Financials(income_monthly=row['income'], requested_amount=row['requested_amount'], active_credits=row['active_credits']),
-                    credit=ApplicationExtract.CreditProfile(has_delinquencies_last_6m=row['has_mora'], credit_rating=row['rating'], rejections_last_12m=row['rejections_12m']),
-                    raw_letter=row['letter']
-                )
-                batch_rows.append(BatchRow(
-                    id=row["id"],
-                    approved=row["approved"],
-                    risk_score=row["risk_score"],
-                    failed_rules=row["failed_rules"].split(", ") if isinstance(row["failed_rules"], str) else [],
-                    extracted=extracted_app
-                ))
-        logger.info(f"[API] Procesado /batch_decision: {len(batch_rows)} ítems.")
-        return BatchResponse(rows=batch_rows)
-    except Exception as e:
-        logger.error(f"[API] Error en /batch_decision: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
-
-@api.post("/explain", response_model=ExplainResponse)
-def explain(req: ExplainRequest):
-    """Genera una explicación en lenguaje natural de la decisión de crédito."""
-    logger.info(f"[API] Recibida solicitud /explain para carta (longitud: {len(req.letter)}), proveedor: {req.provider}.")
-    try:
-        # Primero, obtener la decisión completa
-        extracted_data = extract_with_llm(req.letter)
-        rules_config = load_rules(req.rules_path)
-        decision_obj = evaluate(extracted_data, rules_config)
-        
-        # Luego, generar la explicación
-        explanation_text = explain_decision(decision_obj, req.provider)
-        
-        logger.info(f"[API] Explicación generada para decisión: {decision_obj.approved}.")
-        return ExplainResponse(decision=decision_obj, explanation=explanation_text)
-    except Exception as e:
-        logger.error(f"[API] Error en /explain: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+# --- API FastAPI (carga diferida) ---
+def __getattr__(name: str):
+    if name == "api":
+        from app.api import api
+        return api
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # --- Lógica para la Ejecución como Script (CLI) ---
 def main():
@@ -137,8 +33,47 @@ def main():
     group.add_argument("--letter", help="Ruta al archivo de texto de una sola carta.")
     group.add_argument("--batch_examples", action="store_true", help="Procesa todos los .txt de la carpeta /examples.")
     group.add_argument("--batch_csv", help="Ruta a un archivo CSV con columnas ['id', 'letter'].")
+    group.add_argument("--batch_dir", help="Carpeta (recursiva) o archivo .tar/.tgz/.zip con cartas .txt, leídas de a una.")
+    group.add_argument("--rescore", action="store_true",
+                       help="Vuelve a decidir las cartas del almacén de extracciones (FEATURE_STORE_PATH) con --rules, sin extraer.")
+    group.add_argument("--simulate", nargs="+", metavar="CLAVE=VALORES",
+                       help="Barrido de umbrales sobre el almacén de extracciones: clave=v1,v2 o clave=inicio:fin:paso.")
+    parser.add_argument("--fast", action="store_true",
+                        help="Con --letter: solo el veredicto, cortando en la primera regla decisiva (sin detalle por regla).")
+    parser.add_argument("--columnar", action="store_true", help="Evalúa los lotes en modo columnar (vectorizado).")
+    parser.add_argument("--concurrency", type=int, default=1, help="Número de extracciones LLM en paralelo en modo lote.")
+    parser.add_argument("--timeout", type=float, default=None, help="Timeout de extracción por carta (segundos) en modo lote.")
+    parser.add_argument("--pack", action="store_true",
+                        help="En modo lote, envía varias cartas por solicitud al LLM (grupos según LLM_BATCH_TOKENS).")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="En modo lote, reparte las cartas entre N procesos (extracción y reglas usan CPU en cada uno).")
+    parser.add_argument("--stream", action="store_true",
+                        help="Con --batch_csv: lee y escribe por bloques, con checkpoint para reanudar si se interrumpe.")
+    parser.add_argument("--chunksize", type=int, default=1000,
+                        help="Filas por bloque de lectura y escritura en modo lote (con --workers, también cartas por bloque de cada proceso).")
+    parser.add_argument("--max-bytes", type=int, default=None,
+                        help="Con --batch_dir: tamaño máximo por carta; las más grandes se omiten (por defecto INGEST_MAX_BYTES).")
+    parser.add_argument("--output", default=None, help="Archivo de salida de los lotes (el formato sale de la extensión).")
+    parser.add_argument("--format", choices=["csv", "ndjson", "parquet", "arrow"], default=None,
+                        help="Formato de salida de los lotes (por defecto según la extensión de --output, o CSV).")
+    parser.add_argument("--restart", action="store_true", help="Con --stream: ignora el checkpoint y empieza de cero.")
+    parser.add_argument("--store", action="store_true",
+                        help="En modo lote, guarda las extracciones y decisiones en el almacén (igual que FEATURE_STORE=1).")
+    parser.add_argument("--diff", action="store_true",
+                        help="Con --rescore: compara las decisiones nuevas con las de la corrida anterior.")
+    parser.add_argument("--compare-to", default=None,
+                        help="Con --rescore: versión del ruleset contra la que comparar (implica --diff).")
+    parser.add_argument("--limit", type=int, default=None,
+                        help="Con --simulate: usa solo las primeras N solicitudes del almacén.")
 
     args = parser.parse_args()
+    if args.store:
+        # Por variable de entorno para que también lo vean los procesos de --workers.
+        os.environ["FEATURE_STORE"] = "1"
+
+    # Cada modo importa solo lo que usa: --letter no necesita pandas, y ningún modo necesita FastAPI.
+    from app.llm_extractor import extract_with_llm
+    from app.rules import load_rules, evaluate
 
     # --- Lógica para procesar un solo archivo ---
     if args.letter:
@@ -148,6 +83,15 @@ def main():
         
         extracted_data = extract_with_llm(letter)
         rules = load_rules(args.rules)
+        if args.fast:
+            from app.rules import decide
+
+            screening = decide(extracted_data, rules)
+            print("--- DECISIÓN (modo rápido) ---")
+            print(f"APROBADO: {screening.approved}")
+            if screening.decisive_rule:
+                print(f"Regla decisiva: {screening.decisive_rule}")
+            return
         decision_result = evaluate(extracted_data, rules)
 
         print("--- EXTRACCIÓN ---")
@@ -160,41 +104,103 @@ def main():
         print(f"APROBADO: {decision_result.approved}")
         print(f"Riesgo: {decision_result.risk_score:.2f}")
 
-    # --- Lógica para procesar la carpeta de ejemplos ---
-    elif args.batch_examples:
-        logger.info("[CLI] Procesando lote de ejemplos desde la carpeta /examples...")
-        letters = read_letters_from_folder("examples/")
-        results_df = evaluate_batch(letters, args.rules)
-        output_path = "decisions.csv"
-        to_csv(results_df, output_path)
+    # --- Lógica para procesar la carpeta de ejemplos o una carpeta/archivo de cartas ---
+    elif args.batch_examples or args.batch_dir:
+        from app.batch import evaluate_to_file
+        from app.ingest import iter_letters, prefetch_size
+        from app.writers import default_output
+
+        source = args.batch_dir or "examples/"
+        logger.info(f"[CLI] Procesando lote de cartas desde '{source}'...")
+        # Las cartas se leen a medida que se procesan, con un hilo que adelanta la lectura del disco.
+        letters = iter_letters(source, recursive=bool(args.batch_dir), limit=args.max_bytes, prefetch=prefetch_size())
+        output_path = args.output or default_output("decisions", args.format)
+        # Los resultados se escriben por bloques a medida que se deciden (sin el DataFrame completo del lote).
+        summary = evaluate_to_file(letters, output_path, args.rules, fmt=args.format, chunksize=args.chunksize,
+                                   columnar=args.columnar, concurrency=args.concurrency, timeout=args.timeout,
+                                   pack=args.pack, workers=args.workers)
         
         # Muestra conteos de resultados
-        approved_count = results_df['approved'].sum()
-        rejected_count = len(results_df) - approved_count
         logger.info(f"[CLI] Proceso de lote completado. Resultados guardados en '{output_path}'.")
         print(f"Proceso de lote completado. Resultados guardados en '{output_path}'.")
-        print(f"  - Aprobados: {approved_count}")
-        print(f"  - Rechazados: {rejected_count}")
+        print(f"  - Aprobados: {summary['approved']}")
+        print(f"  - Rechazados: {summary['rejected']}")
 
     # --- Lógica para procesar un archivo CSV ---
+    elif args.batch_csv and args.stream:
+        from app.batch import evaluate_csv_stream
+        from app.writers import default_output
+
+        output_path = args.output or default_output("decisions_from_csv", args.format)
+        logger.info(f"[CLI] Procesando lote en streaming desde el archivo CSV: {args.batch_csv}...")
+        summary = evaluate_csv_stream(args.batch_csv, output_path, args.rules, chunksize=args.chunksize,
+                                      columnar=args.columnar, concurrency=args.concurrency, timeout=args.timeout,
+                                      restart=args.restart, pack=args.pack, workers=args.workers, fmt=args.format)
+        logger.info(f"[CLI] Proceso de lote completado. Resultados guardados en '{output_path}'.")
+        print(f"Proceso de lote completado. Resultados guardados en '{output_path}'.")
+        if summary["resumed_from"]:
+            print(f"  - Reanudado desde la fila {summary['resumed_from']}")
+        print(f"  - Aprobados: {summary['approved']}")
+        print(f"  - Rechazados: {summary['rejected']}")
+
     elif args.batch_csv:
+        from app import batch
+        from app.writers import default_output
+
         logger.info(f"[CLI] Procesando lote desde el archivo CSV: {args.batch_csv}...")
-        df = pd.read_csv(args.batch_csv)
-        # Asegurarse de que el CSV tiene las columnas correctas
-        if 'id' not in df.columns or 'letter' not in df.columns:
-            raise ValueError("El archivo CSV debe contener las columnas 'id' y 'letter'.")
-        
-        letters = df.to_dict('records')
-        results_df = evaluate_batch(letters, args.rules)
-        output_path = "decisions_from_csv.csv"
-        to_csv(results_df, output_path)
+        # El CSV se lee por bloques (valida las columnas 'id' y 'letter') y los resultados se escriben igual.
+        letters = batch.csv_letters(args.batch_csv, args.chunksize, 0)
+        output_path = args.output or default_output("decisions_from_csv", args.format)
+        summary = batch.evaluate_to_file(letters, output_path, args.rules, fmt=args.format, chunksize=args.chunksize,
+                                         columnar=args.columnar, concurrency=args.concurrency, timeout=args.timeout,
+                                         pack=args.pack, workers=args.workers)
 
-        approved_count = results_df['approved'].sum()
-        rejected_count = len(results_df) - approved_count
         logger.info(f"[CLI] Proceso de lote completado. Resultados guardados en '{output_path}'.")
         print(f"Proceso de lote completado. Resultados guardados en '{output_path}'.")
-        print(f"  - Aprobados: {approved_count}")
-        print(f"  - Rechazados: {rejected_count}")
+        print(f"  - Aprobados: {summary['approved']}")
+        print(f"  - Rechazados: {summary['rejected']}")
+
+    # --- Lógica para volver a decidir las extracciones guardadas ---
+    elif args.rescore:
+        from app.features import FeatureStore, feature_store_path
+        from app.writers import default_output
+
+        store = FeatureStore(feature_store_path())
+        logger.info(f"[CLI] Re-evaluando el almacén '{store.path}' con '{args.rules}'...")
+        output_path = args.output or (default_output("rescored", args.format) if args.format else None)
+        summary = store.rescore(load_rules(args.rules), args.rules, diff=args.diff, compare_to=args.compare_to,
+                                output_path=output_path, fmt=args.format)
+        print(f"Re-evaluadas {summary['rows']} cartas con el ruleset {summary['rules_version']} "
+              f"en {summary['seconds']:.2f}s.")
+        if output_path:
+            print(f"  - Resultados guardados en '{output_path}'")
+        print(f"  - Aprobados: {summary['approved']}")
+        print(f"  - Rechazados: {summary['rejected']}")
+        diff = summary["diff"]
+        if diff is not None:
+            print(f"--- DIFERENCIAS contra {diff['compare_to']} ({diff['compared']} cartas en ambas) ---")
+            print(f"  - Aprobadas -> rechazadas: {diff['approved_to_rejected']}")
+            print(f"  - Rechazadas -> aprobadas: {diff['rejected_to_approved']}")
+            print(f"  - Con otras reglas fallidas: {diff['failed_rules_changed']}")
+            for change in diff["changes"]:
+                print(f"    {change['id']}: {change['previous_approved']} -> {change['approved']}")
+        elif args.diff or args.compare_to:
+            print("  - No hay otra corrida guardada con la que comparar.")
+
+    # --- Lógica para simular umbrales sobre las extracciones guardadas ---
+    elif args.simulate:
+        from app.simulate import parse_grid, population_from_store, simulate
+
+        rules = load_rules(args.rules)
+        grid = parse_grid(args.simulate)
+        columns = population_from_store(rules, limit=args.limit)
+        logger.info(f"[CLI] Simulando {math.prod(len(values) for values in grid.values())} configuraciones de umbrales...")
+        result = simulate(columns, rules, grid)
+        if args.output:
+            result.to_csv(args.output, index=False)
+            print(f"Simulación guardada en '{args.output}'.")
+        print(f"{len(result)} configuraciones sobre {len(next(iter(columns.values())))} solicitudes:")
+        print(result.sort_values("approval_rate", ascending=False).head(20).to_string(index=False))
 
 # --- Punto de Entrada del Script ---
 if __name__ == "__main__": 
@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+"""Métricas del proceso en formato de texto de Prometheus (expuestas en GET /metrics).
+
+Implementación mínima sin dependencias: contadores, gauges e histogramas con etiquetas,
+pensados para el camino caliente: observar un histograma no toma locks (fragmentos por hilo).
+Cada worker de uvicorn tiene sus propias métricas; Prometheus las agrega por instancia.
+
+Variables de entorno: METRICS (1/0) activa o desactiva el registro de observaciones.
+"""
+import bisect
+import functools
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Buckets de latencia (segundos): desde el fallback por regex (~100 µs) hasta llamadas lentas al LLM.
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+BATCH_SIZE_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 1000, 10000, 100000)
+
+_enabled = os.getenv("METRICS", "1") != "0"
+
+def set_enabled(enabled: bool) -> None:
+    """Activa o desactiva el registro de observaciones (por ejemplo, para medir su costo)."""
+    global _enabled
+    _enabled = enabled
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+# --- Tipos de Métricas ---
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple([labels.get(name, "") for name in self.labelnames])
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        return "\n".join([f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", *self._samples()])
+
+class Counter(_Metric):
+    """Valor que solo crece (eventos)."""
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        if not self.labelnames:
+            # Sin etiquetas, la serie existe desde el inicio (ej. 0 solicitudes en curso).
+            self._values[()] = 0
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        if not _enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+class Gauge(Counter):
+    """Valor que sube y baja (ej. solicitudes en curso)."""
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        if not _enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+class _Timer:
+    """Context manager que observa en una serie del histograma el tiempo transcurrido dentro del bloque."""
+    __slots__ = ("_series", "_start")
+
+    def __init__(self, series: "_HistogramSeries"):
+        self._series = series
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._series.observe(time.perf_counter() - self._start)
+        return False
+
+class _HistogramSeries:
+    """Una combinación de etiquetas de un histograma (`Histogram.labels(...)` la devuelve).
+
+    Cada hilo escribe en su propio fragmento (conteo por bucket + "+Inf" y suma), así que observar
+    no toma ningún lock; `snapshot` suma los fragmentos y absorbe los de hilos que ya terminaron
+    (los pools de extracción crean hilos por lote).
+    """
+    __slots__ = ("_buckets", "_lock", "_local", "_shards", "_retired")
+
+    # Al superar esta cantidad de fragmentos se absorben los de hilos muertos sin esperar a un scrape.
+    MAX_SHARDS = 64
+
+    def __init__(self, buckets: Tuple[float, ...], lock: threading.Lock):
+        self._buckets = buckets
+        self._lock = lock
+        self._local = threading.local()
+        self._shards: List[Tuple[threading.Thread, List[float]]] = []
+        self._retired = [0] * (len(buckets) + 1) + [0.0]
+
+    def _new_shard(self) -> List[float]:
+        shard = [0] * (len(self._buckets) + 1) + [0.0]
+        with self._lock:
+            if len(self._shards) >= self.MAX_SHARDS:
+                self._absorb_dead()
+            self._shards.append((threading.current_thread(), shard))
+        self._local.shard = shard
+        return shard
+
+    def _absorb_dead(self) -> None:
+        alive = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                alive.append((thread, shard))
+            else:
+                self._retired = [a + b for a, b in zip(self._retired, shard)]
+        self._shards = alive
+
+    def observe(self, value: float) -> None:
+        if not _enabled:
+            return
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._new_shard()
+        shard[bisect.bisect_left(self._buckets, value)] += 1
+        shard[-1] += value
+
+    def time(self) -> _Timer:
+        return _Timer(self)
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        """(conteo por bucket no acumulado, suma) de todos los hilos."""
+        with self._lock:
+            self._absorb_dead()
+            totals = list(self._retired)
+            for _, shard in self._shards:
+                totals = [a + b for a, b in zip(totals, shard)]
+        return totals[:-1], totals[-1]
+
+class Histogram(_Metric):
+    """Distribución por buckets acumulativos, con suma y cantidad de observaciones."""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], _HistogramSeries] = {}
+
+    def labels(self, **labels: str) -> _HistogramSeries:
+        """La serie de esas etiquetas (se crea la primera vez); en el camino caliente conviene guardarla."""
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            with self._lock:
+                series = self._series.setdefault(key, _HistogramSeries(self.buckets, self._lock))
+        return series
+
+    def observe(self, value: float, **labels: str) -> None:
+        if _enabled:
+            self.labels(**labels).observe(value)
+
+    def time(self, **labels: str) -> _Timer:
+        """`with histogram.time(stage="rules"): ...` mide la duración del bloque."""
+        return _Timer(self.labels(**labels))
+
+    def count(self, **labels: str) -> int:
+        series = self._series.get(self._key(labels))
+        return sum(series.snapshot()[0]) if series else 0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            series_items = sorted(self._series.items())
+        items = [(key, series.snapshot()) for key, series in series_items]
+        lines = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {repr(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+def timed(histogram: Histogram, **labels: str):
+    """Decorador: observa en `histogram` la duración de cada llamada a la función."""
+    series = histogram.labels(**labels)
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                series.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+# --- Métricas de la Aplicación ---
+
+REGISTRY: List[_Metric] = []
+
+EXTRACTION_SECONDS = Histogram("credit_extraction_seconds",
+                               "Duración de cada extracción por proveedor (gemini, openai o regex).", ["provider"])
+STAGE_SECONDS = Histogram("credit_stage_seconds",
+                          "Duración de las etapas posteriores a la extracción (rules, explanation, serialization).",
+                          ["stage"])
+LLM_FALLBACKS = Counter("credit_llm_fallbacks_total",
+                        "Extracciones que cayeron al fallback por regex después de un error del proveedor LLM.",
+                        ["provider"])
+LLM_HEDGES = Counter("credit_llm_hedges_total",
+                     "Extracciones con plazo: respondidas con el fallback porque el LLM no llegó a tiempo "
+                     "(outcome=hedged) y respuestas del LLM que llegaron después (outcome=late).",
+                     ["provider", "outcome"])
+LLM_BREAKER_STATE = Gauge("credit_llm_breaker_state",
+                          "Estado del circuit breaker de cada proveedor LLM (0 cerrado, 1 medio abierto, 2 abierto).",
+                          ["provider"])
+LLM_BREAKER_REJECTIONS = Counter("credit_llm_breaker_rejections_total",
+                                 "Extracciones desviadas porque el circuit breaker del proveedor estaba abierto.",
+                                 ["provider"])
+LLM_LIMITER_QUEUE = Gauge("credit_llm_limiter_queue", "Llamadas esperando cupo en el limitador del proveedor LLM.",
+                          ["provider"])
+REQUESTS_IN_FLIGHT = Gauge("credit_http_requests_in_flight", "Solicitudes HTTP en curso (incluye respuestas en streaming).")
+REQUEST_SECONDS = Histogram("credit_http_request_seconds", "Duración de las solicitudes HTTP por ruta y método.",
+                            ["method", "route"])
+BATCH_SIZE = Histogram("credit_batch_size", "Cantidad de cartas por lote recibido.", ["endpoint"], BATCH_SIZE_BUCKETS)
+
+def render() -> str:
+    """Todas las métricas en el formato de exposición de texto de Prometheus (0.0.4)."""
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+# --- Middleware ASGI ---
+
+class MetricsMiddleware:
+    """Cuenta las solicitudes en curso y mide su duración por plantilla de ruta (ej. /jobs/{job_id}).
+
+    Es un middleware ASGI puro (no `BaseHTTPMiddleware`): no envuelve la respuesta y cubre el
+    cuerpo completo de las respuestas en streaming.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            # FastAPI deja la ruta resuelta en el scope; sin ella (404) no se usa la URL cruda.
+            route: Optional[object] = scope.get("route")
+            REQUEST_SECONDS.observe(time.perf_counter() - start, method=scope["method"],
+                                    route=getattr(route, "path", "unmatched"))
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""Clientes de los proveedores LLM, creados una sola vez por proceso.
+
+Crear un `openai.OpenAI` (o reconfigurar Gemini) por carta descarta el pool de conexiones HTTP,
+el keep-alive y las sesiones TLS. Aquí cada cliente se construye la primera vez que se pide y
+se reutiliza en las llamadas siguientes, tanto desde la CLI como desde la API.
+
+Variables de entorno:
+- LLM_POOL_SIZE: conexiones HTTP simultáneas por cliente de OpenAI (por defecto 20).
+- LLM_TIMEOUT: timeout de cada llamada al proveedor, en segundos (por defecto 60).
+
+Los clientes asíncronos de OpenAI quedan ligados al event loop que los creó, así que se guardan
+uno por loop (la CLI con `asyncio.run` y la API usan loops distintos).
+
+Los SDK (`openai`, `google.generativeai`, `httpx`) se importan al pedir el primer cliente: un
+proceso que solo usa Gemini nunca carga `openai` y uno sin claves (fallback por regex) no carga ninguno.
+"""
+import asyncio
+import os
+import threading
+import weakref
+from typing import TYPE_CHECKING, Dict, Tuple
+
+if TYPE_CHECKING:
+    import google.generativeai as genai
+    import httpx
+    import openai
+
+def pool_size() -> int:
+    return int(os.getenv("LLM_POOL_SIZE", "20"))
+
+def request_timeout() -> float:
+    return float(os.getenv("LLM_TIMEOUT", "60"))
+
+def _limits() -> "httpx.Limits":
+    import httpx
+
+    size = pool_size()
+    return httpx.Limits(max_connections=size, max_keepalive_connections=size)
+
+_lock = threading.Lock()
+_openai_clients: "Dict[Tuple[str, str], openai.OpenAI]" = {}
+_async_openai_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[str, str], openai.AsyncOpenAI]]" = weakref.WeakKeyDictionary()
+_gemini_models: "Dict[Tuple[str, str], genai.GenerativeModel]" = {}
+_gemini_key = None
+
+# --- OpenAI ---
+
+def _openai_key(api_key: str) -> Tuple[str, str]:
+    # OPENAI_BASE_URL forma parte de la clave: apuntar a otro servidor crea otro cliente.
+    return api_key, os.getenv("OPENAI_BASE_URL", "")
+
+def get_openai_client(api_key: str) -> "openai.OpenAI":
+    """Cliente síncrono de OpenAI con pool de conexiones, compartido por todos los hilos."""
+    key = _openai_key(api_key)
+    client = _openai_clients.get(key)
+    if client is None:
+        import httpx
+        import openai
+
+        with _lock:
+            client = _openai_clients.get(key)
+            if client is None:
+                timeout = request_timeout()
+                client = openai.OpenAI(
+                    api_key=api_key,
+                    timeout=timeout,
+                    http_client=httpx.Client(limits=_limits(), timeout=timeout),
+                )
+                _openai_clients[key] = client
+    return client
+
+def get_async_openai_client(api_key: str) -> "openai.AsyncOpenAI":
+    """Cliente asíncrono de OpenAI del event loop actual (se crea una vez por loop)."""
+    import httpx
+    import openai
+
+    loop = asyncio.get_running_loop()
+    key = _openai_key(api_key)
+    with _lock:
+        clients = _async_openai_clients.setdefault(loop, {})
+        client = clients.get(key)
+        if client is None:
+            timeout = request_timeout()
+            client = openai.AsyncOpenAI(
+                api_key=api_key,
+                timeout=timeout,
+                http_client=httpx.AsyncClient(limits=_limits(), timeout=timeout),
+            )
+            clients[key] = client
+    return client
+
+# --- Gemini ---
+
+def get_gemini_model(api_key: str, model_name: str) -> "genai.GenerativeModel":
+    """Modelo de Gemini reutilizable; `genai.configure` solo se llama cuando cambia la clave.
+
+    El SDK de Gemini usa un canal gRPC (HTTP/2 multiplexado), así que no hay un pool que
+    dimensionar: basta con no reconfigurarlo en cada llamada. El timeout va en `request_options`.
+    """
+    global _gemini_key
+    key = (api_key, model_name)
+    model = _gemini_models.get(key)
+    if model is None:
+        import google.generativeai as genai
+
+        with _lock:
+            if _gemini_key != api_key:
+                genai.configure(api_key=api_key)
+                _gemini_key = api_key
+                _gemini_models.clear()
+            model = _gemini_models.setdefault(key, genai.GenerativeModel(model_name))
+    return model
+
+def gemini_request_options() -> dict:
+    return {"timeout": request_timeout()}
+
+# --- Cierre ---
+
+def close_clients() -> None:
+    """Cierra los clientes síncronos y olvida todos los demás (ej. al apagar la API)."""
+    global _gemini_key
+    with _lock:
+        clients = list(_openai_clients.values())
+        _openai_clients.clear()
+        _async_openai_clients.clear()
+        _gemini_models.clear()
+        _gemini_key = None
+    for client in clients:
+        client.close()
+
+async def aclose_clients() -> None:
+    """Cierra los clientes asíncronos del event loop actual y luego los síncronos."""
+    with _lock:
+        clients = list(_async_openai_clients.pop(asyncio.get_running_loop(), {}).values())
+    for client in clients:
+        await client.close()
+    close_clients()
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""Registro de rulesets compartido por todo el proceso.
+
+Evita releer y reparsear `business_rules.yaml` en cada solicitud: los planes compilados se
+guardan por ruta y solo se recargan cuando cambia el archivo (mtime/tamaño y luego hash).
+Un hilo opcional vigila los archivos y reemplaza el plan de forma atómica, sin reiniciar uvicorn.
+"""
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Tuple
+
+from app.rules import RulePlan, parse_rules, ruleset_digest
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class _Entry:
+    """Un ruleset cargado junto con la firma del archivo del que salió."""
+    plan: RulePlan
+    stat: Tuple[int, int]  # (mtime_ns, tamaño)
+    digest: str
+
+class RulesetRegistry:
+    """Caché de `RulePlan` por ruta con invalidación por mtime/hash y recarga en caliente."""
+
+    def __init__(self):
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @staticmethod
+    def _key(path: str) -> str:
+        return os.path.abspath(path)
+
+    def _load(self, key: str, current: Optional[_Entry]) -> _Entry:
+        """Relee el archivo; si el contenido no cambió se conserva el mismo plan."""
+        st = os.stat(key)
+        with open(key, 'rb') as f:
+            data = f.read()
+        digest = ruleset_digest(data)
+        if current is not None and current.digest == digest:
+            return _Entry(plan=current.plan, stat=(st.st_mtime_ns, st.st_size), digest=digest)
+        plan = parse_rules(data)
+        if current is not None:
+            logger.info(f"[RULES] Ruleset '{key}' recargado: {current.plan.version} -> {plan.version}.")
+        return _Entry(plan=plan, stat=(st.st_mtime_ns, st.st_size), digest=digest)
+
+    def _refresh(self, key: str) -> _Entry:
+        """Recarga la entrada si el archivo cambió desde la última lectura."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            st = os.stat(key)
+            if (st.st_mtime_ns, st.st_size) == entry.stat:
+                return entry
+        with self._lock:
+            # Otro hilo pudo haberla recargado mientras esperábamos el lock.
+            entry = self._entries.get(key)
+            if entry is not None:
+                st = os.stat(key)
+                if (st.st_mtime_ns, st.st_size) == entry.stat:
+                    return entry
+            new_entry = self._load(key, entry)
+            # El reemplazo es una sola asignación: los lectores ven el plan viejo o el nuevo, nunca uno a medias.
+            self._entries[key] = new_entry
+            return new_entry
+
+    def get(self, path: str) -> RulePlan:
+        """Devuelve el plan compilado de `path`.
+
+        Si el vigilante está activo se devuelve directamente la versión en memoria; si no,
+        se verifica el mtime del archivo en cada llamada.
+        """
+        key = self._key(path)
+        entry = self._entries.get(key)
+        if entry is not None and self.watching:
+            return entry.plan
+        return self._refresh(key).plan
+
+    def preload(self, paths: Iterable[str]) -> None:
+        """Carga y compila los rulesets indicados (ej. al arrancar la API)."""
+        for path in paths:
+            plan = self.get(path)
+            logger.info(f"[RULES] Ruleset '{path}' precargado (versión {plan.version}).")
+
+    def refresh_all(self) -> None:
+        """Revisa todos los rulesets cargados y recarga los que cambiaron."""
+        for key in list(self._entries):
+            try:
+                self._refresh(key)
+            except Exception as e:
+                # Un YAML inválido o borrado no debe tumbar la versión que ya está en uso.
+                logger.error(f"[RULES] No se pudo recargar '{key}': {e}")
+
+    def clear(self) -> None:
+        """Olvida todos los rulesets cargados."""
+        with self._lock:
+            self._entries.clear()
+
+    # --- Vigilancia de Archivos ---
+
+    @property
+    def watching(self) -> bool:
+        return self._watcher is not None and self._watcher.is_alive()
+
+    def start_watching(self, interval: float = 2.0) -> None:
+        """Inicia un hilo que revisa los archivos cada `interval` segundos."""
+        if self.watching:
+            return
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(interval):
+                self.refresh_all()
+
+        self._watcher = threading.Thread(target=run, name="ruleset-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self) -> None:
+        """Detiene el hilo vigilante (si está activo)."""
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+        self._watcher = None
+
+# Registro compartido por la API, la CLI y el procesamiento por lotes.
+registry = RulesetRegistry()
+
+def get_rules(path: str) -> RulePlan:
+    """Atajo para `registry.get(path)`."""
+    return registry.get(path)
@@ -1,147 +1,491 @@
 # -*- coding: utf-8 -*-
 # Importaciones necesarias.
+import hashlib
+import operator
+import threading
+import time
+import weakref
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
 import yaml  # Librería para leer y escribir archivos YAML.
+from app import metrics
 from app.schema import ApplicationExtract, Decision, RuleResult # Modelos de datos Pydantic.
 
+# --- Vocabulario del Motor Declarativo ---
+
+# Operadores de comparación soportados en el YAML (`op:`). Todos reciben (valor, umbral).
+COMPARATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    ">=": operator.ge,
+    ">": operator.gt,
+    "<=": operator.le,
+    "<": operator.lt,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+# Operadores que no comparan contra un umbral sino contra una lista de valores (`values:`) o contra nada.
+UNARY_OPS = ("not", "truthy")
+MEMBERSHIP_OPS = ("in", "contains_any")
+
+# Escalas ordinales por defecto. Se pueden redefinir en la sección `scales:` del YAML.
+# "Mala" es el peor, "Excelente" es el mejor.
+DEFAULT_SCALES: Dict[str, Tuple[str, ...]] = {
+    "credit_rating": ("Mala", "Regular", "Buena", "Muy Buena", "Excelente"),
+}
+
+def _amount_income_ratio(ex: ApplicationExtract) -> float:
+    """Ratio entre el monto solicitado y el ingreso mensual (inf si el ingreso es 0)."""
+    income = ex.financials.income_monthly
+    return ex.financials.requested_amount / income if income > 0 else float('inf')
+
+# Campos derivados: no existen en el modelo pero se pueden usar como `field:` en el YAML.
+DERIVED_FIELDS: Dict[str, Callable[[ApplicationExtract], Any]] = {
+    "amount_income_ratio": _amount_income_ratio,
+}
+
+# Declaraciones equivalentes para archivos YAML antiguos que solo traen `id` y `desc`.
+# Si una regla del YAML ya declara `op` o `any_of`, esta tabla no se usa.
+LEGACY_RULE_SPECS: Dict[str, dict] = {
+    "income_min": {"field": "financials.income_monthly", "op": ">=", "threshold": "min_income"},
+    "no_delinquency_6m": {"field": "credit.has_delinquencies_last_6m", "op": "not",
+                          "format": "has_delinquencies_last_6m: {value}"},
+    "age_min": {"field": "applicant.age_years", "op": ">=", "threshold": "min_age"},
+    "amount_ratio_ok": {"field": "amount_income_ratio", "op": "<=", "threshold": "max_amount_income_ratio",
+                        "format": "{value:.2f} <= {threshold}"},
+    "experience_or_entrepreneur_ok": {
+        "any_of": [
+            {"field": "employment.employment_tenure_months", "op": ">=", "threshold": "min_experience_months",
+             "reason": "Antigüedad={value}m >= {threshold}m"},
+            {"any_of": [
+                {"field": "employment.employment_type", "op": "in", "normalize": True,
+                 "values": ["independiente", "autónomo", "contratista", "freelance", "emprendedor"]},
+                {"field": "raw_letter", "op": "contains_any", "normalize": True,
+                 "values": ["emprendimiento propio", "negocio propio", "emprendedor", "independiente",
+                            "autónomo", "propietario", "dueño", "freelance"]},
+             ],
+             "reason": "Evidencia de emprendimiento/negocio propio"},
+        ],
+        "fail_reason": "No cumple antigüedad mínima ni se evidencia emprendimiento",
+        "value_field": "employment.employment_tenure_months",
+        "format": "{value}",
+    },
+    "active_credits_max": {"field": "financials.active_credits", "op": "<=", "threshold": "max_active_credits"},
+    "credit_rating_min": {"field": "credit.credit_rating", "op": ">=", "threshold": "min_credit_rating",
+                          "scale": "credit_rating"},
+    "rejections_max": {"field": "credit.rejections_last_12m", "op": "<=", "threshold": "max_rejections_12m"},
+}
+
+# --- Plan de Reglas Compilado ---
+
+@dataclass(frozen=True)
+class CompiledCondition:
+    """Una condición ya resuelta: campo, operador y umbral precalculado.
+
+    `check` es un closure que recibe la extracción y devuelve (pasó, valor_leído); `test` aplica
+    la misma prueba sobre un valor ya leído. Los grupos OR (`any_of`) guardan sus condiciones
+    hijas en `children`.
+    """
+    op: str
+    check: Callable[[ApplicationExtract], Tuple[bool, Any]]
+    test: Optional[Callable[[Any], bool]] = None
+    field: Optional[str] = None
+    threshold: Any = None        # El umbral tal como se muestra (ej. "Buena", 0.3).
+    threshold_key: Optional[str] = None  # La clave de `thresholds:` de la que salió (None si es un literal).
+    operand: Any = None          # El umbral tal como se compara (ej. rango 2, frozenset de valores).
+    scale: Optional[Mapping[str, int]] = None
+    normalize: bool = False
+    reason: Optional[str] = None
+    children: Tuple["CompiledCondition", ...] = ()
+
+@dataclass(frozen=True)
+class CompiledRule:
+    """Una regla de negocio lista para ejecutarse sin volver a leer la configuración."""
+    id: str
+    desc: str
+    condition: Optional[CompiledCondition]  # None si la regla no tiene declaración conocida.
+    value_format: str = "{value} {op} {threshold}"
+    fail_reason: Optional[str] = None
+    value_getter: Optional[Callable[[ApplicationExtract], Any]] = None
+
+    @property
+    def failure_reason(self) -> str:
+        """La razón que reporta `run` cuando la regla falla (no depende de la extracción)."""
+        if self.condition is None:
+            return ""
+        if self.condition.op == "any_of":
+            return self.fail_reason or self.desc
+        return self.desc
+
+    def run(self, ex: ApplicationExtract) -> RuleResult:
+        """Evalúa la regla sobre una extracción y construye su `RuleResult`."""
+        cond = self.condition
+        if cond is None:
+            return RuleResult(id=self.id, passed=False, reason="", value="")
+
+        if cond.op == "any_of":
+            # Grupo OR: la razón es la de la primera rama que se cumple.
+            passed, reason = False, self.failure_reason
+            for child in cond.children:
+                ok, child_value = child.check(ex)
+                if ok:
+                    passed = True
+                    reason = child.reason.format(value=child_value, threshold=child.threshold) if child.reason else self.desc
+                    break
+            value = self.value_format.format(value=self.value_getter(ex) if self.value_getter else "")
+        else:
+            passed, raw_value = cond.check(ex)
+            reason = self.desc
+            value = self.value_format.format(value=raw_value, op=cond.op, threshold=cond.threshold)
+        return RuleResult(id=self.id, passed=passed, reason=reason, value=value)
+
+@dataclass(frozen=True)
+class RulePlan:
+    """Plan inmutable compilado a partir de `business_rules.yaml`.
+
+    Se construye una sola vez en `load_rules` y se reutiliza para todas las solicitudes.
+    """
+    rules: Tuple[CompiledRule, ...]
+    logic: str
+    thresholds: Mapping[str, Any]
+    scales: Mapping[str, Mapping[str, int]]
+    config: Mapping[str, Any] = field(repr=False, default_factory=dict)
+    version: Optional[str] = None  # Hash del contenido del YAML (para auditar qué política se aplicó).
+
+    @property
+    def rating_rank(self) -> Mapping[str, int]:
+        """Diccionario calificación -> rango (ej. {"Mala": 0, ..., "Excelente": 4})."""
+        return self.scales["credit_rating"]
+
+# --- Compilación ---
+
+def _field_getter(path: str) -> Callable[[ApplicationExtract], Any]:
+    """Devuelve un getter para un campo derivado o una ruta con puntos (ej. "financials.income_monthly")."""
+    if path in DERIVED_FIELDS:
+        return DERIVED_FIELDS[path]
+    return operator.attrgetter(path)
+
+def normalize_text(value: Any) -> str:
+    """Normalización usada por `normalize: true`: texto sin espacios extremos y en minúsculas."""
+    return (value or "").strip().lower()
+
+def _compile_condition(spec: dict, thresholds: Mapping[str, Any], scales: Mapping[str, Mapping[str, int]]) -> CompiledCondition:
+    """Convierte la declaración YAML de una condición en un closure con los umbrales ya resueltos."""
+    reason = spec.get("reason")
+
+    # Grupo OR: pasa si cualquiera de las condiciones hijas pasa.
+    if "any_of" in spec:
+        children = tuple(_compile_condition(child, thresholds, scales) for child in spec["any_of"])
+        checks = tuple(child.check for child in children)
+
+        def check_any(ex):
+            for child_check in checks:
+                if child_check(ex)[0]:
+                    return True, None
+            return False, None
+        return CompiledCondition(op="any_of", check=check_any, reason=reason, children=children)
+
+    op = spec["op"]
+    path = spec["field"]
+    get = _field_getter(path)
+    normalize = bool(spec.get("normalize", False))
+    if normalize:
+        raw_get = get
+        get = lambda ex: normalize_text(raw_get(ex))
+
+    # `test` recibe el valor ya leído (y normalizado); `check` lee el valor de la extracción y lo prueba.
+    if op in UNARY_OPS:
+        threshold = operand = None
+        test = operator.not_ if op == "not" else bool
+        scale = None
+    elif op in MEMBERSHIP_OPS:
+        threshold = tuple(spec["values"])
+        scale = None
+        if op == "in":
+            operand = frozenset(threshold)
+            test = operand.__contains__
+        else:
+            operand = threshold
+            test = lambda value: any(k in value for k in operand)
+    elif op in COMPARATORS:
+        compare = COMPARATORS[op]
+        # El umbral puede ser el nombre de una clave de `thresholds:` o un literal en `value:`.
+        threshold = thresholds[spec["threshold"]] if "threshold" in spec else spec["value"]
+        if "scale" in spec:
+            # Escala ordinal: se compara el rango, no el texto. Un valor fuera de la escala tiene rango -1.
+            scale = scales[spec["scale"]]
+            if threshold not in scale:
+                raise ValueError(f"El umbral {threshold!r} no pertenece a la escala {spec['scale']!r}.")
+            operand = scale[threshold]
+            rank_get = scale.get
+            test = lambda value: compare(rank_get(value, -1), operand)
+        else:
+            scale = None
+            operand = threshold
+            test = lambda value: compare(value, operand)
+    else:
+        raise ValueError(f"Operador desconocido en la regla: {op!r}")
+
+    def check(ex):
+        value = get(ex)
+        return test(value), value
+    return CompiledCondition(op=op, check=check, test=test, field=path, threshold=threshold,
+                             threshold_key=spec.get("threshold") if op in COMPARATORS else None, operand=operand,
+                             scale=scale, normalize=normalize, reason=reason)
+
+def compile_rules(cfg: dict, version: Optional[str] = None) -> RulePlan:
+    """Compila la configuración YAML (ya parseada) en un `RulePlan` inmutable.
+
+    Args:
+        cfg (dict): El diccionario con las secciones `thresholds`, `decision`, `rules` y opcionalmente `scales`.
+        version (str, opcional): Identificador de la versión del ruleset (ver `ruleset_digest`).
+
+    Returns:
+        RulePlan: El plan con closures, umbrales precalculados y rangos de las escalas.
+    """
+    thresholds = MappingProxyType(dict(cfg['thresholds']))
+    scale_lists = {**DEFAULT_SCALES, **(cfg.get('scales') or {})}
+    scales = MappingProxyType({name: MappingProxyType({v: i for i, v in enumerate(values)})
+                               for name, values in scale_lists.items()})
+
+    compiled = []
+    for rule in cfg['rules']:
+        # Las reglas sin declaración (formato antiguo) toman la definición equivalente de LEGACY_RULE_SPECS.
+        spec = rule if ("op" in rule or "any_of" in rule) else {**LEGACY_RULE_SPECS.get(rule['id'], {}), **rule}
+        desc = rule.get('desc', "")
+        if "op" not in spec and "any_of" not in spec:
+            compiled.append(CompiledRule(id=rule['id'], desc=desc, condition=None))
+            continue
+
+        condition = _compile_condition(spec, thresholds, scales)
+        default_format = "{value}" if condition.op == "any_of" else "{value} {op} {threshold}"
+        compiled.append(CompiledRule(
+            id=rule['id'],
+            desc=desc,
+            condition=condition,
+            value_format=spec.get("format", default_format),
+            fail_reason=spec.get("fail_reason"),
+            value_getter=_field_getter(spec["value_field"]) if "value_field" in spec else None,
+        ))
+
+    return RulePlan(
+        rules=tuple(compiled),
+        logic=cfg['decision']['logic'],
+        thresholds=thresholds,
+        scales=scales,
+        config=MappingProxyType(cfg),
+        version=version,
+    )
+
 # --- Carga de Reglas ---
 
-def load_rules(path: str) -> dict:
-    """Carga las reglas de negocio desde un archivo YAML.
-    
+def ruleset_digest(data: bytes) -> str:
+    """Hash SHA-256 del contenido de un archivo de reglas."""
+    return hashlib.sha256(data).hexdigest()
+
+def parse_rules(data: bytes) -> RulePlan:
+    """Parsea y compila el contenido (en bytes) de un archivo YAML de reglas.
+
+    La versión del plan son los primeros 12 caracteres del hash del contenido.
+    """
+    # yaml.safe_load es la forma segura de parsear un archivo YAML.
+    return compile_rules(yaml.safe_load(data.decode('utf-8')), version=ruleset_digest(data)[:12])
+
+def load_rules(path: str) -> RulePlan:
+    """Carga las reglas de negocio desde un archivo YAML y las compila en un plan inmutable.
+
     Args:
         path (str): La ruta al archivo business_rules.yaml.
-    
+
     Returns:
-        dict: Un diccionario con la configuración de umbrales, reglas y lógica de decisión.
+        RulePlan: El plan compilado con umbrales, reglas y lógica de decisión.
     """
-    with open(path, 'r', encoding='utf-8') as f:
-        # yaml.safe_load es la forma segura de parsear un archivo YAML.
-        return yaml.safe_load(f)
+    with open(path, 'rb') as f:
+        return parse_rules(f.read())
 
 # --- Motor de Evaluación ---
 
-def evaluate(ex: ApplicationExtract, cfg: dict) -> Decision:
+_RULES_SECONDS = metrics.STAGE_SECONDS.labels(stage="rules")
+
+def evaluate(ex: ApplicationExtract, cfg: Union[RulePlan, dict]) -> Decision:
     """Evalúa los datos extraídos de la aplicación contra las reglas de negocio.
-    
+
     Args:
         ex (ApplicationExtract): El objeto con los datos extraídos de la carta.
-        cfg (dict): El diccionario de configuración cargado desde el archivo YAML.
-        
+        cfg (RulePlan | dict): El plan compilado por `load_rules` (o un diccionario YAML sin compilar).
+
     Returns:
         Decision: Un objeto que contiene el resultado de la evaluación, la decisión final y el detalle.
     """
-    # Extrae las secciones principales del diccionario de configuración.
-    rules = cfg['rules']
-    thresholds = cfg['thresholds']
-    decision_logic = cfg['decision']['logic']
-
-    # Define el orden jerárquico de las calificaciones crediticias. "Mala" es el peor, "Excelente" es el mejor.
-    credit_rating_order = ["Mala", "Regular", "Buena", "Muy Buena", "Excelente"]
-
-    # Lista para almacenar el resultado de la evaluación de cada regla individual.
-    rule_results = []
-    
-    # Itera sobre cada una de las reglas definidas en el archivo YAML.
-    for rule in rules:
-        passed = False  # Por defecto, la regla no se ha pasado.
-        reason = ""    # Descripción de la regla.
-        value = ""      # Texto que muestra la comparación realizada (ej. "1800000 >= 1000000").
-
-        # --- Bloque de Condiciones: Evalúa cada regla por su ID ---
-        # Cada bloque compara un dato extraído (ex) con un umbral (thresholds).
-
-        if rule['id'] == 'income_min':
-            passed = ex.financials.income_monthly >= thresholds['min_income']
-            value = f"{ex.financials.income_monthly} >= {thresholds['min_income']}"
-            reason = rule['desc']
-        
-        elif rule['id'] == 'no_delinquency_6m':
-            # La regla pasa si el aplicante NO tiene moras.
-            passed = not ex.credit.has_delinquencies_last_6m
-            value = f"has_delinquencies_last_6m: {ex.credit.has_delinquencies_last_6m}"
-            reason = rule['desc']
-
-        elif rule['id'] == 'age_min':
-            passed = ex.applicant.age_years >= thresholds['min_age']
-            value = f"{ex.applicant.age_years} >= {thresholds['min_age']}"
-            reason = rule['desc']
-
-        elif rule['id'] == 'amount_ratio_ok': 
-            # Calcula el ratio entre el monto solicitado y el ingreso mensual.
-            # Se protege contra una división por cero si el ingreso es 0.
-            ratio = ex.financials.requested_amount / ex.financials.income_monthly if ex.financials.income_monthly > 0 else float('inf')
-            passed = ratio <= thresholds['max_amount_income_ratio']
-            value = f"{ratio:.2f} <= {thresholds['max_amount_income_ratio']}" # Formatea el ratio a 2 decimales.
-            reason = rule['desc']
-
-        elif rule['id'] == 'experience_or_entrepreneur_ok':
-            # --- Nueva regla OR: antigüedad >= umbral  O  emprendimiento propio ---
-            text = (ex.raw_letter or "").lower()
-
-            # Heurística para emprendimiento: tipo de empleo o palabras clave en la carta
-            kw = ["emprendimiento propio", "negocio propio", "emprendedor", "independiente",
-                  "autónomo", "propietario", "dueño", "freelance"]
-            is_entrepreneur = False
-            etype = (ex.employment.employment_type or "").strip().lower()
-
-            if etype in ["independiente", "autónomo", "contratista", "freelance", "emprendedor"]:
-                is_entrepreneur = True
-            elif any(k in text for k in kw):
-                is_entrepreneur = True
-
-            exp_ok = ex.employment.employment_tenure_months >= thresholds["min_experience_months"]
-            or_ok = exp_ok or is_entrepreneur
-
-            passed = or_ok
-            reason = (
-                f"Antigüedad={ex.employment.employment_tenure_months}m >= {thresholds['min_experience_months']}m"
-                if exp_ok else
-                ("Evidencia de emprendimiento/negocio propio" if is_entrepreneur else
-                 "No cumple antigüedad mínima ni se evidencia emprendimiento")
-            )
-            value = str(ex.employment.employment_tenure_months) 
-
-        elif rule['id'] == 'active_credits_max':
-            passed = ex.financials.active_credits <= thresholds['max_active_credits']
-            value = f"{ex.financials.active_credits} <= {thresholds['max_active_credits']}"
-            reason = rule['desc']
-
-        elif rule['id'] == 'credit_rating_min':
-            # Compara la calificación crediticia usando el orden jerárquico definido arriba.
-            # Obtiene el índice numérico de la calificación del aplicante y el mínimo requerido.
-            rating_index = credit_rating_order.index(ex.credit.credit_rating) if ex.credit.credit_rating in credit_rating_order else -1
-            min_rating_index = credit_rating_order.index(thresholds['min_credit_rating'])
-            passed = rating_index >= min_rating_index # Compara los índices.
-            value = f"{ex.credit.credit_rating} >= {thresholds['min_credit_rating']}"
-            reason = rule['desc']
-
-        elif rule['id'] == 'rejections_max':
-            passed = ex.credit.rejections_last_12m <= thresholds['max_rejections_12m']
-            value = f"{ex.credit.rejections_last_12m} <= {thresholds['max_rejections_12m']}"
-            reason = rule['desc']
-
-        # Añade el resultado de esta regla a la lista de resultados.
-        rule_results.append(RuleResult(id=rule['id'], passed=passed, reason=reason, value=value))
+    start = time.perf_counter()
+    plan = cfg if isinstance(cfg, RulePlan) else compile_rules(cfg)
+
+    # Ejecuta cada regla compilada; no hay búsquedas por id ni relecturas de umbrales.
+    rule_results = [rule.run(ex) for rule in plan.rules]
 
     # --- Decisión Final y Puntuación de Riesgo ---
 
     # Basado en la lógica del YAML ('all' o 'any'), se determina la aprobación.
-    # all() devuelve True si todos los elementos de la lista son verdaderos.
-    approved = all(r.passed for r in rule_results) if decision_logic == 'all' else any(r.passed for r in rule_results)
-    
+    approved = all(r.passed for r in rule_results) if plan.logic == 'all' else any(r.passed for r in rule_results)
+
     # Calcula una puntuación de riesgo simple: 1 - (reglas pasadas / total de reglas).
     # Un riesgo de 0.0 significa que todas las reglas pasaron.
-    # Un riesgo de 1.0 significaría que ninguna regla pasó.
     risk_score = 1 - (sum(1 for r in rule_results if r.passed) / len(rule_results))
 
     # Crea una lista con las razones de por qué fue rechazado (si aplica).
     rationale = [r.reason for r in rule_results if not r.passed]
 
     # Construye y devuelve el objeto de Decisión final, que contiene toda la información del proceso.
-    return Decision(
+    decision = Decision(
         approved=approved,
         rule_results=rule_results,
         rationale=rationale,
         risk_score=risk_score,
-        extracted=ex
-    )
\ No newline at end of file
+        extracted=ex,
+        ruleset_version=plan.version
+    )
+    _RULES_SECONDS.observe(time.perf_counter() - start)
+    return decision
+
+# --- Modo Rápido: Solo Decisión ---
+
+# Cada cuántas llamadas a `decide` se evalúan todas las reglas midiendo su costo y su resultado.
+DECIDE_SAMPLE_EVERY = 64
+
+_FAST_RULES_SECONDS = metrics.STAGE_SECONDS.labels(stage="rules_fast")
+
+def _rule_check(rule: CompiledRule) -> Callable[[ApplicationExtract], bool]:
+    """La prueba booleana de una regla, sin armar `reason` ni `value` (sin declaración: nunca pasa)."""
+    if rule.condition is None:
+        return lambda ex: False
+    check = rule.condition.check
+    return lambda ex: check(ex)[0]
+
+class RuleStats:
+    """Costo medido y frecuencia con que cada regla decide el resultado, y el orden de evaluación que sale de ellos.
+
+    Con `logic: all` una regla es decisiva cuando falla (y con `any`, cuando pasa). El costo
+    esperado de evaluar hasta el primer resultado decisivo es mínimo ordenando las reglas por
+    costo / probabilidad de ser decisiva, de menor a mayor: primero las baratas que suelen cortar
+    la evaluación, al final las caras (ej. la búsqueda de palabras en `raw_letter`) o las que casi
+    nunca deciden. Las mediciones salen de las llamadas muestreadas, en las que se evalúan todas
+    las reglas, así que no están sesgadas por el corte.
+    """
+
+    def __init__(self, rules: Sequence[CompiledRule]):
+        self.ids = tuple(rule.id for rule in rules)
+        self.checks = tuple(_rule_check(rule) for rule in rules)
+        self.calls = 0
+        self.samples = 0
+        self.cost_ns = [0] * len(rules)
+        self.decisive = [0] * len(rules)
+        self.order: Tuple[int, ...] = tuple(range(len(rules)))
+        self._lock = threading.Lock()
+
+    def tick(self) -> int:
+        """Cuenta una llamada a `decide` y devuelve cuántas había antes de ella."""
+        with self._lock:
+            calls = self.calls
+            self.calls = calls + 1
+        return calls
+
+    def record(self, costs: Sequence[int], decisive: Sequence[bool]) -> None:
+        """Suma una muestra (costo en ns y si fue decisiva, por regla) y recalcula el orden."""
+        with self._lock:
+            self.samples += 1
+            for i, (cost, hit) in enumerate(zip(costs, decisive)):
+                self.cost_ns[i] += cost
+                self.decisive[i] += hit
+            # Suavizado de Laplace: una regla que todavía no decidió nunca no queda con probabilidad 0.
+            rate = [(hits + 1) / (self.samples + 2) for hits in self.decisive]
+            self.order = tuple(sorted(range(len(self.ids)), key=lambda i: self.cost_ns[i] / self.samples / rate[i]))
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Reglas en el orden actual, con su costo medio (ns) y su tasa de resultado decisivo."""
+        with self._lock:
+            samples = max(self.samples, 1)
+            return [{"id": self.ids[i], "cost_ns": self.cost_ns[i] / samples, "decisive_rate": self.decisive[i] / samples}
+                    for i in self.order]
+
+# Estadísticas por versión del ruleset (un plan recargado con el mismo contenido conserva lo medido);
+# los planes sin versión (ej. `compile_rules` de un dict) se registran por identidad mientras existan.
+_rule_stats: Dict[Union[str, int], RuleStats] = {}
+_rule_stats_lock = threading.Lock()
+
+def rule_stats(plan: RulePlan) -> RuleStats:
+    """Las estadísticas del modo rápido del plan (se crean la primera vez que se piden)."""
+    key = plan.version if plan.version is not None else id(plan)
+    stats = _rule_stats.get(key)
+    if stats is None:
+        with _rule_stats_lock:
+            stats = _rule_stats.get(key)
+            if stats is None:
+                stats = _rule_stats[key] = RuleStats(plan.rules)
+                if plan.version is None:
+                    weakref.finalize(plan, _rule_stats.pop, key, None)
+    return stats
+
+class FastDecision:
+    """Resultado de `decide`: el veredicto y la regla que lo determinó.
+
+    No trae `rule_results` ni `risk_score` (requieren todas las reglas); `decision()` construye el
+    `Decision` completo bajo demanda con `evaluate`.
+    """
+    __slots__ = ("approved", "decisive_rule", "ruleset_version", "extracted", "_plan", "_decision")
+
+    def __init__(self, approved: bool, decisive_rule: Optional[str], extracted: ApplicationExtract, plan: RulePlan):
+        self.approved = approved
+        self.decisive_rule = decisive_rule  # La regla que falló (logic: all) o pasó (any); None si ninguna.
+        self.ruleset_version = plan.version
+        self.extracted = extracted
+        self._plan = plan
+        self._decision: Optional[Decision] = None
+
+    def decision(self) -> Decision:
+        """El `Decision` completo (todas las reglas, razones y riesgo), calculado una sola vez."""
+        if self._decision is None:
+            self._decision = evaluate(self.extracted, self._plan)
+        return self._decision
+
+    @property
+    def rule_results(self) -> List[RuleResult]:
+        return self.decision().rule_results
+
+def decide(ex: ApplicationExtract, cfg: Union[RulePlan, dict]) -> FastDecision:
+    """Modo rápido de `evaluate` (pre-screening): solo el veredicto, cortando en el primer resultado decisivo.
+
+    Las reglas se prueban en el orden de `RuleStats` y sin formatear textos. El veredicto es el
+    mismo que el de `evaluate`; el detalle completo queda disponible con `FastDecision.decision()`.
+    Una de cada `DECIDE_SAMPLE_EVERY` llamadas evalúa todas las reglas para actualizar el orden.
+    """
+    start = time.perf_counter()
+    plan = cfg if isinstance(cfg, RulePlan) else compile_rules(cfg)
+    stats = rule_stats(plan)
+    # Con 'all' decide la primera regla que falla; con 'any', la primera que pasa.
+    decisive_when = plan.logic != 'all'
+    calls = stats.tick()
+
+    decisive = None
+    if calls % DECIDE_SAMPLE_EVERY == 0:
+        checks = stats.checks
+        costs, hits = [0] * len(checks), [False] * len(checks)
+        for i in stats.order:
+            t0 = time.perf_counter_ns()
+            hit = checks[i](ex) == decisive_when
+            costs[i] = time.perf_counter_ns() - t0
+            hits[i] = hit
+            if hit and decisive is None:
+                decisive = i
+        stats.record(costs, hits)
+    else:
+        checks = stats.checks
+        for i in stats.order:
+            if checks[i](ex) == decisive_when:
+                decisive = i
+                break
+
+    approved = (decisive is None) if plan.logic == 'all' else (decisive is not None)
+    result = FastDecision(approved, stats.ids[decisive] if decisive is not None else None, ex, plan)
+    _FAST_RULES_SECONDS.observe(time.perf_counter() - start)
+    return result
@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 # Importaciones de Pydantic para definir los modelos de datos.
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Any, Dict, List, Literal, Optional
 
 # --- Modelos de Datos Pydantic V1 ---
 # Estos modelos definen la estructura de los datos con los que trabaja la aplicación.
@@ -68,6 +68,16 @@ class Decision(BaseModel):
     rationale: List[str] # Una lista con las razones del rechazo (si aplica).
     risk_score: float # La puntuación de riesgo calculada (0.0 a 1.0).
     extracted: ApplicationExtract # El objeto completo con los datos extraídos.
+    ruleset_version: Optional[str] = None # Versión (hash) del ruleset con el que se evaluó.
+    decision_id: Optional[str] = None # Id de la extracción guardada (solo con FEATURE_STORE=1); sirve para /explain.
+    fallback: bool = False # True si, con plazo (`deadline_ms`), se respondió con el fallback de regex en vez del LLM.
+
+class ScreeningDecision(BaseModel):
+    """Respuesta del modo rápido (/decision/fast): el veredicto y la regla que lo decidió, sin el detalle de cada regla."""
+    approved: bool
+    decisive_rule: Optional[str] = None # Regla que falló (logic: all) o pasó (any); None si ninguna.
+    ruleset_version: Optional[str] = None
+    rule_results: Optional[List[RuleResult]] = None # Solo con `detail=true`.
 
 # --- Modelos de Datos Pydantic V2 ---
 
@@ -81,6 +91,9 @@ class BatchRequest(BaseModel):
     """Modela el cuerpo de la solicitud para el endpoint /batch_decision."""
     items: List[BatchItem]
     rules_path: str = "business_rules.yaml"
+    concurrency: Optional[int] = Field(default=None, ge=1) # Extracciones en paralelo (None = BATCH_CONCURRENCY).
+    timeout_s: Optional[float] = Field(default=None, gt=0) # Timeout de extracción por carta, en segundos.
+    cache_mode: Literal["use", "refresh", "bypass"] = "use" # Uso de la caché de extracciones.
 
 class BatchRow(BaseModel):
     """Modela una fila en la respuesta del endpoint /batch_decision."""
@@ -88,20 +101,104 @@ class BatchRow(BaseModel):
     approved: bool
     risk_score: float
     failed_rules: List[str]
-    extracted: ApplicationExtract
+    extracted: Optional[ApplicationExtract] = None # None si la carta no se pudo extraer.
+    error: Optional[str] = None # Motivo del parse_error (timeout, respuesta inválida del LLM, etc.).
 
 class BatchResponse(BaseModel):
     """Modela la respuesta completa del endpoint /batch_decision."""
     rows: List[BatchRow]
 
+# Para /jobs (lotes en segundo plano)
+class JobRequest(BaseModel):
+    """Modela el cuerpo de POST /jobs: una lista de cartas o la ruta de un CSV local del servidor."""
+    items: Optional[List[BatchItem]] = None
+    csv_path: Optional[str] = None # CSV con columnas ['id', 'letter'], dentro de JOBS_CSV_DIR.
+    rules_path: str = "business_rules.yaml"
+    concurrency: Optional[int] = Field(default=None, ge=1)
+    timeout_s: Optional[float] = Field(default=None, gt=0)
+    cache_mode: Literal["use", "refresh", "bypass"] = "use"
+
+class JobStatus(BaseModel):
+    """Estado y progreso de un trabajo en segundo plano."""
+    id: str
+    status: Literal["queued", "running", "completed", "failed", "cancelled"]
+    total: Optional[int] = None # None mientras no se haya contado el CSV de entrada.
+    done: int = 0
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+
+class JobResults(BaseModel):
+    """Una página de resultados de un trabajo (filas con las columnas de `evaluate_batch`)."""
+    job_id: str
+    offset: int
+    limit: int
+    done: int
+    rows: List[Dict[str, Any]]
+
 # Para /explain
 class ExplainRequest(BaseModel):
-    """Modela el cuerpo de la solicitud para el endpoint /explain."""
-    letter: str
+    """Modela el cuerpo de la solicitud para el endpoint /explain.
+
+    Se indica exactamente uno de: `letter` (extrae y evalúa), `decision` (el `Decision` ya devuelto
+    por /decision, sin extraer de nuevo) o `decision_id` (la extracción guardada por /decision con
+    FEATURE_STORE=1, que se vuelve a evaluar con `rules_path`).
+    """
+    letter: Optional[str] = None
+    decision: Optional[Decision] = None
+    decision_id: Optional[str] = None
     rules_path: str = "business_rules.yaml"
     provider: Optional[str] = None
+    cache_mode: Literal["use", "refresh", "bypass"] = "use"
 
 class ExplainResponse(BaseModel):
     """Modela la respuesta del endpoint /explain."""
     decision: Decision
     explanation: str
+
+# Para /rescore (re-evaluación sobre el almacén de extracciones)
+class RescoreRequest(BaseModel):
+    """Modela el cuerpo de POST /rescore: el ruleset a aplicar y, opcionalmente, contra qué versión comparar."""
+    rules_path: str = "business_rules.yaml"
+    diff: bool = True # Compara con la corrida anterior (o con `compare_to`).
+    compare_to: Optional[str] = None # Versión (hash) del ruleset contra la que comparar.
+    changes_limit: int = Field(default=100, ge=0, le=10000) # Máximo de cartas con cambios listadas.
+
+class RescoreChange(BaseModel):
+    """Una carta cuya aprobación cambió entre las dos versiones del ruleset."""
+    id: str
+    previous_approved: bool
+    approved: bool
+    previous_failed_rules: List[str]
+    failed_rules: List[str]
+
+class RescoreDiff(BaseModel):
+    """Diferencias entre las decisiones nuevas y las de otra versión, sobre las cartas que tienen ambas."""
+    compare_to: str
+    compared: int
+    approved_to_rejected: int
+    rejected_to_approved: int
+    failed_rules_changed: int
+    changes: List[RescoreChange]
+
+class RescoreResponse(BaseModel):
+    """Modela la respuesta de POST /rescore."""
+    rules_version: str
+    rows: int
+    approved: int
+    rejected: int
+    seconds: float
+    diff: Optional[RescoreDiff] = None # None si no se pidió o no hay otra corrida con la que comparar.
+
+# Para /simulate (barrido de umbrales)
+class SimulationRequest(BaseModel):
+    """Modela el cuerpo de POST /simulate: el ruleset base y la grilla de umbrales a probar."""
+    rules_path: str = "business_rules.yaml"
+    grid: Dict[str, List[Any]] # Clave de `thresholds:` -> valores (se evalúa el producto cartesiano).
+    limit: Optional[int] = Field(default=None, ge=1) # Solo las primeras N solicitudes del almacén.
+
+class SimulationResponse(BaseModel):
+    """Modela la respuesta de POST /simulate: una fila por configuración (ver `app.simulate.simulate`)."""
+    population: int
+    configs: List[Dict[str, Any]]
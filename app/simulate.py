@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""Simulación de políticas: barrido de umbrales sobre una población de extracciones.
+
+Responde preguntas como "¿qué pasa con la tasa de aprobación si `min_income` pasa de 1.000.000
+a 1.200.000 y `max_amount_income_ratio` de 0,30 a 0,35?" sin editar el YAML ni volver a correr
+el lote por cada combinación. La grilla es un valor por lista para claves de `thresholds:` y se
+evalúa su producto cartesiano.
+
+Cada regla se evalúa una sola vez por valor de sus umbrales, no por configuración: la máscara de
+una regla que usa una clave de la grilla tiene forma (valores, filas), calculada con broadcasting
+(`columna[None, :] >= valores[:, None]`). Las reglas que no dependen de la grilla se suman en un
+único conteo fijo de reglas pasadas por fila. Después, por bloques de filas, cada configuración
+toma la fila de máscara que le toca (indexado) y se acumula el número de reglas pasadas en una
+matriz (configuraciones x filas) de int8; de ahí salen la aprobación, la distribución exacta del
+riesgo (que solo puede tomar `n_reglas + 1` valores) y las fallas por regla.
+
+Los resultados coinciden con recompilar el ruleset con cada combinación y correr `evaluate`.
+"""
+import itertools
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.rules import COMPARATORS, CompiledCondition, RulePlan, normalize_text
+from app.schema import ApplicationExtract
+from app.vectorized import column, condition_mask, extracts_to_columns, map_unique, required_fields
+
+# Celdas (configuraciones x filas) por bloque: acota la memoria de la matriz de reglas pasadas.
+BLOCK_CELLS = 1 << 24
+
+def _condition_keys(cond: CompiledCondition, grid: Mapping[str, Sequence[Any]]) -> List[str]:
+    """Claves de la grilla que usa una condición (incluye las ramas de los grupos OR)."""
+    if cond.op == "any_of":
+        keys: List[str] = []
+        for child in cond.children:
+            keys.extend(k for k in _condition_keys(child, grid) if k not in keys)
+        return keys
+    return [cond.threshold_key] if cond.threshold_key in grid else []
+
+def _operands(cond: CompiledCondition, values: Sequence[Any]) -> np.ndarray:
+    """Los valores de la grilla como los compara la condición (rango en la escala o el número tal cual)."""
+    if cond.scale is None:
+        return np.asarray(values)
+    unknown = [v for v in values if v not in cond.scale]
+    if unknown:
+        raise ValueError(f"Los valores {unknown!r} de '{cond.threshold_key}' no pertenecen a la escala.")
+    return np.asarray([cond.scale[v] for v in values])
+
+def _grid_mask(cond: CompiledCondition, columns: Dict[str, np.ndarray], grid: Mapping[str, Sequence[Any]],
+               keys: List[str]) -> np.ndarray:
+    """Máscara de una condición con un eje por clave de `keys` (tamaño 1 si no la usa) y el eje de filas al final."""
+    if cond.op == "any_of":
+        mask = None
+        for child in cond.children:
+            child_mask = _grid_mask(child, columns, grid, keys)
+            mask = child_mask if mask is None else mask | child_mask
+        return mask
+
+    shape = [1] * len(keys)
+    if cond.threshold_key not in grid:
+        return condition_mask(cond, columns).reshape(shape + [-1])
+
+    values = column(columns, cond.field)
+    if cond.normalize:
+        values = map_unique(values, normalize_text)
+    if cond.scale is not None:
+        rank = cond.scale.get
+        values = map_unique(values, lambda v: rank(v, -1)).astype(np.int64)
+    elif values.dtype == object:
+        values = values.astype(float)
+    operands = _operands(cond, grid[cond.threshold_key])
+    shape[keys.index(cond.threshold_key)] = len(operands)
+    return COMPARATORS[cond.op](values, operands.reshape(shape + [1]))
+
+def simulate(columns: Dict[str, np.ndarray], plan: RulePlan, grid: Mapping[str, Sequence[Any]],
+             block_cells: int = BLOCK_CELLS) -> pd.DataFrame:
+    """Evalúa todas las combinaciones de la grilla de umbrales sobre una población en formato columnar.
+
+    Args:
+        columns (dict): Campo -> arreglo con la población (ver `population_from_extracts` y
+            `app.features.FeatureStore.columns`); debe tener los campos de `required_fields(plan)`.
+        plan (RulePlan): El ruleset base; los umbrales que no están en la grilla quedan como en el plan.
+        grid (dict): Clave de `thresholds:` -> lista de valores a probar.
+
+    Returns:
+        DataFrame: una fila por configuración con los valores de la grilla, `approved`, `approval_rate`,
+        `risk_mean`, la distribución del riesgo (`risk=<valor>`: cartas con ese riesgo) y las fallas
+        por regla (`failed.<id>`).
+    """
+    unknown = [key for key in grid if key not in plan.thresholds]
+    if unknown:
+        raise ValueError(f"Umbrales desconocidos en la grilla: {', '.join(unknown)}.")
+    if any(len(values) == 0 for values in grid.values()):
+        raise ValueError("Cada umbral de la grilla necesita al menos un valor.")
+    n_rows = len(next(iter(columns.values()))) if columns else 0
+    if n_rows == 0:
+        raise ValueError("La población está vacía.")
+
+    grid_keys = list(grid)
+    configs = list(itertools.product(*(range(len(grid[key])) for key in grid_keys)))
+    index = np.asarray(configs, dtype=np.int64).reshape(len(configs), len(grid_keys))
+    n_configs, n_rules = len(configs), len(plan.rules)
+
+    # Reglas fijas: un solo conteo de reglas pasadas por fila. Reglas de la grilla: máscara por valor de sus umbrales.
+    fixed_passed = np.zeros(n_rows, dtype=np.int8)
+    failed = np.zeros((n_configs, n_rules), dtype=np.int64)
+    varying: List[Tuple[np.ndarray, Tuple[np.ndarray, ...]]] = []
+    used = set()
+    for r, rule in enumerate(plan.rules):
+        if rule.condition is None:
+            failed[:, r] = n_rows
+            continue
+        keys = _condition_keys(rule.condition, grid)
+        if not keys:
+            mask = condition_mask(rule.condition, columns)
+            fixed_passed += mask
+            failed[:, r] = n_rows - int(mask.sum())
+            continue
+        used.update(keys)
+        mask = np.broadcast_to(_grid_mask(rule.condition, columns, grid, keys),
+                               tuple(len(grid[key]) for key in keys) + (n_rows,))
+        # Índice de cada configuración en los ejes de la máscara (una fila de máscara por configuración).
+        selector = tuple(index[:, grid_keys.index(key)] for key in keys)
+        failed[:, r] = n_rows - mask.sum(axis=-1)[selector]
+        # Las máscaras se guardan aplanadas (un valor por combinación de sus claves) para indexarlas por bloque.
+        flat = mask.reshape(-1, n_rows)
+        varying.append((flat, np.ravel_multi_index(selector, mask.shape[:-1])))
+    unused = [key for key in grid_keys if key not in used]
+    if unused:
+        raise ValueError(f"Ninguna regla del ruleset usa los umbrales: {', '.join(unused)}.")
+
+    # Histograma de reglas pasadas por configuración, por bloques de filas.
+    histogram = np.zeros((n_configs, n_rules + 1), dtype=np.int64)
+    block = max(1, block_cells // n_configs)
+    for start in range(0, n_rows, block):
+        stop = min(n_rows, start + block)
+        passed = np.broadcast_to(fixed_passed[start:stop], (n_configs, stop - start)).copy()
+        for flat, rows in varying:
+            passed += flat[:, start:stop][rows]
+        # Sumar los bool como uint8 con acumulador int32 es ~2x más rápido que `.sum()` sobre bool.
+        for count in range(n_rules):
+            histogram[:, count] += (passed == count).view(np.uint8).sum(axis=1, dtype=np.int32)
+    # Las filas que pasan todas las reglas salen por diferencia (una comparación menos por bloque).
+    histogram[:, n_rules] = n_rows - histogram[:, :n_rules].sum(axis=1)
+
+    approved = histogram[:, n_rules] if plan.logic == 'all' else n_rows - histogram[:, 0]
+    risk_levels = 1 - np.arange(n_rules + 1) / n_rules
+    data: Dict[str, Any] = {key: [grid[key][i] for i in index[:, k]] for k, key in enumerate(grid_keys)}
+    data["approved"] = approved
+    data["approval_rate"] = approved / n_rows
+    data["risk_mean"] = histogram @ risk_levels / n_rows
+    for count in range(n_rules, -1, -1):
+        data[f"risk={risk_levels[count]:.3f}"] = histogram[:, count]
+    for r, rule in enumerate(plan.rules):
+        data[f"failed.{rule.id}"] = failed[:, r]
+    return pd.DataFrame(data)
+
+# --- Poblaciones ---
+
+def population_from_extracts(extracts: Sequence[ApplicationExtract], plan: RulePlan) -> Dict[str, np.ndarray]:
+    """Columnas de la población a partir de una lista de extracciones (ej. las de un lote)."""
+    return extracts_to_columns(extracts, required_fields(plan))
+
+def population_from_store(plan: RulePlan, store=None, limit: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """Columnas de la población a partir del almacén de extracciones (`app.features`), solo los campos del plan."""
+    from app.features import FeatureStore, feature_store_path, get_feature_store
+
+    store = store or get_feature_store() or FeatureStore(feature_store_path())
+    return store.columns(required_fields(plan), limit)[1]
+
+def parse_grid(specs: Sequence[str]) -> Dict[str, List[Any]]:
+    """Parsea la grilla de la CLI: `clave=v1,v2,...` o `clave=inicio:fin:paso` (fin incluido).
+
+    Los valores se leen como YAML (números o textos, ej. `min_credit_rating=Regular,Buena`).
+    """
+    import yaml
+
+    grid: Dict[str, List[Any]] = {}
+    for spec in specs:
+        key, sep, values = spec.partition("=")
+        if not sep or not values:
+            raise ValueError(f"Grilla inválida '{spec}': use clave=v1,v2 o clave=inicio:fin:paso.")
+        if values.count(":") == 2:
+            start, stop, step = (yaml.safe_load(v) for v in values.split(":"))
+            count = int(round((stop - start) / step)) + 1
+            parsed = [start + i * step for i in range(count)]
+            # Evita arrastrar errores de punto flotante (0.30000000000000004) a los resultados.
+            grid[key.strip()] = [round(v, 10) if isinstance(v, float) else v for v in parsed]
+        else:
+            grid[key.strip()] = [yaml.safe_load(v) for v in values.split(",")]
+    return grid
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""Evaluación columnar (vectorizada) del plan de reglas.
+
+En lugar de construir un `RuleResult` por regla y por carta, cada regla del `RulePlan` se
+evalúa como una sola comparación de NumPy sobre todo el lote. Los resultados son idénticos
+a los de `app.rules.evaluate`.
+"""
+from typing import Any, Dict, Iterable, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+from app.rules import COMPARATORS, DERIVED_FIELDS, CompiledCondition, RulePlan, normalize_text
+from app.schema import ApplicationExtract
+
+# Columnas del DataFrame de resultados y el campo de la extracción del que sale cada una.
+OUTPUT_FIELDS = {
+    "income": "financials.income_monthly",
+    "requested_amount": "financials.requested_amount",
+    "amount_income_ratio": "amount_income_ratio",
+    "age_years": "applicant.age_years",
+    "active_credits": "financials.active_credits",
+    "rating": "credit.credit_rating",
+    "rejections_12m": "credit.rejections_last_12m",
+    "has_mora": "credit.has_delinquencies_last_6m",
+    "tenure_months": "employment.employment_tenure_months",
+}
+
+# --- Campos derivados en versión columnar ---
+
+def _amount_income_ratio_column(columns: Dict[str, np.ndarray]) -> np.ndarray:
+    """Versión vectorizada de `rules._amount_income_ratio` (inf si el ingreso es 0)."""
+    income = columns["financials.income_monthly"]
+    amount = columns["financials.requested_amount"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = amount / income
+    return np.where(income > 0, ratio, np.inf)
+
+DERIVED_COLUMNS = {
+    "amount_income_ratio": (_amount_income_ratio_column, ("financials.income_monthly", "financials.requested_amount")),
+}
+
+# --- Construcción de Columnas ---
+
+def _condition_fields(cond: CompiledCondition) -> Iterable[str]:
+    """Enumera los campos que lee una condición (incluye las ramas de los grupos OR)."""
+    if cond.op == "any_of":
+        for child in cond.children:
+            yield from _condition_fields(child)
+    else:
+        yield cond.field
+
+def required_fields(plan: RulePlan) -> List[str]:
+    """Campos base (sin derivados) que se necesitan para evaluar el plan y armar el DataFrame."""
+    fields = list(OUTPUT_FIELDS.values())
+    for rule in plan.rules:
+        if rule.condition is not None:
+            fields.extend(_condition_fields(rule.condition))
+    base = []
+    for path in fields:
+        for dep in (DERIVED_COLUMNS[path][1] if path in DERIVED_COLUMNS else (path,)):
+            if dep not in base:
+                base.append(dep)
+    return base
+
+def as_column(values: list) -> np.ndarray:
+    """Convierte una lista de valores en un arreglo; los textos (o None) quedan como dtype=object."""
+    sample = next((v for v in values if v is not None), None)
+    if sample is None or isinstance(sample, str) or any(v is None for v in values):
+        column = np.empty(len(values), dtype=object)
+        column[:] = values
+        return column
+    return np.asarray(values)
+
+def extracts_to_columns(extracts: Sequence[ApplicationExtract], fields: Iterable[str]) -> Dict[str, np.ndarray]:
+    """Pasa una lista de extracciones a un diccionario campo -> arreglo de NumPy.
+
+    Los campos derivados (ej. `amount_income_ratio`) se calculan a partir de las columnas base.
+    """
+    from operator import attrgetter
+
+    columns: Dict[str, np.ndarray] = {}
+    for path in fields:
+        if path in DERIVED_COLUMNS or path in columns:
+            continue
+        get = DERIVED_FIELDS.get(path) or attrgetter(path)
+        columns[path] = as_column([get(ex) for ex in extracts])
+    return columns
+
+def column(columns: Dict[str, np.ndarray], path: str) -> np.ndarray:
+    """Devuelve la columna de un campo, calculándola si es derivada."""
+    if path not in columns and path in DERIVED_COLUMNS:
+        columns[path] = DERIVED_COLUMNS[path][0](columns)
+    return columns[path]
+
+# --- Evaluación Vectorizada ---
+
+def map_unique(column: np.ndarray, fn) -> np.ndarray:
+    """Aplica `fn` una sola vez por valor distinto de la columna y lo expande a todas las filas."""
+    codes, uniques = pd.factorize(column)
+    mapped = [fn(u) for u in uniques]
+    # pd.factorize marca los None con el código -1, que apunta a la última posición.
+    mapped.append(fn(None) if (codes < 0).any() else False)
+    return np.asarray(mapped)[codes]
+
+def condition_mask(cond: CompiledCondition, columns: Dict[str, np.ndarray]) -> np.ndarray:
+    """Evalúa una condición compilada sobre todas las filas y devuelve una máscara booleana."""
+    if cond.op == "any_of":
+        mask = np.zeros(len(next(iter(columns.values()))), dtype=bool)
+        for child in cond.children:
+            mask |= condition_mask(child, columns)
+        return mask
+
+    values = column(columns, cond.field)
+    if values.dtype == object or cond.normalize:
+        # Textos: se evalúa la prueba escalar sobre los valores distintos (ratings, tipos de empleo, cartas).
+        test = cond.test
+        fn = (lambda v: test(normalize_text(v))) if cond.normalize else test
+        return map_unique(values, fn).astype(bool)
+    if cond.op == "not":
+        return ~values.astype(bool)
+    if cond.op == "truthy":
+        return values.astype(bool)
+    return np.asarray(COMPARATORS[cond.op](values, cond.operand), dtype=bool)
+
+def evaluate_columns(columns: Dict[str, np.ndarray], plan: RulePlan) -> Dict[str, Any]:
+    """Evalúa todas las reglas del plan sobre un lote en formato columnar.
+
+    Args:
+        columns (dict): Campo -> arreglo, como lo devuelve `extracts_to_columns`.
+        plan (RulePlan): El plan compilado por `load_rules`.
+
+    Returns:
+        dict: `passed` (reglas x filas), `approved`, `risk_score`, `failed_rules` (texto) y
+        `failed_rules_list` (lista de razones) como arreglos.
+    """
+    n_rows = len(next(iter(columns.values()))) if columns else 0
+    passed = np.zeros((len(plan.rules), n_rows), dtype=bool)
+    for i, rule in enumerate(plan.rules):
+        if rule.condition is not None:
+            passed[i] = condition_mask(rule.condition, columns)
+
+    approved = passed.all(axis=0) if plan.logic == 'all' else passed.any(axis=0)
+    risk_score = 1 - (passed.sum(axis=0) / len(plan.rules))
+
+    # `failed_rules`: el texto se arma una sola vez por cada combinación distinta de reglas fallidas,
+    # codificada como bits de un entero (hasta 63 reglas; más allá se agrupan las filas completas).
+    fail_reasons = [rule.failure_reason for rule in plan.rules]
+    if len(plan.rules) < 64:
+        codes = np.zeros(n_rows, dtype=np.int64)
+        for i in range(len(plan.rules)):
+            codes |= (~passed[i]).astype(np.int64) << i
+        unique_codes, inverse = np.unique(codes, return_inverse=True)
+        combos = [[not (int(code) >> i & 1) for i in range(len(plan.rules))] for code in unique_codes]
+    else:
+        combos, inverse = np.unique(passed.T, axis=0, return_inverse=True)
+    texts = np.empty(len(combos), dtype=object)
+    lists = np.empty(len(combos), dtype=object)
+    lists[:] = [[r for r, ok in zip(fail_reasons, combo) if not ok] for combo in combos]
+    texts[:] = [", ".join(reasons) for reasons in lists]
+
+    return {
+        "passed": passed,
+        "approved": approved,
+        "risk_score": risk_score,
+        "failed_rules": texts[inverse.reshape(-1)],
+        "failed_rules_list": lists[inverse.reshape(-1)],
+    }
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""Escritores incrementales de resultados de lotes: CSV, NDJSON, Parquet y Arrow IPC.
+
+Cada escritor recibe los bloques de resultados (DataFrames con las columnas de
+`app.batch.RESULT_COLUMNS`) a medida que se deciden y los agrega al archivo: ningún formato
+necesita el DataFrame completo del lote. El formato se elige por extensión o explícitamente:
+
+- csv:     `failed_rules` como texto separado por comas (el formato de siempre).
+- ndjson:  un objeto JSON por fila; `failed_rules` es una lista y `error` el detalle del parse_error.
+           Los ratios infinitos (ingreso 0) se escriben como null.
+- parquet: un row group por bloque; tipos nativos (bool, enteros con nulos, list<string>).
+- arrow:   formato IPC de streaming (`.arrow`/`.arrows`), un record batch por bloque.
+
+CSV, NDJSON y Arrow admiten reanudar (`append=True`): el archivo se trunca al último tamaño
+registrado en el checkpoint y se sigue escribiendo. Parquet no: su índice va al final del
+archivo, que solo es válido una vez cerrado.
+
+pyarrow (Parquet y Arrow) se importa solo al abrir un escritor de esos formatos.
+"""
+import json
+import os
+from typing import TYPE_CHECKING, Dict, Optional, Type
+
+if TYPE_CHECKING:
+    import pandas as pd
+    import pyarrow as pa
+
+EXTENSIONS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson", ".parquet": "parquet",
+              ".arrow": "arrow", ".arrows": "arrow"}
+
+# Marca de fin del formato IPC de streaming (continuación + longitud 0).
+_ARROW_EOS = b"\xff\xff\xff\xff\x00\x00\x00\x00"
+
+class ResultWriter:
+    """Base de los escritores: `write` agrega un bloque, `flush` lo asegura en disco y `tell` da el tamaño escrito."""
+    format = ""
+    # `failed_rules` como lista de razones (False: texto separado por comas).
+    list_rules = True
+    # Se puede reanudar truncando el archivo a un tamaño anterior y agregando desde ahí.
+    appendable = True
+
+    def __init__(self, path: str, append: bool = False):
+        self.path = path
+        self._file = open(path, 'ab' if append else 'wb')
+
+    def write(self, frame: "pd.DataFrame") -> None:
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def tell(self) -> int:
+        return self._file.tell()
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+class CsvWriter(ResultWriter):
+    format = "csv"
+    list_rules = False
+
+    def write(self, frame: "pd.DataFrame") -> None:
+        # El encabezado solo al comienzo del archivo (también al reanudar uno vacío).
+        self._file.write(frame.to_csv(header=self.tell() == 0, index=False).encode("utf-8"))
+
+class NdjsonWriter(ResultWriter):
+    format = "ndjson"
+
+    def write(self, frame: "pd.DataFrame") -> None:
+        if len(frame):
+            text = frame.to_json(orient="records", lines=True, force_ascii=False)
+            self._file.write(text.encode("utf-8") + (b"" if text.endswith("\n") else b"\n"))
+
+def result_schema(id_type: "pa.DataType") -> "pa.Schema":
+    """Esquema Arrow de los resultados (el tipo de `id` sale del primer bloque: texto o entero)."""
+    import pyarrow as pa
+
+    return pa.schema([
+        ("id", id_type), ("approved", pa.bool_()), ("risk_score", pa.float64()),
+        ("failed_rules", pa.list_(pa.string())), ("income", pa.int64()), ("requested_amount", pa.int64()),
+        ("amount_income_ratio", pa.float64()), ("age_years", pa.int64()), ("active_credits", pa.int64()),
+        ("rating", pa.string()), ("rejections_12m", pa.int64()), ("has_mora", pa.bool_()),
+        ("tenure_months", pa.int64()), ("error", pa.string()),
+    ])
+
+def _to_table(frame: "pd.DataFrame", schema: Optional["pa.Schema"]) -> "pa.Table":
+    import pyarrow as pa
+
+    if schema is None:
+        id_type = pa.array(frame["id"]).type
+        schema = result_schema(pa.string() if pa.types.is_null(id_type) else id_type)
+    return pa.Table.from_pandas(frame, schema=schema, preserve_index=False)
+
+class ParquetWriter(ResultWriter):
+    format = "parquet"
+    appendable = False
+
+    def __init__(self, path: str, append: bool = False, compression: str = "zstd"):
+        if append:
+            raise ValueError("Parquet no admite agregar a un archivo existente.")
+        self.path = path
+        self._compression = compression
+        self._writer = None
+        self._rows = 0
+
+    def write(self, frame: "pd.DataFrame") -> None:
+        import pyarrow.parquet as pq
+
+        table = _to_table(frame, self._writer.schema if self._writer is not None else None)
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, table.schema, compression=self._compression)
+        # Un row group por bloque: los lectores pueden saltar bloques enteros por sus estadísticas.
+        self._writer.write_table(table, row_group_size=max(1, table.num_rows))
+        self._rows += table.num_rows
+
+    def flush(self) -> None:
+        pass
+
+    def tell(self) -> int:
+        return self._rows
+
+    def close(self) -> None:
+        if self._writer is None:
+            # Lote vacío: igual se deja un archivo válido, con el esquema y sin filas.
+            import pandas as pd
+            from app.batch import TYPED_COLUMNS
+
+            self.write(pd.DataFrame(columns=TYPED_COLUMNS).astype({"id": "object"}))
+        self._writer.close()
+
+class ArrowWriter(ResultWriter):
+    """Formato IPC de streaming escrito mensaje por mensaje: esquema una vez y un record batch por bloque.
+
+    Sin la marca de fin (se escribe al cerrar), el archivo truncado en el límite de un bloque sigue
+    siendo un stream válido, así que se puede reanudar agregando más bloques.
+    """
+    format = "arrow"
+
+    def __init__(self, path: str, append: bool = False):
+        super().__init__(path, append)
+        self._schema = None
+        if append and self.tell() > 0:
+            import pyarrow as pa
+
+            with pa.ipc.open_stream(path) as reader:
+                self._schema = reader.schema
+
+    def write(self, frame: "pd.DataFrame") -> None:
+        table = _to_table(frame, self._schema)
+        if self._schema is None:
+            self._schema = table.schema
+            self._file.write(self._schema.serialize())
+        for batch in table.combine_chunks().to_batches():
+            self._file.write(batch.serialize())
+
+    def close(self) -> None:
+        if self._schema is None:
+            import pandas as pd
+            from app.batch import TYPED_COLUMNS
+
+            self.write(pd.DataFrame(columns=TYPED_COLUMNS).astype({"id": "object"}))
+        self._file.write(_ARROW_EOS)
+        super().close()
+
+WRITERS: Dict[str, Type[ResultWriter]] = {"csv": CsvWriter, "ndjson": NdjsonWriter, "parquet": ParquetWriter,
+                                         "arrow": ArrowWriter}
+
+def detect_format(path: str, fmt: Optional[str] = None) -> str:
+    """El formato pedido o, si no se indica, el que corresponde a la extensión de `path` (CSV por defecto)."""
+    if fmt is not None:
+        if fmt not in WRITERS:
+            raise ValueError(f"Formato de salida desconocido '{fmt}' (opciones: {', '.join(WRITERS)}).")
+        return fmt
+    return EXTENSIONS.get(os.path.splitext(path)[1].lower(), "csv")
+
+def open_writer(path: str, fmt: Optional[str] = None, append: bool = False) -> ResultWriter:
+    """Abre el escritor del formato de `path` (o `fmt`); con `append=True` continúa un archivo existente."""
+    return WRITERS[detect_format(path, fmt)](path, append=append)
+
+def default_output(base: str, fmt: Optional[str]) -> str:
+    """Nombre de salida por defecto con la extensión del formato (ej. decisions.parquet)."""
+    extension = {"csv": ".csv", "ndjson": ".ndjson", "parquet": ".parquet", "arrow": ".arrow"}[fmt or "csv"]
+    return base + extension
+
+def read_results(path: str, fmt: Optional[str] = None) -> "pd.DataFrame":
+    """Lee un archivo de resultados de cualquier formato como DataFrame (para análisis y pruebas)."""
+    import pandas as pd
+
+    fmt = detect_format(path, fmt)
+    if fmt == "csv":
+        return pd.read_csv(path)
+    if fmt == "ndjson":
+        with open(path, encoding="utf-8") as f:
+            return pd.DataFrame([json.loads(line) for line in f if line.strip()])
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if fmt == "parquet":
+        return pq.read_table(path).to_pandas()
+    with pa.ipc.open_stream(path) as reader:
+        return reader.read_all().to_pandas()
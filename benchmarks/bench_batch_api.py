@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""Benchmark: /batch_decision vía DataFrame + `iterrows` vs. registros tipados (`BatchRecord`).
+
+La versión anterior construía el DataFrame de `evaluate_batch`, lo recorría con `iterrows`
+reconstruyendo cada `ApplicationExtract` y dejaba que FastAPI validara de nuevo la respuesta.
+Aquí se reproduce ese camino en una app temporal y se compara con el endpoint actual. La
+extracción se resuelve de antemano (mismo costo para ambos) para medir solo el armado de la respuesta.
+
+Uso:
+    python -m benchmarks.bench_batch_api --items 100 --repeat 50
+"""
+import argparse
+import statistics
+import time
+
+import pandas as pd
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import batch
+from app.llm_extractor import extract_with_fallback
+from app.main import api
+from app.registry import get_rules
+from app.rules import evaluate
+from app.schema import (Applicant, ApplicationExtract, BatchRequest, BatchResponse, BatchRow, CreditProfile, Employment,
+                        Financials)
+
+def legacy_frame(letters, rules_path: str) -> pd.DataFrame:
+    """El DataFrame aplanado con todas las columnas necesarias para reconstruir la extracción."""
+    plan = get_rules(rules_path)
+    rows = []
+    for item in letters:
+        decision = evaluate(batch.extract_with_llm(item["letter"]), plan)
+        ex = decision.extracted
+        rows.append({
+            "id": item["id"], "approved": decision.approved, "risk_score": decision.risk_score,
+            "failed_rules": ", ".join(decision.rationale), "letter": item["letter"],
+            "full_name": ex.applicant.full_name, "age_years": ex.applicant.age_years,
+            "tenure_months": ex.employment.employment_tenure_months, "employment_type": ex.employment.employment_type,
+            "employment_bussines": ex.employment.employment_bussines, "income": ex.financials.income_monthly,
+            "requested_amount": ex.financials.requested_amount, "active_credits": ex.financials.active_credits,
+            "has_mora": ex.credit.has_delinquencies_last_6m, "rating": ex.credit.credit_rating,
+            "rejections_12m": ex.credit.rejections_last_12m,
+        })
+    return pd.DataFrame(rows)
+
+def legacy_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/batch_decision", response_model=BatchResponse)
+    def batch_decision(req: BatchRequest):
+        df = legacy_frame([{"id": i.id, "letter": i.letter} for i in req.items], req.rules_path)
+        rows = []
+        for _, row in df.iterrows():
+            # La ida y vuelta por pandas convierte los None en NaN: hay que deshacerlo columna por columna.
+            extracted = ApplicationExtract(
+                applicant=Applicant(full_name=row["full_name"], age_years=row["age_years"]),
+                employment=Employment(employment_tenure_months=row["tenure_months"],
+                                      employment_type=row["employment_type"] if pd.notna(row["employment_type"]) else None,
+                                      employment_bussines=row["employment_bussines"]),
+                financials=Financials(income_monthly=row["income"], requested_amount=row["requested_amount"],
+                                      active_credits=row["active_credits"]),
+                credit=CreditProfile(has_delinquencies_last_6m=row["has_mora"], credit_rating=row["rating"],
+                                     rejections_last_12m=row["rejections_12m"]),
+                raw_letter=row["letter"],
+            )
+            rows.append(BatchRow(id=row["id"], approved=row["approved"], risk_score=row["risk_score"],
+                                 failed_rules=row["failed_rules"].split(", ") if row["failed_rules"] else [],
+                                 extracted=extracted))
+        return BatchResponse(rows=rows)
+
+    return app
+
+def _median_ms(client: TestClient, body: dict, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.post("/batch_decision", json=body)
+        samples.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.text
+    return statistics.median(samples) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del armado de la respuesta de /batch_decision")
+    parser.add_argument("--folder", default="examples/")
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    base = batch.read_letters_from_folder(args.folder)
+    items = [{"id": f"{i}", "letter": base[i % len(base)]["letter"]} for i in range(args.items)]
+    extracts = {item["letter"]: extract_with_fallback(item["letter"]) for item in base}
+    batch.extract_with_llm = lambda letter, **kwargs: extracts[letter]
+    body = {"items": items}
+
+    legacy, current = TestClient(legacy_app()), TestClient(api)
+    assert legacy.post("/batch_decision", json=body).json() == current.post("/batch_decision", json=body).json()
+    legacy_ms = _median_ms(legacy, body, args.repeat)
+    current_ms = _median_ms(current, body, args.repeat)
+    print(f"{'ítems':>6} {'DataFrame (ms)':>15} {'registros (ms)':>15} {'speedup':>8}")
+    print(f"{args.items:>6} {legacy_ms:>15.2f} {current_ms:>15.2f} {legacy_ms / current_ms:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""Benchmark: cliente de OpenAI nuevo en cada llamada vs. cliente compartido con pool.
+
+Usa `MockProvider` como proveedor local (latencia configurable, 0 por defecto) para que lo
+medido sea el costo fijo de cada llamada: construir el cliente, abrir la conexión, etc.
+
+Uso:
+    python -m benchmarks.bench_clients --calls 200 --threads 1 8
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import openai
+
+from app import providers
+from app.llm_extractor import _build_prompt
+from benchmarks.mock_provider import MockProvider
+
+LETTER = "Mi nombre es Juan Pérez, tengo 32 años y mis ingresos mensuales son de $1.800.000."
+
+def _complete(client) -> None:
+    client.chat.completions.create(model="mock", messages=[{"role": "user", "content": _build_prompt(LETTER)}])
+
+def per_call_client() -> None:
+    """Lo que se hacía antes: un `openai.OpenAI` nuevo por carta."""
+    _complete(openai.OpenAI(api_key="mock-key"))
+
+def pooled_client() -> None:
+    _complete(providers.get_openai_client("mock-key"))
+
+def run(fn, calls: int, threads: int) -> float:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(lambda _: fn(), range(calls)))
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de clientes LLM por llamada vs. compartidos")
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--latency", type=float, default=0.0, help="Latencia simulada del proveedor (s).")
+    args = parser.parse_args()
+
+    with MockProvider(latency=args.latency) as provider:
+        os.environ["OPENAI_BASE_URL"] = provider.base_url
+        print(f"{'hilos':>5} {'modo':<12} {'ms/llamada':>11} {'conexiones':>11}")
+        for threads in args.threads:
+            for name, fn in (("por llamada", per_call_client), ("compartido", pooled_client)):
+                fn()  # calentamiento (imports perezosos del SDK)
+                before = provider.connections
+                elapsed = run(fn, args.calls, threads)
+                print(f"{threads:>5} {name:<12} {elapsed / args.calls * 1e3:>11.2f} {provider.connections - before:>11}")
+        providers.close_clients()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""Benchmark: evaluación fila por fila vs. evaluación columnar de un lote.
+
+La extracción se hace una sola vez (cartas de `examples/` repetidas) para medir únicamente
+la evaluación de reglas y la construcción del DataFrame.
+
+Uso:
+    python -m benchmarks.bench_columnar --sizes 10000 100000 1000000
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from app.batch import columnar_frame, read_letters_from_folder
+from app.llm_extractor import extract_with_fallback
+from app.rules import evaluate, load_rules
+
+def scalar_frame(ids, extracts, plan) -> pd.DataFrame:
+    """Lo mismo que hace `evaluate_batch` por cada carta: un `Decision` y un dict por fila."""
+    results = []
+    for letter_id, ex in zip(ids, extracts):
+        decision = evaluate(ex, plan)
+        fin = decision.extracted.financials
+        results.append({
+            "id": letter_id,
+            "approved": decision.approved,
+            "risk_score": decision.risk_score,
+            "failed_rules": ", ".join(decision.rationale),
+            "income": fin.income_monthly,
+            "requested_amount": fin.requested_amount,
+            "amount_income_ratio": fin.requested_amount / fin.income_monthly if fin.income_monthly > 0 else float('inf'),
+            "age_years": decision.extracted.applicant.age_years,
+            "active_credits": fin.active_credits,
+            "rating": decision.extracted.credit.credit_rating,
+            "rejections_12m": decision.extracted.credit.rejections_last_12m,
+            "has_mora": decision.extracted.credit.has_delinquencies_last_6m,
+            "tenure_months": decision.extracted.employment.employment_tenure_months,
+        })
+    return pd.DataFrame(results)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de evaluate_batch columnar")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--rules", default="business_rules.yaml")
+    args = parser.parse_args()
+
+    plan = load_rules(args.rules)
+    pool = [extract_with_fallback(item["letter"]) for item in read_letters_from_folder("examples/")]
+
+    print(f"{'filas':>10} {'fila a fila (s)':>16} {'columnar (s)':>13} {'speedup':>8}")
+    for size in args.sizes:
+        extracts = [pool[i % len(pool)] for i in range(size)]
+        ids = [f"L{i}" for i in range(size)]
+
+        start = time.perf_counter()
+        expected = scalar_frame(ids, extracts, plan)
+        scalar_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        frame = columnar_frame(ids, extracts, [None] * size, plan)
+        columnar_s = time.perf_counter() - start
+
+        pd.testing.assert_frame_equal(expected, frame)
+        print(f"{size:>10} {scalar_s:>16.3f} {columnar_s:>13.3f} {scalar_s / columnar_s:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
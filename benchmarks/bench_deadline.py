@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""Benchmark: latencia de `/async/decision` con un proveedor degradado, sin plazo vs. con `deadline_ms`.
+
+`MockProvider` responde en `--latency` segundos, salvo una fracción `--stall-rate` de las
+solicitudes que tarda `--stall` segundos (un proveedor con cola larga). Se envían `--requests`
+solicitudes con `--concurrency` en vuelo, cada una con una carta distinta (sin aciertos de
+caché), y se reportan p50/p99 y la fracción respondida con el fallback.
+
+Uso:
+    python -m benchmarks.bench_deadline --requests 200 --deadline-ms 500
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+
+import httpx
+
+from benchmarks.mock_provider import MockProvider
+
+async def run_load(app, letters, concurrency: int, deadline_ms) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    latencies, fallbacks = [], 0
+    semaphore = asyncio.Semaphore(concurrency)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def one(letter):
+            nonlocal fallbacks
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post("/async/decision", json={"letter": letter, "deadline_ms": deadline_ms})
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+                fallbacks += response.json()["fallback"]
+
+        await asyncio.gather(*(one(letter) for letter in letters))
+    latencies.sort()
+    return {"p50": statistics.median(latencies), "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+            "fallback": fallbacks / len(letters)}
+
+def main():
+    parser = argparse.ArgumentParser(description="/async/decision con proveedor degradado: sin plazo vs. con plazo")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--stall", type=float, default=3.0)
+    parser.add_argument("--stall-rate", type=float, default=0.1)
+    parser.add_argument("--deadline-ms", type=int, default=500)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    latency = lambda: args.stall if rng.random() < args.stall_rate else args.latency
+    with MockProvider(latency=latency) as provider:
+        os.environ.pop("GOOGLE_API_KEY", None)
+        os.environ.update({"OPENAI_API_KEY": "mock-key", "OPENAI_BASE_URL": provider.base_url, "EXTRACTION_CACHE": "0"})
+
+        from app.main import api
+        import logging
+        logging.getLogger().setLevel(logging.WARNING)
+
+        letter = open("examples/aprobado.txt", encoding="utf-8").read()
+        letters = [f"{letter}\nSolicitud {i}." for i in range(args.requests)]
+        print(f"{'modo':<16} {'p50 (s)':>8} {'p99 (s)':>8} {'fallback':>9}")
+        for name, deadline_ms in (("sin plazo", 0), (f"plazo {args.deadline_ms} ms", args.deadline_ms)):
+            stats = asyncio.run(run_load(api, letters, args.concurrency, deadline_ms))
+            print(f"{name:<16} {stats['p50']:>8.3f} {stats['p99']:>8.3f} {stats['fallback']:>9.1%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""Benchmark: `rules.evaluate` (todas las reglas, con razones y valores) vs. `rules.decide` (modo rápido).
+
+Las extracciones salen del fallback sobre cartas sintéticas (las largas hacen cara la búsqueda
+de palabras en `raw_letter` de `experience_or_entrepreneur_ok`). Primero se calienta `decide`
+para que las muestras fijen el orden de las reglas; después se mide el costo por llamada de cada
+modo y se muestra el orden elegido con su costo medio y su tasa de resultado decisivo.
+
+Uso:
+    python -m benchmarks.bench_decide --letters 2000 --max-chars 100000
+"""
+import argparse
+import os
+import statistics
+import time
+
+def main():
+    parser = argparse.ArgumentParser(description="evaluate vs. decide (modo rápido)")
+    parser.add_argument("--letters", type=int, default=2000)
+    parser.add_argument("--max-chars", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ.update({"GOOGLE_API_KEY": "", "OPENAI_API_KEY": "", "EXTRACTION_CACHE": "0"})
+    from app.batch import extract_all
+    from app.registry import get_rules
+    from app.rules import decide, evaluate, rule_stats
+    from benchmarks.letters import generate_letters
+
+    plan = get_rules("business_rules.yaml")
+    extracts = [ex for _, ex, _ in extract_all(generate_letters(args.letters, seed=0, max_chars=args.max_chars))]
+    for ex in extracts:
+        decide(ex, plan)
+
+    print(f"{len(extracts)} extracciones (cartas de hasta {args.max_chars} caracteres)")
+    print(f"{'modo':<10} {'µs/llamada':>11}")
+    for name, fn in (("evaluate", evaluate), ("decide", decide)):
+        samples = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            for ex in extracts:
+                fn(ex, plan)
+            samples.append((time.perf_counter() - start) / len(extracts) * 1e6)
+        print(f"{name:<10} {statistics.median(samples):>11.2f}")
+
+    print(f"\n{'orden':<5} {'regla':<32} {'ns':>9} {'decisiva':>9}")
+    for position, rule in enumerate(rule_stats(plan).snapshot(), 1):
+        print(f"{position:<5} {rule['id']:<32} {rule['cost_ns']:>9.0f} {rule['decisive_rate']:>9.1%}")
+
+if __name__ == "__main__":
+    main()
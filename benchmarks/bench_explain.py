@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""Benchmark: `/explain` como antes (extraer + evaluar + armar la plantilla) vs. con la decisión ya hecha.
+
+Las decisiones salen del fallback sobre cartas sintéticas. Se mide, por explicación:
+- re-extracción: `extract_with_llm` + `evaluate` + plantilla (lo que hacía /explain con `letter`);
+- plantilla: armar el texto desde cero (`_generate_fallback_explanation`), sin memoizar;
+- memoizada: `explain_decision` con la caché precalculada (`prime_explanations`).
+
+Uso:
+    python -m benchmarks.bench_explain --letters 2000
+"""
+import argparse
+import os
+import statistics
+import time
+
+def main():
+    parser = argparse.ArgumentParser(description="Explicaciones: re-extracción vs. plantilla vs. memoizadas")
+    parser.add_argument("--letters", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ.update({"GOOGLE_API_KEY": "", "OPENAI_API_KEY": "", "EXTRACTION_CACHE": "0"})
+    from app.explain import _generate_fallback_explanation, explain_decision, explanation_signature, prime_explanations
+    from app.llm_extractor import extract_with_llm
+    from app.registry import get_rules
+    from app.rules import evaluate
+    from benchmarks.letters import generate_letters
+
+    plan = get_rules("business_rules.yaml")
+    letters = [item["letter"] for item in generate_letters(args.letters, seed=0, max_chars=5_000)]
+    start = time.perf_counter()
+    decisions = [evaluate(extract_with_llm(letter), plan) for letter in letters]
+    extract_us = (time.perf_counter() - start) / len(letters) * 1e6
+    primed = prime_explanations(plan)
+    print(f"{len(letters)} decisiones, {primed} firmas precalculadas, "
+          f"{len({explanation_signature(d) for d in decisions})} distintas en el lote")
+
+    modes = (("plantilla", lambda d: _generate_fallback_explanation(explanation_signature(d))),
+             ("memoizada", explain_decision))
+    print(f"{'modo':<14} {'µs/explicación':>15}")
+    for name, fn in modes:
+        samples = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            for d in decisions:
+                fn(d)
+            samples.append((time.perf_counter() - start) / len(decisions) * 1e6)
+        if name == "plantilla":
+            print(f"{'re-extracción':<14} {extract_us + statistics.median(samples):>15.2f}")
+        print(f"{name:<14} {statistics.median(samples):>15.2f}")
+
+if __name__ == "__main__":
+    main()
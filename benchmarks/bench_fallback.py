@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""Benchmark: extractor de fallback original (regex sin compilar) vs. el extractor compilado.
+
+`reference_extract` es una copia de la versión anterior de `extract_with_fallback`; además de
+medir, el benchmark verifica que ambas devuelvan exactamente lo mismo para cada carta.
+
+Uso:
+    python -m benchmarks.bench_fallback --repeat 200 --scales 1 10 100
+"""
+import argparse
+import re
+import time
+
+from app.batch import read_letters_from_folder
+from app.llm_extractor import extract_with_fallback
+from app.schema import Applicant, ApplicationExtract, CreditProfile, Employment, Financials
+
+def reference_extract(letter: str) -> ApplicationExtract:
+    """La implementación anterior, tal cual (los "\\x03" son parte de los patrones originales)."""
+    normalized_letter = " ".join(letter.lower().split())
+    word_to_num = {"un": 1, "uno": 1, "dos": 2, "tres": 3, "cuatro": 4, "cinco": 5}
+
+    def find_number(pattern, text, is_money=False):
+        match = re.search(pattern, text, re.IGNORECASE)
+        if not match:
+            return 0
+        val = match.group(1)
+        if is_money:
+            return int(re.sub(r'[^\d]', '', val))
+        if val in word_to_num:
+            return word_to_num[val]
+        if val.isdigit():
+            return int(val)
+        return 0
+
+    income = find_number(r"ingresos mensuales.*?([\d\.,]+)", normalized_letter, is_money=True)
+    amount = find_number(r"(?:valor|monto) de \$?([\d\.,]+)", normalized_letter, is_money=True)
+    age = find_number(r"tengo (\d{2})\s*a[nñ]os", normalized_letter)
+
+    experience_in_months = 0
+    exp_match = re.search(r"experiencia laboral de (\d+|un|uno|dos|tres|cuatro|cinco)\s*a[ñn]o(s)?", normalized_letter)
+    if exp_match:
+        val = exp_match.group(1)
+        years = int(val) if val.isdigit() else word_to_num.get(val, 0)
+        experience_in_months = years * 12
+    if experience_in_months == 0:
+        months_match = re.search(r"(\d+)\s*mes(es)? de experiencia", normalized_letter)
+        if months_match:
+            experience_in_months = int(months_match.group(1))
+        elif "menos de un a\x03o" in normalized_letter or "<12 meses" in normalized_letter:
+            experience_in_months = 6
+
+    active_credits = find_number(r"mantengo\s+(\w+)\s+cr\x03dito(s)?\s+activo(s)?", normalized_letter)
+    rejections = find_number(r"cr\x03dito en (\w+) ocasiones", normalized_letter)
+    if re.search(r"no he recibido ning.n rechazo", normalized_letter):
+        rejections = 0
+
+    has_delinquencies_last_6m = False
+    if "mora" in normalized_letter:
+        if not re.search(r"(sin|no).{0,40}mora", normalized_letter):
+            has_delinquencies_last_6m = True
+
+    rating_match = re.search(r'calificaci\x03n.*?"(.*?)"', letter, re.IGNORECASE | re.DOTALL)
+    rating = rating_match.group(1).capitalize() if rating_match else "Regular"
+    full_name_match = re.search(r"Mi nombre es (.*?)[,.]", letter)
+    full_name = full_name_match.group(1) if full_name_match else "Unknown"
+
+    kw = ["emprendimiento propio", "negocio propio", "emprendedor", "independiente",
+          "autónomo", "propietario", "dueño", "freelance"]
+    is_entrepreneur = False
+    employment_type_extracted = None
+    if "independiente" in normalized_letter:
+        employment_type_extracted = "independiente"
+        is_entrepreneur = True
+    elif "autónomo" in normalized_letter:
+        employment_type_extracted = "autónomo"
+        is_entrepreneur = True
+    elif "contratista" in normalized_letter:
+        employment_type_extracted = "contratista"
+        is_entrepreneur = True
+    elif "freelance" in normalized_letter:
+        employment_type_extracted = "freelance"
+        is_entrepreneur = True
+    elif "emprendedor" in normalized_letter:
+        employment_type_extracted = "emprendedor"
+        is_entrepreneur = True
+    elif any(k in normalized_letter for k in kw):
+        is_entrepreneur = True
+        employment_type_extracted = "emprendedor"
+
+    return ApplicationExtract(
+        applicant=Applicant(full_name=full_name, age_years=age),
+        employment=Employment(
+            employment_tenure_months=experience_in_months,
+            employment_type=employment_type_extracted,
+            employment_bussines=is_entrepreneur
+        ),
+        financials=Financials(income_monthly=income, requested_amount=amount, active_credits=active_credits),
+        credit=CreditProfile(has_delinquencies_last_6m=has_delinquencies_last_6m, credit_rating=rating, rejections_last_12m=rejections),
+        raw_letter=letter
+    )
+
+def _time_per_letter(fn, letters, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for letter in letters:
+            fn(letter)
+    return (time.perf_counter() - start) / (repeat * len(letters))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del extractor de fallback")
+    parser.add_argument("--folder", default="examples/")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100],
+                        help="Cada carta se repite N veces para simular cartas más largas.")
+    args = parser.parse_args()
+
+    base = [item["letter"] for item in read_letters_from_folder(args.folder)]
+    print(f"{'escala':>7} {'chars/carta':>12} {'original (µs)':>14} {'compilado (µs)':>15} {'speedup':>8}")
+    for scale in args.scales:
+        letters = ["\n".join([letter] * scale) for letter in base]
+        for letter in letters:
+            assert reference_extract(letter) == extract_with_fallback(letter), "las salidas difieren"
+        repeat = max(1, args.repeat // scale)
+        reference_s = _time_per_letter(reference_extract, letters, repeat)
+        compiled_s = _time_per_letter(extract_with_fallback, letters, repeat)
+        chars = sum(map(len, letters)) // len(letters)
+        print(f"{scale:>7} {chars:>12} {reference_s * 1e6:>14.1f} {compiled_s * 1e6:>15.1f} {reference_s / compiled_s:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
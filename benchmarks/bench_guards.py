@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""Benchmark: lote contra un proveedor caído, sin circuit breaker vs. con breaker.
+
+El proveedor falso tarda `--latency` segundos y siempre falla (como un timeout o un 503). Sin
+breaker cada carta paga esa espera antes de caer al fallback; con el breaker (`--failures`
+errores en la ventana) solo las primeras cartas la pagan y el resto va directo al fallback.
+
+Uso:
+    python -m benchmarks.bench_guards --letters 200 --latency 0.2
+"""
+import argparse
+import os
+import time
+
+def main():
+    parser = argparse.ArgumentParser(description="Lote con proveedor caído: sin breaker vs. con breaker")
+    parser.add_argument("--letters", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.2, help="Segundos que tarda cada llamada fallida.")
+    parser.add_argument("--failures", type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ.pop("GOOGLE_API_KEY", None)
+    os.environ.update({"OPENAI_API_KEY": "mock-key", "EXTRACTION_CACHE": "0", "FEATURE_STORE": "0"})
+    import logging
+    import app.llm_extractor as llm_extractor
+    from app.batch import evaluate_batch
+    from app.guards import CircuitBreaker, ProviderGuard, RateLimiter, set_guard
+    from benchmarks.letters import generate_letters
+
+    logging.getLogger().setLevel(logging.ERROR)
+    calls = [0]
+
+    def failing_call(letter, model_name, api_key):
+        calls[0] += 1
+        time.sleep(args.latency)
+        raise ConnectionError("503 Service Unavailable")
+
+    llm_extractor._call_openai = failing_call
+    letters = generate_letters(args.letters, seed=0, max_chars=5_000)
+    print(f"{args.letters} cartas, proveedor caído ({args.latency}s por llamada)")
+    print(f"{'modo':<14} {'segundos':>9} {'llamadas':>9}")
+    for name, failures in (("sin breaker", 10 ** 9), ("con breaker", args.failures)):
+        set_guard("openai", ProviderGuard("openai", CircuitBreaker(failures=failures, window=60, cooldown=30), RateLimiter()))
+        calls[0] = 0
+        start = time.perf_counter()
+        evaluate_batch(letters)
+        print(f"{name:<14} {time.perf_counter() - start:>9.2f} {calls[0]:>9}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""Benchmark: lote desde una carpeta con lista completa vs. lectura incremental (`app.ingest`).
+
+Escribe N cartas sintéticas en subcarpetas de un directorio temporal y evalúa el lote de tres
+formas: `read_letters_from_folder` + `evaluate_batch` (todas las cartas en memoria antes de
+empezar), `iter_letters` sin hilo lector y `iter_letters` con lectura anticipada. Reporta el
+tiempo total y el pico de memoria asignada por Python (tracemalloc) de cada una.
+
+Uso:
+    python -m benchmarks.bench_ingest --letters 20000
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+def _write_letters(root: str, n: int) -> None:
+    from benchmarks.letters import generate_letters
+
+    for item in generate_letters(n, seed=0, max_chars=20_000):
+        folder = os.path.join(root, item["id"][-2:])
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, f"{item['id']}.txt"), "w", encoding="utf-8") as f:
+            f.write(item["letter"])
+
+def _measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    rows = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return rows, elapsed, peak / 2**20
+
+def main():
+    parser = argparse.ArgumentParser(description="Lote desde carpeta: lista completa vs. lectura incremental")
+    parser.add_argument("--letters", type=int, default=10_000)
+    parser.add_argument("--prefetch", type=int, default=64)
+    args = parser.parse_args()
+
+    os.environ.update({"GOOGLE_API_KEY": "", "OPENAI_API_KEY": "", "EXTRACTION_CACHE": "0"})
+    from app.batch import evaluate_batch, read_letters_from_folder
+    from app.ingest import iter_folder, iter_letters
+
+    with tempfile.TemporaryDirectory(prefix="bench-ingest-") as root:
+        _write_letters(root, args.letters)
+
+        def eager():
+            # Equivalente a la lectura anterior, pero recursiva: todas las cartas en una lista.
+            letters = [item for folder in sorted(os.listdir(root)) for item in read_letters_from_folder(os.path.join(root, folder))]
+            return len(evaluate_batch(letters))
+
+        cases = [("lista completa", eager),
+                 ("iter_letters", lambda: len(evaluate_batch(iter_folder(root)))),
+                 (f"iter_letters (prefetch={args.prefetch})", lambda: len(evaluate_batch(iter_letters(root, prefetch=args.prefetch))))]
+        print(f"{args.letters} cartas en '{root}'")
+        print(f"{'modo':<28} {'segundos':>9} {'cartas/s':>10} {'pico MiB':>9}")
+        for name, fn in cases:
+            rows, elapsed, peak = _measure(fn)
+            assert rows == args.letters
+            print(f"{name:<28} {elapsed:>9.2f} {rows / elapsed:>10.1f} {peak:>9.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""Benchmark: costo de la instrumentación de `app.metrics`.
+
+Mide el costo de una observación suelta y el throughput de `evaluate` y de `/decision` (vía
+`TestClient`) con las métricas activas y desactivadas (`metrics.set_enabled`). Las rondas se
+intercalan para que el ruido de la máquina afecte a ambos casos por igual.
+
+Uso:
+    python -m benchmarks.bench_metrics --rounds 7
+"""
+import argparse
+import logging
+import os
+import statistics
+import time
+
+from app import metrics
+from benchmarks.letters import generate_letters
+
+def _per_call_ns(fn, n: int = 200_000) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n * 1e9
+
+def _throughput(fn, min_time: float) -> float:
+    calls, start = 0, time.perf_counter()
+    while time.perf_counter() - start < min_time:
+        fn()
+        calls += 1
+    return calls / (time.perf_counter() - start)
+
+def _compare(name: str, fn, rounds: int, min_time: float) -> None:
+    fn()
+    samples = {True: [], False: []}
+    for _ in range(rounds):
+        for enabled in (False, True):
+            metrics.set_enabled(enabled)
+            samples[enabled].append(_throughput(fn, min_time))
+    metrics.set_enabled(True)
+    off, on = statistics.median(samples[False]), statistics.median(samples[True])
+    print(f"{name:<28} {off:>14.1f} {on:>14.1f} {(off / on - 1) * 100:>+9.2f}%")
+
+def main():
+    parser = argparse.ArgumentParser(description="Costo de la instrumentación de métricas")
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.5)
+    args = parser.parse_args()
+
+    os.environ.update({"GOOGLE_API_KEY": "", "OPENAI_API_KEY": "", "EXTRACTION_CACHE": "0"})
+    logging.disable(logging.INFO)
+
+    histogram = metrics.Histogram("bench_seconds", "Histograma de prueba.", ["stage"])
+    series = histogram.labels(stage="x")
+    print(f"observe() con etiquetas:     {_per_call_ns(lambda: histogram.observe(0.001, stage='x')):>8.0f} ns")
+    print(f"observe() de una serie:      {_per_call_ns(lambda: series.observe(0.001)):>8.0f} ns")
+
+    def timer():
+        with series.time():
+            pass
+    print(f"with series.time():          {_per_call_ns(timer):>8.0f} ns")
+    metrics.set_enabled(False)
+    print(f"observe() desactivado:       {_per_call_ns(lambda: series.observe(0.001)):>8.0f} ns")
+    metrics.set_enabled(True)
+    metrics.REGISTRY.remove(histogram)
+
+    from fastapi.testclient import TestClient
+    from app.llm_extractor import extract_with_fallback
+    from app.main import api
+    from app.registry import get_rules
+    from app.rules import evaluate
+
+    letter = generate_letters(1, seed=0)[0]["letter"]
+    plan, extracted = get_rules("business_rules.yaml"), extract_with_fallback(letter)
+    client = TestClient(api)
+
+    print(f"\n{'':<28} {'sin métricas/s':>14} {'con métricas/s':>14} {'overhead':>10}")
+    _compare("evaluate", lambda: evaluate(extracted, plan), args.rounds, args.min_time)
+    _compare("POST /decision", lambda: client.post("/decision", json={"letter": letter}), args.rounds, args.min_time)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""Benchmark: re-evaluar un ruleset nuevo sobre el almacén de extracciones vs. volver a extraer.
+
+Llena un `FeatureStore` temporal con N solicitudes (extracciones del fallback sobre cartas
+sintéticas, con ids distintos y los montos variados para que las decisiones difieran), guarda
+la corrida con el ruleset actual y mide `rescore` con un ruleset modificado, con y sin diff.
+Como referencia, estima cuánto tardaría el mismo lote extrayendo de nuevo (`evaluate_batch`
+sobre una muestra, extrapolado a N).
+
+Uso:
+    python -m benchmarks.bench_rescore --rows 1000000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+def main():
+    parser = argparse.ArgumentParser(description="Rescore sobre el almacén de extracciones vs. re-extracción")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--sample", type=int, default=500, help="Cartas extraídas para la referencia de re-extracción.")
+    args = parser.parse_args()
+
+    os.environ.update({"GOOGLE_API_KEY": "", "OPENAI_API_KEY": "", "EXTRACTION_CACHE": "0", "FEATURE_STORE": "0"})
+    from app.batch import extract_all, evaluate_batch
+    from app.features import FeatureStore
+    from app.registry import get_rules
+    from app.rules import evaluate
+    from benchmarks.letters import generate_letters
+
+    plan = get_rules("business_rules.yaml")
+    sample = generate_letters(args.sample, seed=0, max_chars=5_000)
+    start = time.perf_counter()
+    evaluate_batch(sample)
+    extract_s = (time.perf_counter() - start) / args.sample * args.rows
+
+    base = [ex for _, ex, _ in extract_all(sample) if ex is not None]
+    with tempfile.TemporaryDirectory(prefix="bench-rescore-") as root:
+        with open(os.path.join(root, "rules.yaml"), "w", encoding="utf-8") as f, \
+                open("business_rules.yaml", encoding="utf-8") as original:
+            f.write(original.read().replace("max_amount_income_ratio: 0.30", "max_amount_income_ratio: 0.25"))
+        new_plan = get_rules(os.path.join(root, "rules.yaml"))
+
+        store = FeatureStore(os.path.join(root, "features.sqlite3"))
+        start = time.perf_counter()
+        block = []
+        for i in range(args.rows):
+            ex = base[i % len(base)]
+            ex = ex.model_copy(update={"financials": ex.financials.model_copy(
+                update={"requested_amount": ex.financials.requested_amount * (80 + i % 40) // 100})})
+            decision = evaluate(ex, plan)
+            block.append((f"sol-{i:07d}", ex, decision.approved, decision.risk_score, decision.rationale))
+            if len(block) == 10_000:
+                store.save(block, plan)
+                block = []
+        store.save(block, plan)
+        fill_s = time.perf_counter() - start
+        size = sum(os.path.getsize(os.path.join(root, name)) for name in os.listdir(root) if name.startswith("features"))
+
+        print(f"{args.rows} solicitudes en el almacén ({size / 2**20:.0f} MiB, llenado en {fill_s:.1f}s)")
+        print(f"{'modo':<30} {'segundos':>9} {'filas/s':>12}")
+        print(f"{'re-extracción (estimado)':<30} {extract_s:>9.1f} {args.rows / extract_s:>12.0f}")
+        for name, kwargs in (("rescore", {}), ("rescore + diff", {"diff": True, "compare_to": plan.version})):
+            summary = store.rescore(new_plan, **kwargs)
+            assert summary["rows"] == args.rows
+            print(f"{name:<30} {summary['seconds']:>9.2f} {args.rows / summary['seconds']:>12.0f}")
+        diff = summary["diff"]
+        print(f"diff: {diff['approved_to_rejected']} aprobadas -> rechazadas, {diff['rejected_to_approved']} "
+              f"rechazadas -> aprobadas, {diff['failed_rules_changed']} con otras reglas fallidas")
+
+if __name__ == "__main__":
+    main()
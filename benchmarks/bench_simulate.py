@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""Benchmark: barrido de umbrales con `app.simulate` vs. un `evaluate_columns` por configuración.
+
+La población se arma con las extracciones (fallback) de cartas sintéticas, repetidas hasta N
+filas con ingresos y montos variados. La grilla por defecto tiene 10 x 10 x 10 = 1000
+configuraciones (`min_income`, `max_amount_income_ratio`, `min_experience_months`). La referencia
+recompila el ruleset con cada combinación y evalúa toda la población en modo columnar; se mide
+sobre unas pocas configuraciones y se extrapola al total.
+
+Uso:
+    python -m benchmarks.bench_simulate --rows 1000000
+"""
+import argparse
+import os
+import time
+
+def main():
+    parser = argparse.ArgumentParser(description="Barrido de umbrales: simulate vs. una evaluación por configuración")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--values", type=int, default=10, help="Valores por umbral de la grilla (3 umbrales).")
+    parser.add_argument("--reference", type=int, default=3, help="Configuraciones medidas con el camino de referencia.")
+    args = parser.parse_args()
+
+    os.environ.update({"GOOGLE_API_KEY": "", "OPENAI_API_KEY": "", "EXTRACTION_CACHE": "0"})
+    import numpy as np
+    from app.batch import extract_all
+    from app.registry import get_rules
+    from app.rules import compile_rules
+    from app.simulate import population_from_extracts, simulate
+    from app.vectorized import evaluate_columns
+    from benchmarks.letters import generate_letters
+
+    plan = get_rules("business_rules.yaml")
+    base = [ex for _, ex, _ in extract_all(generate_letters(2000, seed=0, max_chars=5_000)) if ex is not None]
+    base_columns = population_from_extracts(base, plan)
+    rng = np.random.default_rng(0)
+    take = rng.integers(0, len(base), args.rows)
+    columns = {path: column[take] for path, column in base_columns.items()}
+    for path in ("financials.income_monthly", "financials.requested_amount"):
+        columns[path] = (columns[path] * rng.uniform(0.5, 1.5, args.rows)).astype(np.int64)
+
+    n = args.values
+    grid = {"min_income": [800_000 + 100_000 * i for i in range(n)],
+            "max_amount_income_ratio": [round(0.2 + 0.02 * i, 2) for i in range(n)],
+            "min_experience_months": [6 * i for i in range(n)]}
+    n_configs = n ** 3
+    print(f"{args.rows} solicitudes, {n_configs} configuraciones")
+
+    start = time.perf_counter()
+    result = simulate(columns, plan, grid)
+    simulate_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _, row in result.head(args.reference).iterrows():
+        cfg = dict(plan.config)
+        cfg["thresholds"] = {**plan.thresholds, **{key: row[key] for key in grid}}
+        approved = int(evaluate_columns(dict(columns), compile_rules(cfg))["approved"].sum())
+        assert approved == row["approved"]
+    reference_s = (time.perf_counter() - start) / args.reference * n_configs
+
+    print(f"{'modo':<32} {'segundos':>9} {'config/s':>10}")
+    print(f"{'evaluate_columns por config':<32} {reference_s:>9.1f} {n_configs / reference_s:>10.1f}  (estimado)")
+    print(f"{'simulate':<32} {simulate_s:>9.1f} {n_configs / simulate_s:>10.1f}")
+    best = result.sort_values("approval_rate", ascending=False).iloc[0]
+    print(f"mayor aprobación: {best['approval_rate']:.1%} con " + ", ".join(f"{key}={best[key]}" for key in grid))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""Benchmark: tiempo de arranque (imports) de la CLI y de la API, con presupuesto verificable.
+
+Cada objetivo se ejecuta en un proceso nuevo con `python -X importtime`, se suma el tiempo
+acumulado de los imports de primer nivel y se listan los módulos más caros. Además se verifica
+que no se carguen dependencias pesadas fuera del camino que las necesita (ej. pandas o los SDK
+de los LLM al procesar una sola carta con el fallback por regex).
+
+Uso:
+    python -m benchmarks.bench_startup                      # mediana de 5 ejecuciones por objetivo
+    python -m benchmarks.bench_startup --check --top 15     # código 1 si se excede algún presupuesto
+    python -m benchmarks.bench_startup --budget-ms cli.letter=400
+
+Los presupuestos por defecto dejan margen para una máquina lenta; ajústelos con --budget-ms.
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, NamedTuple, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Módulos que ningún objetivo debe cargar al arrancar sin claves de LLM configuradas.
+HEAVY_MODULES = ("pandas", "numpy", "openai", "google.generativeai", "httpx")
+
+class Target(NamedTuple):
+    args: Tuple[str, ...]       # argumentos de `python -X importtime ...`
+    budget_ms: float            # presupuesto por defecto del tiempo de imports
+    forbidden: Tuple[str, ...]  # módulos que no deben aparecer
+
+TARGETS: Dict[str, Target] = {
+    "cli.import": Target(("-c", "import app.main"), 150, HEAVY_MODULES + ("fastapi", "uvicorn")),
+    "cli.letter": Target(("-m", "app.main", "--letter", "examples/aprobado.txt"), 600, HEAVY_MODULES + ("fastapi", "uvicorn")),
+    "api.import": Target(("-c", "from app.main import api"), 1500, HEAVY_MODULES),
+}
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """(módulo, nivel, propio µs, acumulado µs) de cada línea de `-X importtime`."""
+    entries = []
+    for line in stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            own, cumulative, indent, name = match.groups()
+            entries.append((name, (len(indent) - 1) // 2, int(own), int(cumulative)))
+    return entries
+
+def run_target(target: Target) -> List[Tuple[str, int, int, int]]:
+    # Sin claves: se mide el arranque con el fallback por regex (load_dotenv no pisa variables definidas).
+    env = {**os.environ, "GOOGLE_API_KEY": "", "OPENAI_API_KEY": "", "EXTRACTION_CACHE": "0", "PYTHONPATH": ROOT}
+    result = subprocess.run([sys.executable, "-X", "importtime", *target.args], cwd=ROOT, env=env,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(target.args)} terminó con código {result.returncode}:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+def total_ms(entries: List[Tuple[str, int, int, int]]) -> float:
+    return sum(cumulative for _, level, _, cumulative in entries if level == 0) / 1000
+
+def forbidden_loaded(entries: List[Tuple[str, int, int, int]], forbidden: Tuple[str, ...]) -> List[str]:
+    names = {name for name, *_ in entries}
+    return [module for module in forbidden if module in names]
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo de arranque de la CLI y de la API (-X importtime)")
+    parser.add_argument("--only", nargs="+", choices=sorted(TARGETS), help="Objetivos a medir.")
+    parser.add_argument("--runs", type=int, default=5, help="Ejecuciones por objetivo (se reporta la mediana).")
+    parser.add_argument("--top", type=int, default=10, help="Módulos más caros a listar por objetivo.")
+    parser.add_argument("--budget-ms", nargs="+", default=[], metavar="OBJETIVO=MS",
+                        help="Reemplaza el presupuesto de un objetivo (ej. cli.letter=400).")
+    parser.add_argument("--check", action="store_true",
+                        help="Sale con código 1 si se excede un presupuesto o se carga un módulo prohibido.")
+    args = parser.parse_args()
+
+    budgets = {name: target.budget_ms for name, target in TARGETS.items()}
+    for item in args.budget_ms:
+        name, _, value = item.partition("=")
+        if name not in TARGETS:
+            parser.error(f"objetivo desconocido '{name}' (opciones: {', '.join(sorted(TARGETS))})")
+        budgets[name] = float(value)
+
+    failures = []
+    for name in args.only or list(TARGETS):
+        target = TARGETS[name]
+        runs = [run_target(target) for _ in range(args.runs)]
+        times = [total_ms(entries) for entries in runs]
+        median = statistics.median(times)
+        # El detalle se toma de la ejecución mediana.
+        entries = runs[times.index(sorted(times)[len(times) // 2])]
+        loaded = forbidden_loaded(entries, target.forbidden)
+
+        status = "OK" if median <= budgets[name] and not loaded else "EXCEDIDO"
+        print(f"\n{name:<12} {median:>8.1f} ms  (presupuesto {budgets[name]:.0f} ms, {len(entries)} módulos)  {status}")
+        for module, _, own, cumulative in sorted(entries, key=lambda e: e[3], reverse=True)[:args.top]:
+            print(f"    {cumulative / 1000:>8.1f} ms acumulado {own / 1000:>8.1f} ms propio  {module}")
+        if loaded:
+            print(f"    módulos pesados cargados: {', '.join(loaded)}")
+        if status != "OK":
+            failures.append(name)
+
+    if args.check:
+        if failures:
+            print(f"\nArranque fuera de presupuesto: {', '.join(failures)}")
+            sys.exit(1)
+        print("\nArranque dentro del presupuesto.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""Benchmark: escalamiento de `evaluate_batch(workers=N)` con el fallback por regex (CPU puro).
+
+Evalúa el mismo lote de cartas sintéticas con 1, 2, 4, ... procesos y reporta cartas/s, el
+speedup respecto de un proceso y la eficiencia (speedup / workers). Con workers=1 se usa el
+camino de un solo proceso, sin pool. Todas las corridas deben dar el mismo DataFrame.
+
+Uso:
+    python -m benchmarks.bench_workers --letters 20000 --workers 1 2 4 8 16 32
+"""
+import argparse
+import os
+import statistics
+import time
+
+def main():
+    parser = argparse.ArgumentParser(description="Escalamiento de evaluate_batch con --workers")
+    parser.add_argument("--letters", type=int, default=10_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=None,
+                        help="Cantidades de procesos a medir (por defecto potencias de 2 hasta los núcleos disponibles).")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-chars", type=int, default=10_000, help="Largo máximo de las cartas sintéticas.")
+    args = parser.parse_args()
+
+    # Sin claves: el trabajo es el fallback por regex, sin red ni caché.
+    os.environ.update({"GOOGLE_API_KEY": "", "OPENAI_API_KEY": "", "EXTRACTION_CACHE": "0"})
+    import pandas as pd
+    from app.batch import evaluate_batch
+    from benchmarks.letters import generate_letters
+
+    cores = os.cpu_count() or 1
+    counts = args.workers or [n for n in (1, 2, 4, 8, 16, 32, 64) if n <= cores] + ([cores] if cores & (cores - 1) else [])
+    letters = generate_letters(args.letters, seed=0, max_chars=args.max_chars)
+    print(f"{args.letters} cartas, {cores} núcleos disponibles")
+
+    expected = evaluate_batch(letters)
+    print(f"{'workers':>8} {'cartas/s':>12} {'speedup':>8} {'eficiencia':>11}")
+    base = None
+    for workers in counts:
+        samples = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            frame = evaluate_batch(letters, workers=workers)
+            samples.append(time.perf_counter() - start)
+        pd.testing.assert_frame_equal(frame, expected)
+        throughput = args.letters / statistics.median(samples)
+        base = base or throughput
+        speedup = throughput / base
+        print(f"{workers:>8} {throughput:>12.1f} {speedup:>7.2f}x {speedup / workers:>10.0%}")
+
+if __name__ == "__main__":
+    main()
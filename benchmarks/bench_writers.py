@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""Benchmark: escritura y relectura de resultados en CSV, NDJSON, Parquet y Arrow.
+
+Los bloques de resultados se calculan una sola vez (fallback por regex sobre cartas
+sintéticas); después se mide solo la escritura incremental con cada escritor de
+`app.writers`, el tamaño del archivo y el tiempo de volver a leerlo como DataFrame.
+
+Uso:
+    python -m benchmarks.bench_writers --letters 100000 --chunksize 5000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+def main():
+    parser = argparse.ArgumentParser(description="Escritura y lectura de resultados por formato")
+    parser.add_argument("--letters", type=int, default=50_000)
+    parser.add_argument("--chunksize", type=int, default=5000)
+    args = parser.parse_args()
+
+    os.environ.update({"GOOGLE_API_KEY": "", "OPENAI_API_KEY": "", "EXTRACTION_CACHE": "0"})
+    from app.batch import _block_frame, extract_all, stream_frame
+    from app.registry import get_rules
+    from app.writers import WRITERS, read_results
+    from benchmarks.letters import generate_letters
+
+    plan = get_rules("business_rules.yaml")
+    # Se extrae un conjunto chico de cartas y se repite hasta completar el lote (solo importa la escritura).
+    base = list(extract_all(generate_letters(min(args.letters, 2000), seed=0, max_chars=10_000)))
+    block = [(f"sint-{i:07d}", base[i % len(base)][1], None) for i in range(args.chunksize)]
+    n_blocks = max(1, args.letters // args.chunksize)
+    frames = {list_rules: stream_frame(_block_frame(block, plan, list_rules=list_rules), list_rules)
+              for list_rules in (False, True)}
+
+    print(f"{n_blocks * args.chunksize} filas en bloques de {args.chunksize}")
+    print(f"{'formato':<9} {'escritura s':>12} {'filas/s':>12} {'MiB':>8} {'lectura s':>10}")
+    with tempfile.TemporaryDirectory(prefix="bench-writers-") as root:
+        for name, writer_cls in WRITERS.items():
+            path = os.path.join(root, f"decisions.{name}")
+            frame = frames[writer_cls.list_rules]
+            start = time.perf_counter()
+            with writer_cls(path) as writer:
+                for _ in range(n_blocks):
+                    writer.write(frame)
+            write_s = time.perf_counter() - start
+            start = time.perf_counter()
+            rows = len(read_results(path, name))
+            read_s = time.perf_counter() - start
+            assert rows == n_blocks * args.chunksize
+            print(f"{name:<9} {write_s:>12.3f} {rows / write_s:>12.0f} {os.path.getsize(path) / 2**20:>8.2f} {read_s:>10.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""Generador de cartas sintéticas (en español, al estilo de `examples/`) para benchmarks.
+
+Con la misma semilla se generan siempre las mismas cartas: ingresos, montos, edades,
+calificaciones, mora, rechazos y redacción de emprendedor varían carta por carta, y el
+largo va desde una carta típica (~1 KB) hasta cartas muy grandes con anexos repetidos.
+
+Uso:
+    python -m benchmarks.letters --n 10000 --seed 7 --output cartas.csv
+"""
+import argparse
+import csv
+import random
+from typing import Dict, List, Optional
+
+FIRST_NAMES = ["Juan", "María", "Camila", "Andrés", "Ana", "Luis", "Valentina", "Carlos", "Laura", "Jorge",
+               "Daniela", "Felipe", "Sofía", "Mateo", "Paula", "Santiago"]
+LAST_NAMES = ["Pérez", "Gómez", "Torres", "Rodríguez", "García", "Martínez", "López", "Ramírez", "Hernández",
+              "Díaz", "Moreno", "Rojas"]
+RATINGS = ["Excelente", "Muy Buena", "Buena", "Regular", "Mala"]
+NUMBER_WORDS = {1: "un", 2: "dos", 3: "tres", 4: "cuatro", 5: "cinco"}
+ENTREPRENEUR_WORDING = [
+    "soy trabajador independiente",
+    "trabajo como autónomo",
+    "soy emprendedor con un negocio propio",
+    "me desempeño como contratista",
+    "trabajo como freelance",
+    "soy propietario de un pequeño emprendimiento propio",
+]
+EMPLOYEE_WORDING = ["trabajo como empleado de planta", "soy dependiente en una empresa del sector", "laboro con contrato a término indefinido"]
+FILLER = [
+    "Adjunto a esta carta, encontrarán la documentación necesaria para su evaluación.",
+    "Confío en que mi perfil financiero cumple con los requisitos necesarios para la aprobación de este préstamo.",
+    "Agradezco de antemano su atención y quedo a su disposición para cualquier información adicional que requieran.",
+    "Los recursos serán destinados a la consolidación de deudas y a mejoras en mi vivienda.",
+    "Cuento con estabilidad en mi residencia actual desde hace varios años.",
+]
+
+def _money(rng: random.Random, value: int) -> str:
+    """Formatea un monto como aparece en las cartas reales: con comas, puntos o signo de pesos."""
+    style = rng.randrange(3)
+    if style == 0:
+        return f"{value:,} pesos"
+    if style == 1:
+        return "$" + f"{value:,}".replace(",", ".")
+    return f"${value:,}"
+
+def _count(rng: random.Random, n: int) -> str:
+    return NUMBER_WORDS[n] if n in NUMBER_WORDS and rng.random() < 0.5 else str(n)
+
+def generate_letter(rng: random.Random, target_chars: Optional[int] = None) -> str:
+    """Genera una carta; con `target_chars` se agregan anexos hasta superar ese largo."""
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    age = rng.randint(18, 70)
+    income = rng.randrange(600_000, 12_000_000, 50_000)
+    amount = int(income * rng.uniform(0.1, 6.0)) // 10_000 * 10_000
+    rating = rng.choice(RATINGS)
+    active = rng.choice([0, 0, 1, 1, 2, 3, 4])
+    rejections = rng.choice([0, 0, 0, 1, 2, 3])
+    mora = rng.random() < 0.2
+    entrepreneur = rng.random() < 0.3
+
+    if rng.random() < 0.25:
+        months = rng.randint(1, 11)
+        experience = "menos de un año en mi trabajo actual" if rng.random() < 0.3 else f"{months} meses de experiencia"
+    else:
+        experience = f"una experiencia laboral de {_count(rng, rng.randint(1, 15))} años"
+    work = rng.choice(ENTREPRENEUR_WORDING if entrepreneur else EMPLOYEE_WORDING)
+    amount_phrase = rng.choice([f"por un valor de {_money(rng, amount)}", f"por un monto de {_money(rng, amount)}"])
+
+    paragraphs = [
+        "Solicitud de Crédito Personal",
+        rng.choice(["Apreciados señores,", "Estimados señores,", "Respetados señores:"]),
+        f"Me dirijo a ustedes con el fin de solicitar un crédito personal {amount_phrase}. Mi nombre es {name}, "
+        f"tengo {age} años, {work} y cuento con {experience}. Actualmente, mis ingresos mensuales ascienden a "
+        f"{_money(rng, income)}.",
+        f"Mi calificación crediticia es \"{rating}\" y " + (
+            f"mantengo {_count(rng, active)} crédito{'s' if active != 1 else ''} activo{'s' if active != 1 else ''}."
+            if active else "no tengo créditos activos."),
+        ("En los últimos seis meses tuve un crédito en mora, que ya se encuentra al día." if mora
+         else rng.choice(["En los últimos seis meses no he tenido ningún crédito en mora.",
+                          "No presento créditos en mora en los últimos 6 meses."])),
+        (f"Durante el último año, he solicitado crédito en "
+         f"{'una ocasión' if rejections == 1 else _count(rng, rejections) + ' ocasiones'}, pero mis solicitudes "
+         "fueron rechazadas." if rejections else "En los últimos doce meses no he recibido ningún rechazo de solicitud de crédito."),
+    ]
+    paragraphs += rng.sample(FILLER, rng.randint(1, len(FILLER)))
+    if target_chars:
+        annex = 1
+        while sum(map(len, paragraphs)) < target_chars:
+            paragraphs.append(f"Anexo {annex}: " + " ".join(rng.sample(FILLER, len(FILLER))))
+            annex += 1
+    paragraphs += ["Atentamente,", name]
+    return "\n\n".join(paragraphs)
+
+def generate_letters(n: int, seed: int = 0, max_chars: int = 100_000) -> List[Dict[str, str]]:
+    """Genera `n` cartas `{"id", "letter"}`: la mayoría típicas, ~5% largas y ~1% de hasta `max_chars`."""
+    rng = random.Random(seed)
+    letters = []
+    for i in range(n):
+        roll = rng.random()
+        target = max_chars if roll < 0.01 else (rng.randint(3_000, 10_000) if roll < 0.06 else None)
+        letters.append({"id": f"sint-{i:06d}", "letter": generate_letter(rng, target)})
+    return letters
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera cartas sintéticas en un CSV (columnas id, letter)")
+    parser.add_argument("--n", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-chars", type=int, default=100_000)
+    parser.add_argument("--output", default="cartas_sinteticas.csv")
+    args = parser.parse_args()
+
+    with open(args.output, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["id", "letter"])
+        writer.writeheader()
+        writer.writerows(generate_letters(args.n, args.seed, args.max_chars))
+    print(f"{args.n} cartas escritas en '{args.output}'.")
+
+if __name__ == "__main__":
+    main()
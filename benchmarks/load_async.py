@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""Prueba de carga: endpoints síncronos vs. asíncronos contra un proveedor LLM local.
+
+Levanta `MockProvider` (latencia configurable), apunta el cliente de OpenAI a él y dispara
+`--requests` solicitudes concurrentes a `/decision` y a `/async/decision` dentro del mismo
+proceso (httpx + ASGITransport). Reporta throughput y latencias p50/p99.
+
+Uso:
+    python -m benchmarks.load_async --requests 400 --latency 0.2
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import httpx
+
+from benchmarks.mock_provider import MockProvider
+
+async def run_load(app, path: str, letter: str, requests: int) -> dict:
+    """Envía `requests` solicitudes a la vez y mide la latencia de cada una."""
+    transport = httpx.ASGITransport(app=app)
+    latencies = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def one():
+            start = time.perf_counter()
+            response = await client.post(path, json={"letter": letter})
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "throughput": requests / elapsed,
+        "p50": statistics.median(latencies),
+        "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga sync vs async contra un proveedor local")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--latency", type=float, default=0.2, help="Latencia simulada del proveedor (s).")
+    args = parser.parse_args()
+
+    with MockProvider(latency=args.latency) as provider:
+        os.environ.pop("GOOGLE_API_KEY", None)
+        os.environ["OPENAI_API_KEY"] = "mock-key"
+        os.environ["OPENAI_BASE_URL"] = provider.base_url
+        # Todas las solicitudes usan la misma carta: sin esto, la caché respondería en lugar del proveedor.
+        os.environ["EXTRACTION_CACHE"] = "0"
+
+        from app.main import api
+        import logging
+        logging.getLogger().setLevel(logging.WARNING)
+
+        letter = open("examples/aprobado.txt", encoding="utf-8").read()
+        print(f"{'modo':<16} {'req/s':>8} {'p50 (s)':>8} {'p99 (s)':>8}")
+        for name, path in (("sync", "/decision"), ("async", "/async/decision")):
+            stats = asyncio.run(run_load(api, path, letter, args.requests))
+            print(f"{name:<16} {stats['throughput']:>8.1f} {stats['p50']:>8.3f} {stats['p99']:>8.3f}")
+
+if __name__ == "__main__":
+    main()
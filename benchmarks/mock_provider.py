@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""Proveedor LLM local para benchmarks: imita el endpoint `/v1/chat/completions` de OpenAI.
+
+Responde siempre la misma extracción válida después de `latency` segundos, así que permite
+medir el comportamiento de la API y de los clientes sin salir a la red.
+
+    with MockProvider(latency=0.2) as provider:
+        os.environ["OPENAI_BASE_URL"] = provider.base_url
+"""
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+EXTRACTION = {
+    "applicant": {"full_name": "Juan Pérez", "age_years": 32},
+    "employment": {"employment_tenure_months": 60, "employment_type": "dependiente", "employment_bussines": False},
+    "financials": {"income_monthly": 1800000, "requested_amount": 400000, "active_credits": 1},
+    "credit": {"has_delinquencies_last_6m": False, "credit_rating": "Buena", "rejections_last_12m": 0},
+}
+
+def completion_body(content: str) -> bytes:
+    """Cuerpo de respuesta con el formato de `chat.completions` de OpenAI."""
+    return json.dumps({
+        "id": "chatcmpl-mock",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": "mock",
+        "choices": [{"index": 0, "finish_reason": "stop",
+                     "message": {"role": "assistant", "content": content}}],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }).encode("utf-8")
+
+class MockProvider:
+    """Servidor HTTP en un hilo aparte (un hilo por conexión, keep-alive habilitado)."""
+
+    def __init__(self, latency: float = 0.1, host: str = "127.0.0.1", port: int = 0, respond=None):
+        provider = self
+        # `latency` puede ser un número o una función sin argumentos (ej. una distribución con cola larga).
+        self.latency = latency
+        self.requests = 0
+        self.connections = 0
+        # `respond(body) -> str` permite devolver otro contenido según el prompt recibido.
+        self.respond = respond or (lambda body: json.dumps(EXTRACTION))
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                # Sin esto, Nagle + ACK retardado suman ~40 ms a cada respuesta en conexiones keep-alive.
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                provider.connections += 1
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                provider.requests += 1
+                time.sleep(provider.latency() if callable(provider.latency) else provider.latency)
+                payload = completion_body(provider.respond(body))
+                try:
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    # El cliente abandonó la solicitud (ej. se cerró su event loop con la llamada en curso).
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._server.request_queue_size = 1024
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
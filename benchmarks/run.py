@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""Suite de benchmarks de punta a punta, con baseline guardado y chequeo de regresiones.
+
+Mide el throughput (unidades por segundo, mediana de varias rondas) del extractor de fallback,
+de `evaluate`, de `evaluate_batch` a distintos tamaños y de cada endpoint de la API a través de
+`TestClient`, usando las cartas sintéticas de `benchmarks.letters` (misma semilla, mismas cartas).
+Todo corre sin red: las claves de los LLM se vacían y la caché de extracciones se desactiva.
+
+Uso:
+    python -m benchmarks.run                          # corre y compara contra el baseline (si existe)
+    python -m benchmarks.run --save                   # guarda los resultados como nuevo baseline
+    python -m benchmarks.run --check --threshold 0.2  # sale con código 1 si algo cae más de 20%
+    python -m benchmarks.run --only api. --quick
+
+El baseline depende de la máquina: regenérelo con `--save` al cambiar de entorno.
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from benchmarks.letters import generate_letter, generate_letters
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# Cada benchmark es (nombre, unidad, setup); `setup(seed)` prepara los datos y devuelve la función
+# a medir, que devuelve cuántas unidades procesó en una llamada.
+BENCHMARKS: List[Tuple[str, str, Callable[[int], Callable[[], int]]]] = []
+
+def benchmark(name: str, unit: str = "cartas/s"):
+    def register(setup):
+        BENCHMARKS.append((name, unit, setup))
+        return setup
+    return register
+
+def _typical_letters(seed: int, n: int) -> List[str]:
+    import random
+    rng = random.Random(seed)
+    return [generate_letter(rng) for _ in range(n)]
+
+# --- Extracción y Reglas ---
+
+@benchmark("fallback.typical")
+def _fallback_typical(seed):
+    from app.llm_extractor import extract_with_fallback
+    letters = _typical_letters(seed, 200)
+    return lambda: sum(1 for letter in letters if extract_with_fallback(letter))
+
+@benchmark("fallback.large_100k")
+def _fallback_large(seed):
+    import random
+    from app.llm_extractor import extract_with_fallback
+    rng = random.Random(seed)
+    letters = [generate_letter(rng, target_chars=100_000) for _ in range(5)]
+    return lambda: sum(1 for letter in letters if extract_with_fallback(letter))
+
+@benchmark("evaluate")
+def _evaluate(seed):
+    from app.llm_extractor import extract_with_fallback
+    from app.registry import get_rules
+    from app.rules import evaluate
+    plan = get_rules("business_rules.yaml")
+    extracts = [extract_with_fallback(letter) for letter in _typical_letters(seed, 200)]
+    return lambda: sum(1 for ex in extracts if evaluate(ex, plan))
+
+def _evaluate_batch(size: int, columnar: bool = False):
+    def setup(seed):
+        from app.batch import evaluate_batch
+        letters = generate_letters(size, seed=seed)
+        return lambda: len(evaluate_batch(letters, columnar=columnar))
+    return setup
+
+for _size in (10, 100, 1000):
+    benchmark(f"evaluate_batch.{_size}")(_evaluate_batch(_size))
+benchmark("evaluate_batch.columnar.1000")(_evaluate_batch(1000, columnar=True))
+
+# --- API ---
+
+def _client():
+    from fastapi.testclient import TestClient
+    from app.main import api
+    return TestClient(api)
+
+def _post(path: str, body_fn: Callable[[int], dict], units: int = 1):
+    """Benchmark de un POST: cada llamada envía el mismo cuerpo y verifica la respuesta."""
+    def setup(seed):
+        client, body = _client(), body_fn(seed)
+
+        def call():
+            response = client.post(path, json=body)
+            assert response.status_code < 300, f"{path}: {response.status_code} {response.text[:200]}"
+            return units
+        return call
+    return setup
+
+def _letter_body(seed: int) -> dict:
+    return {"letter": _typical_letters(seed, 1)[0]}
+
+def _batch_body(seed: int) -> dict:
+    return {"items": generate_letters(100, seed=seed, max_chars=10_000)}
+
+for _prefix in ("", "/async"):
+    _tag = "api.async" if _prefix else "api"
+    benchmark(f"{_tag}.extract", "solicitudes/s")(_post(f"{_prefix}/extract", _letter_body))
+    benchmark(f"{_tag}.decision", "solicitudes/s")(_post(f"{_prefix}/decision", _letter_body))
+    benchmark(f"{_tag}.explain", "solicitudes/s")(_post(f"{_prefix}/explain", _letter_body))
+    benchmark(f"{_tag}.batch_decision.100")(_post(f"{_prefix}/batch_decision", _batch_body, units=100))
+    benchmark(f"{_tag}.batch_decision_stream.100")(_post(f"{_prefix}/batch_decision/stream", _batch_body, units=100))
+
+@benchmark("api.jobs.submit_status_results", "solicitudes/s")
+def _api_jobs(seed):
+    client = _client()
+    body = {"items": generate_letters(10, seed=seed)}
+
+    def call():
+        job_id = client.post("/jobs", json=body).json()["id"]
+        client.get(f"/jobs/{job_id}").raise_for_status()
+        client.get(f"/jobs/{job_id}/results").raise_for_status()
+        return 3
+    return call
+
+@benchmark("api.metrics", "solicitudes/s")
+def _api_metrics(seed):
+    client = _client()
+
+    def call():
+        client.get("/metrics").raise_for_status()
+        return 1
+    return call
+
+@benchmark("api.cache_stats", "solicitudes/s")
+def _api_cache_stats(seed):
+    client = _client()
+
+    def call():
+        client.get("/cache/stats").raise_for_status()
+        return 1
+    return call
+
+# --- Medición ---
+
+def measure(fn: Callable[[], int], min_time: float, rounds: int) -> float:
+    """Mediana, entre `rounds` rondas, de las unidades por segundo; cada ronda dura al menos `min_time`."""
+    fn()  # calentamiento (imports perezosos, compilación de reglas, conexiones)
+    samples = []
+    for _ in range(rounds):
+        units, start = 0, time.perf_counter()
+        while True:
+            units += fn()
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+        samples.append(units / elapsed)
+    return statistics.median(samples)
+
+def run(only: Optional[List[str]] = None, seed: int = 0, min_time: float = 0.5, rounds: int = 5) -> Dict[str, dict]:
+    results = {}
+    for name, unit, setup in BENCHMARKS:
+        if only and not any(name.startswith(prefix) for prefix in only):
+            continue
+        # Los print de la API (ej. el fallback de /explain) no deben terminar midiendo la consola.
+        with contextlib.redirect_stdout(io.StringIO()):
+            throughput = measure(setup(seed), min_time, rounds)
+        results[name] = {"throughput": throughput, "unit": unit}
+        print(f"  {name:<40} {throughput:>12.1f} {unit}", file=sys.stderr)
+    return results
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> List[str]:
+    """Nombres de los benchmarks cuyo throughput cayó más de `threshold` (fracción) respecto del baseline."""
+    return [name for name, result in results.items()
+            if name in baseline and result["throughput"] < baseline[name]["throughput"] * (1 - threshold)]
+
+def main():
+    parser = argparse.ArgumentParser(description="Suite de benchmarks con baseline y chequeo de regresiones")
+    parser.add_argument("--only", nargs="+", help="Prefijos de los benchmarks a correr (ej. fallback. api.async.).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-time", type=float, default=0.5, help="Segundos mínimos por ronda.")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--quick", action="store_true", help="Rondas más cortas (menos precisión).")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save", action="store_true", help="Guarda los resultados como baseline.")
+    parser.add_argument("--check", action="store_true", help="Sale con código 1 si algún benchmark regresa.")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Caída de throughput tolerada antes de considerarlo regresión (0.25 = 25%%).")
+    args = parser.parse_args()
+
+    # Antes de importar `app` (los imports son perezosos): sin proveedores LLM (load_dotenv no pisa
+    # variables ya definidas), sin caché de extracciones y con la cola de trabajos en un directorio temporal.
+    os.environ.update({"GOOGLE_API_KEY": "", "OPENAI_API_KEY": "", "EXTRACTION_CACHE": "0", "JOBS_WORKERS": "0",
+                       "JOBS_DB_PATH": os.path.join(tempfile.mkdtemp(prefix="bench-jobs-"), "jobs.sqlite3")})
+    logging.disable(logging.INFO)
+    min_time, rounds = (args.min_time / 5, 3) if args.quick else (args.min_time, args.rounds)
+    print(f"Corriendo benchmarks (semilla {args.seed})...", file=sys.stderr)
+    results = run(args.only, args.seed, min_time, rounds)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+
+    print(f"\n{'benchmark':<40} {'baseline':>12} {'actual':>12} {'cambio':>8}  unidad")
+    for name, result in results.items():
+        base = baseline.get(name, {}).get("throughput")
+        change = f"{(result['throughput'] / base - 1) * 100:+.1f}%" if base else "-"
+        base_text = f"{base:.1f}" if base else "-"
+        print(f"{name:<40} {base_text:>12} {result['throughput']:>12.1f} {change:>8}  {result['unit']}")
+
+    if args.save:
+        # Se conservan los benchmarks que no se corrieron esta vez (--only).
+        merged = {**baseline, **results}
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"meta": {"python": platform.python_version(), "platform": platform.platform(),
+                                "seed": args.seed, "created": datetime.now(timezone.utc).isoformat(timespec="seconds")},
+                       "results": merged}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nBaseline guardado en '{args.baseline}'.")
+
+    if args.check:
+        if not baseline:
+            sys.exit(f"No hay baseline en '{args.baseline}': ejecute primero con --save.")
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\nRegresiones (> {args.threshold:.0%} más lento que el baseline): {', '.join(regressions)}")
+            sys.exit(1)
+        print(f"\nSin regresiones (umbral {args.threshold:.0%}).")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+import app.llm_extractor as llm_extractor
+from app import providers
+from app.cache import set_cache
+from app.guards import set_guard
+from app.llm_extractor import extract_with_fallback
+from benchmarks.mock_provider import MockProvider
+
+_KEY_ENV = {"gemini": "GOOGLE_API_KEY", "openai": "OPENAI_API_KEY"}
+
+def _reset_process_state() -> None:
+    set_cache(None)
+    for provider in _KEY_ENV:
+        set_guard(provider, None)
+
+@pytest.fixture
+def fake_provider(monkeypatch):
+    """Instala proveedores LLM falsos (sin red) y deja la caché y las protecciones del proceso limpias.
+
+    `fake_provider(call=None, provider="openai", call_async=None, cache=None)` define la clave de API
+    del proveedor y reemplaza `_call_<proveedor>` (y `_call_<proveedor>_async` si se pasa `call_async`).
+    Sin `call`, el proveedor responde con el fallback por regex. `cache` es la caché de extracciones
+    a usar (None: sin caché). Devuelve la lista de cartas que recibió el proveedor.
+    Sin llamarlo, no queda ninguna clave de API configurada.
+    """
+    for env in _KEY_ENV.values():
+        monkeypatch.delenv(env, raising=False)
+    monkeypatch.setenv("EXTRACTION_CACHE", "0")
+    _reset_process_state()
+
+    def install(call=None, provider: str = "openai", call_async=None, cache=None):
+        calls = []
+        call = call or (lambda letter, model_name, api_key: extract_with_fallback(letter))
+
+        def counted(letter, model_name, api_key):
+            calls.append(letter)
+            return call(letter, model_name, api_key)
+
+        monkeypatch.setenv(_KEY_ENV[provider], f"{provider}-test-key")
+        monkeypatch.setattr(llm_extractor, f"_call_{provider}", counted)
+        if call_async is not None:
+            async def counted_async(letter, model_name, api_key):
+                calls.append(letter)
+                return await call_async(letter, model_name, api_key)
+
+            monkeypatch.setattr(llm_extractor, f"_call_{provider}_async", counted_async)
+        if cache is not None:
+            monkeypatch.setenv("EXTRACTION_CACHE", "1")
+            set_cache(cache)
+        return calls
+
+    yield install
+    _reset_process_state()
+
+@pytest.fixture
+def mock_openai(monkeypatch):
+    """OpenAI apuntando a un proveedor local (`MockProvider`, sin latencia), sin caché de extracciones."""
+    with MockProvider(latency=0) as provider:
+        monkeypatch.delenv("GOOGLE_API_KEY", raising=False)
+        monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+        monkeypatch.setenv("OPENAI_BASE_URL", provider.base_url)
+        monkeypatch.setenv("EXTRACTION_CACHE", "0")
+        _reset_process_state()
+        yield provider
+        providers.close_clients()
+        _reset_process_state()
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.batch import evaluate_batch, evaluate_batch_async, read_letters_from_folder
+from app.main import api
+
+letters = read_letters_from_folder("examples/")[:4]
+
+@pytest.mark.parametrize("path, body", [
+    ("/extract", {"letter": letters[0]["letter"]}),
+    ("/decision", {"letter": letters[0]["letter"]}),
+    ("/explain", {"letter": letters[1]["letter"]}),
+    ("/batch_decision", {"items": letters, "concurrency": 4}),
+])
+def test_async_endpoint_matches_sync(mock_openai, path, body):
+    """Cada endpoint de /async devuelve lo mismo que su versión síncrona (ambos extraen con el proveedor local)."""
+    client = TestClient(api)
+    sync = client.post(path, json=body)
+    asynchronous = client.post(f"/async{path}", json=body)
+    assert sync.status_code == asynchronous.status_code == 200
+    assert asynchronous.json() == sync.json()
+    assert mock_openai.requests == 2 * len(body.get("items", [body]))
+
+def test_evaluate_batch_async_matches_sync(mock_openai):
+    expected = evaluate_batch(letters, concurrency=2)
+    result = asyncio.run(evaluate_batch_async(letters, concurrency=2))
+    assert result.to_dict("records") == expected.to_dict("records")
+    assert mock_openai.requests == 2 * len(letters)
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+import json
+import time
+import pytest
+
+import pandas as pd
+
+import app.batch as batch_module
+from app.batch import read_letters_from_folder, evaluate_batch, evaluate_batch_columnar
+from app.llm_extractor import extract_with_llm
+from app.rules import load_rules, evaluate
+
+letters = read_letters_from_folder("examples/")
+
+def test_columnar_matches_scalar():
+    """El modo columnar produce exactamente el mismo DataFrame que la evaluación carta por carta."""
+    expected = evaluate_batch(letters)
+    result = evaluate_batch(letters, columnar=True)
+    pd.testing.assert_frame_equal(expected, result)
+
+def test_columnar_decisions_are_lazy_and_equal():
+    """Los `Decision` del modo columnar se construyen bajo demanda y coinciden con `evaluate`."""
+    batch = evaluate_batch_columnar(letters)
+    rules_config = load_rules("business_rules.yaml")
+    assert len(batch) == len(letters)
+    assert batch.decision(0) == evaluate(extract_with_llm(letters[0]["letter"]), rules_config)
+
+# --- Extracción concurrente contra un proveedor falso ---
+
+def _fake_provider(latency, slow_ids=(), slow_latency=0.0):
+    """Proveedor LLM falso: simula la latencia de red y luego usa el fallback local."""
+    from app.llm_extractor import extract_with_fallback
+
+    def extract(letter, **kwargs):
+        time.sleep(slow_latency if any(s in letter for s in slow_ids) else latency)
+        return extract_with_fallback(letter)
+    return extract
+
+def _timed_batch(batch_letters, **kwargs):
+    start = time.perf_counter()
+    df = evaluate_batch(batch_letters, **kwargs)
+    return df, time.perf_counter() - start
+
+def test_concurrency_scales_wall_clock(monkeypatch):
+    """El tiempo total baja con el nivel de concurrencia y el orden de salida se mantiene."""
+    monkeypatch.setattr(batch_module, "extract_with_llm", _fake_provider(latency=0.1))
+    batch_letters = letters[:8]
+
+    sequential, t1 = _timed_batch(batch_letters, concurrency=1)
+    parallel_4, t4 = _timed_batch(batch_letters, concurrency=4)
+    parallel_8, t8 = _timed_batch(batch_letters, concurrency=8)
+
+    assert t1 >= 0.8
+    assert t4 < t1 / 2
+    assert t8 < t4
+    pd.testing.assert_frame_equal(sequential, parallel_4)
+    pd.testing.assert_frame_equal(sequential, parallel_8)
+
+def test_timeout_marks_parse_error(monkeypatch):
+    """Una carta que excede el timeout queda como parse_error sin afectar a las demás."""
+    batch_letters = [{"id": "lenta", "letter": "LENTA " + letters[0]["letter"]}] + letters[:3]
+    monkeypatch.setattr(batch_module, "extract_with_llm", _fake_provider(latency=0.01, slow_ids=("LENTA",), slow_latency=1.0))
+
+    df, elapsed = _timed_batch(batch_letters, concurrency=2, timeout=0.2)
+
+    assert elapsed < 1.0
+    assert list(df["id"]) == [item["id"] for item in batch_letters]
+    assert df.loc[0, "failed_rules"].startswith("parse_error: timeout")
+    assert df["failed_rules"].iloc[1:].str.startswith("parse_error").sum() == 0
+
+# --- Modo streaming reanudable ---
+
+def test_csv_stream_resumes_after_crash(monkeypatch, tmp_path):
+    """Un lote interrumpido se reanuda desde el último bloque completo y termina igual que uno sin cortes."""
+    from app.batch import evaluate_csv_stream
+
+    input_path = tmp_path / "letters.csv"
+    pd.DataFrame(letters * 2).to_csv(input_path, index=False)
+    expected_path = tmp_path / "expected.csv"
+    evaluate_csv_stream(str(input_path), str(expected_path), chunksize=4)
+
+    expected = evaluate_batch(pd.read_csv(input_path).to_dict('records'))
+    streamed = pd.read_csv(expected_path)
+    assert list(streamed.columns) == list(batch_module.RESULT_COLUMNS)
+    assert streamed["approved"].tolist() == expected["approved"].tolist()
+    assert streamed["failed_rules"].tolist() == expected["failed_rules"].tolist()
+
+    # Se "cae" el proceso al extraer la carta 10 (a mitad del tercer bloque).
+    calls = []
+    real_extract = batch_module.extract_with_llm
+
+    def crashing_extract(letter, **kwargs):
+        calls.append(letter)
+        if len(calls) == 10:
+            raise KeyboardInterrupt
+        return real_extract(letter, **kwargs)
+
+    output_path = tmp_path / "decisions.csv"
+    monkeypatch.setattr(batch_module, "extract_with_llm", crashing_extract)
+    try:
+        evaluate_csv_stream(str(input_path), str(output_path), chunksize=4)
+    except KeyboardInterrupt:
+        pass
+    assert json.loads((tmp_path / "decisions.csv.checkpoint").read_text())["rows_done"] == 8
+
+    # Si la salida ya no tiene lo que registra el checkpoint, no se reanuda sobre ella.
+    written = output_path.read_bytes()
+    output_path.write_bytes(written[:10])
+    with pytest.raises(ValueError, match="--restart"):
+        evaluate_csv_stream(str(input_path), str(output_path), chunksize=4)
+    output_path.unlink()
+    with pytest.raises(ValueError, match="--restart"):
+        evaluate_csv_stream(str(input_path), str(output_path), chunksize=4)
+    output_path.write_bytes(written)
+
+    monkeypatch.setattr(batch_module, "extract_with_llm", real_extract)
+    summary = evaluate_csv_stream(str(input_path), str(output_path), chunksize=4)
+    assert summary["resumed_from"] == 8
+    assert summary["rows"] == len(letters) * 2
+    assert output_path.read_bytes() == expected_path.read_bytes()
+    assert not (tmp_path / "decisions.csv.checkpoint").exists()
+
+# --- Streaming NDJSON ---
+
+def test_unordered_rows_arrive_with_fastest_letter(monkeypatch):
+    """Sin orden, la primera fila llega con la carta más rápida y no espera a la más lenta."""
+    from app.batch import iter_batch_rows
+
+    items = [{"id": "lenta", "letter": "LENTA " + letters[0]["letter"]}] + letters[:5]
+    monkeypatch.setattr(batch_module, "extract_with_llm", _fake_provider(latency=0.02, slow_ids=("LENTA",), slow_latency=0.5))
+
+    start = time.perf_counter()
+    rows = iter_batch_rows(items, concurrency=4, ordered=False)
+    first = next(rows)
+    first_s = time.perf_counter() - start
+    rest = list(rows)
+
+    assert first.id != "lenta" and first_s < 0.3
+    assert rest[-1].id == "lenta"
+    assert sorted(r.id for r in [first] + rest) == sorted(i["id"] for i in items)
+
+def test_batch_stream_endpoint_emits_ndjson(monkeypatch):
+    """/batch_decision/stream emite una `BatchRow` por línea, en orden de entrada por defecto."""
+    from fastapi.testclient import TestClient
+    from app.main import api
+
+    items = [{"id": "vacia", "letter": ""}] + letters[:3]
+    response = TestClient(api).post("/batch_decision/stream", json={"items": items})
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["id"] for r in rows] == [i["id"] for i in items]
+    expected = evaluate(extract_with_llm(letters[0]["letter"]), load_rules("business_rules.yaml"))
+    assert rows[1]["failed_rules"] == expected.rationale
+    assert rows[1]["extracted"]["raw_letter"] == letters[0]["letter"]
+
+def test_batch_decision_endpoint_returns_typed_rows(monkeypatch):
+    """/batch_decision arma las filas desde los `Decision`: extracción completa y errores por carta."""
+    from fastapi.testclient import TestClient
+    from app.main import api
+
+    def extract(letter, **kwargs):
+        if letter == "ROTA":
+            raise ValueError("carta ilegible")
+        return extract_with_llm(letter, **kwargs)
+
+    monkeypatch.setattr(batch_module, "extract_with_llm", extract)
+    items = letters[:3] + [{"id": "rota", "letter": "ROTA"}]
+    response = TestClient(api).post("/batch_decision", json={"items": items})
+    assert response.status_code == 200
+    rows = response.json()["rows"]
+    assert [r["id"] for r in rows] == [i["id"] for i in items]
+    expected = evaluate(extract_with_llm(letters[0]["letter"]), load_rules("business_rules.yaml"))
+    assert rows[0]["failed_rules"] == expected.rationale
+    assert rows[0]["extracted"] == json.loads(expected.extracted.model_dump_json())
+    assert rows[-1]["failed_rules"] == ["parse_error"] and rows[-1]["error"] == "carta ilegible"
+
+# --- Modo multiproceso ---
+
+def test_workers_match_single_process(tmp_path):
+    """Con `workers` el lote se reparte entre procesos y el resultado conserva el orden de entrada."""
+    from app.batch import evaluate_csv_stream
+
+    batch_letters = letters * 3 + [{"id": "rota", "letter": None}] + letters[:5]
+    for columnar in (False, True):
+        expected = evaluate_batch(batch_letters, columnar=columnar)
+        pd.testing.assert_frame_equal(evaluate_batch(batch_letters, columnar=columnar, workers=2), expected)
+
+    input_path = tmp_path / "letters.csv"
+    pd.DataFrame(letters * 2).to_csv(input_path, index=False)
+    evaluate_csv_stream(str(input_path), str(tmp_path / "expected.csv"), chunksize=4)
+    summary = evaluate_csv_stream(str(input_path), str(tmp_path / "workers.csv"), chunksize=4, workers=2)
+    assert summary["rows"] == len(letters) * 2
+    assert (tmp_path / "workers.csv").read_bytes() == (tmp_path / "expected.csv").read_bytes()
@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+from app.llm_extractor import extract_with_fallback
+from benchmarks.letters import generate_letters
+from benchmarks.run import compare
+
+def test_synthetic_letters_are_seeded_and_parseable():
+    letters = generate_letters(200, seed=3)
+    assert letters == generate_letters(200, seed=3)
+    assert letters != generate_letters(200, seed=4)
+    assert max(len(item["letter"]) for item in letters) >= 100_000
+    extracted = [extract_with_fallback(item["letter"]) for item in letters[:50]]
+    assert all(ex.financials.income_monthly > 0 and ex.applicant.age_years >= 18 for ex in extracted)
+    assert len({ex.employment.employment_bussines for ex in extracted}) == 2
+
+def test_compare_flags_throughput_drops_past_threshold():
+    baseline = {"a": {"throughput": 100.0}, "b": {"throughput": 100.0}, "c": {"throughput": 100.0}}
+    results = {"a": {"throughput": 80.0}, "b": {"throughput": 70.0}, "nuevo": {"throughput": 1.0}}
+    assert compare(results, baseline, threshold=0.25) == ["b"]
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+import time
+
+import pytest
+
+from app.cache import ExtractionCache, cache_key, set_cache
+from app.llm_extractor import extract_with_fallback, extract_with_llm
+
+LETTER = open("examples/aprobado.txt", encoding="utf-8").read()
+
+@pytest.fixture
+def fake_openai(fake_provider, tmp_path):
+    """Configura OpenAI con un proveedor falso que cuenta las llamadas y una caché temporal."""
+    cache = ExtractionCache(path=str(tmp_path / "cache.sqlite3"), max_items=2)
+    return cache, fake_provider(cache=cache)
+
+def test_repeated_letter_calls_provider_once(fake_openai):
+    """La misma carta solo paga una llamada al LLM; "bypass" y "refresh" vuelven a llamar."""
+    cache, calls = fake_openai
+    first = extract_with_llm(LETTER)
+    assert extract_with_llm(LETTER) == first
+    assert len(calls) == 1
+
+    extract_with_llm(LETTER, cache_mode="bypass")
+    extract_with_llm(LETTER, cache_mode="refresh")
+    assert len(calls) == 3
+    assert cache.stats()["hits_memory"] == 1
+
+def test_disk_tier_survives_new_process_memory(fake_openai, tmp_path):
+    """Otra instancia (otro worker) sobre el mismo archivo encuentra la extracción en disco."""
+    cache, calls = fake_openai
+    extract_with_llm(LETTER)
+    set_cache(ExtractionCache(path=cache.path))
+    extract_with_llm(LETTER)
+    assert len(calls) == 1
+
+def test_lru_eviction_and_ttl():
+    """El nivel en memoria desaloja por tamaño y por TTL."""
+    cache = ExtractionCache(path=None, max_items=2, ttl=0.05)
+    extracted = extract_with_fallback(LETTER)
+    for key in ("a", "b", "c"):
+        cache.put(key, extracted)
+    assert cache.get("a") is None
+    assert cache.get("c") == extracted
+    time.sleep(0.1)
+    assert cache.get("c") is None
+    assert cache.stats()["evictions"] == 2
+
+def test_key_depends_on_provider_and_model():
+    assert cache_key(LETTER, "openai", "gpt-4o-mini", "1") != cache_key(LETTER, "gemini", "gpt-4o-mini", "1")
+    assert cache_key(LETTER, "openai", "gpt-4o-mini", "1") != cache_key(LETTER, "openai", "gpt-4o", "1")
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.cache import ExtractionCache
+from app.llm_extractor import extract_with_deadline, extract_with_deadline_async, extract_with_fallback
+
+LETTER = open("examples/aprobado.txt", encoding="utf-8").read()
+
+def _from_llm(letter):
+    extracted = extract_with_fallback(letter)
+    return extracted.model_copy(update={"applicant": extracted.applicant.model_copy(update={"full_name": "LLM"})})
+
+@pytest.fixture
+def slow_openai(fake_provider, tmp_path):
+    """OpenAI falso que tarda `delay[0]` segundos, con una caché temporal."""
+    delay = [0.5]
+
+    def fake_call(letter, model_name, api_key):
+        time.sleep(delay[0])
+        return _from_llm(letter)
+
+    async def fake_call_async(letter, model_name, api_key):
+        await asyncio.sleep(delay[0])
+        return _from_llm(letter)
+
+    fake_provider(fake_call, call_async=fake_call_async, cache=ExtractionCache(path=str(tmp_path / "cache.sqlite3")))
+    return delay
+
+def test_slow_provider_is_hedged_and_late_result_cached(slow_openai):
+    """Pasado el plazo se responde con el fallback; la respuesta tardía del LLM queda en la caché."""
+    start = time.perf_counter()
+    extracted, fallback = extract_with_deadline(LETTER, 0.1)
+    assert time.perf_counter() - start < 0.3
+    assert fallback and extracted == extract_with_fallback(LETTER)
+
+    time.sleep(0.6)
+    extracted, fallback = extract_with_deadline(LETTER, 0.1)
+    assert not fallback and extracted.applicant.full_name == "LLM"
+
+    slow_openai[0] = 0.0
+    other = LETTER.replace("Mi nombre es", "Me llamo")
+    extracted, fallback = extract_with_deadline(other, 1.0)
+    assert not fallback and extracted.applicant.full_name == "LLM"
+
+def test_async_decision_marks_hedged_fallback(slow_openai):
+    from app.main import api
+
+    async def run():
+        extracted, fallback = await extract_with_deadline_async(LETTER, 0.1)
+        assert fallback and extracted == extract_with_fallback(LETTER)
+        await asyncio.sleep(0.6)
+        return await extract_with_deadline_async(LETTER, 0.1)
+
+    extracted, fallback = asyncio.run(run())
+    assert not fallback and extracted.applicant.full_name == "LLM"
+
+    other = LETTER.replace("Mi nombre es", "Me llamo")
+    body = TestClient(api).post("/async/decision", json={"letter": other, "deadline_ms": 100}).json()
+    assert body["fallback"] is True
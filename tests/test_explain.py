@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+import pytest
+from fastapi.testclient import TestClient
+
+from app import api as api_module
+from app.batch import read_letters_from_folder
+from app.explain import _generate_fallback_explanation, explain_decision, explanation_cache_info, explanation_signature, prime_explanations
+from app.features import FeatureStore, set_feature_store
+from app.main import api
+from app.registry import get_rules
+
+letters = read_letters_from_folder("examples/")
+client = TestClient(api)
+
+def test_primed_explanations_cover_every_decision():
+    """Tras precalcular las 2^n combinaciones, explicar cualquier decisión es un acierto y da el texto de la plantilla."""
+    plan = get_rules("business_rules.yaml")
+    assert prime_explanations(plan) == 2 ** len(plan.rules)
+    for item in letters:
+        decision = client.post("/decision", json={"letter": item["letter"]}).json()
+        before = explanation_cache_info()
+        response = client.post("/explain", json={"decision": decision})
+        assert response.status_code == 200
+        assert explanation_cache_info()["hits"] == before["hits"] + 1
+        assert explanation_cache_info()["misses"] == before["misses"]
+        assert response.json()["explanation"] == client.post("/explain", json={"letter": item["letter"]}).json()["explanation"]
+
+@pytest.mark.parametrize("prefix", ["", "/async"])
+def test_explain_by_decision_id_skips_extraction(monkeypatch, tmp_path, prefix):
+    """Con el almacén activo, /decision devuelve un id y /explain lo explica sin volver a extraer."""
+    monkeypatch.setenv("FEATURE_STORE", "1")
+    set_feature_store(FeatureStore(str(tmp_path / "features.sqlite3")))
+    try:
+        decision = client.post(f"{prefix}/decision", json={"letter": letters[0]["letter"]}).json()
+        assert decision["decision_id"]
+
+        def no_extraction(*args, **kwargs):
+            raise AssertionError("no debería extraer")
+
+        monkeypatch.setattr(api_module, "extract_with_llm", no_extraction)
+        monkeypatch.setattr(api_module, "extract_with_llm_async", no_extraction)
+        response = client.post(f"{prefix}/explain", json={"decision_id": decision["decision_id"]})
+        assert response.status_code == 200
+        body = response.json()
+        assert body["decision"]["rule_results"] == decision["rule_results"]
+        assert body["explanation"] == explain_decision(api_module.Decision.model_validate(decision))
+        assert client.post(f"{prefix}/explain", json={"decision_id": "no-existe"}).status_code == 404
+    finally:
+        set_feature_store(None)
+
+@pytest.mark.parametrize("body", [{}, {"letter": "x", "decision_id": "y"}])
+def test_explain_requires_exactly_one_source(body):
+    assert client.post("/explain", json=body).status_code == 400
+
+def test_explanation_depends_only_on_signature():
+    decision = api_module.Decision.model_validate(client.post("/decision", json={"letter": letters[0]["letter"]}).json())
+    other = decision.model_copy(update={"risk_score": 0.123, "rationale": []})
+    assert explanation_signature(other) == explanation_signature(decision)
+    assert explain_decision(other) == _generate_fallback_explanation(explanation_signature(decision))
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+import glob
+
+import pytest
+
+from app.llm_extractor import extract_with_fallback
+from benchmarks.bench_fallback import reference_extract
+from benchmarks.letters import generate_letters
+
+EXAMPLES = sorted(glob.glob("examples/*.txt"))
+
+@pytest.mark.parametrize("path", EXAMPLES)
+def test_compiled_fallback_matches_reference_on_examples(path):
+    """El extractor compilado da la misma extracción que la versión original congelada."""
+    letter = open(path, encoding="utf-8").read()
+    assert extract_with_fallback(letter) == reference_extract(letter)
+
+def test_compiled_fallback_matches_reference_on_synthetic_letters():
+    """Mismo resultado sobre un corpus sintético con semilla (frases, montos y largos variados)."""
+    letters = [item["letter"] for item in generate_letters(1000, seed=7, max_chars=20_000)]
+    mismatches = [i for i, letter in enumerate(letters) if extract_with_fallback(letter) != reference_extract(letter)]
+    assert mismatches == []
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from app.batch import evaluate_batch, read_letters_from_folder
+from app.features import FeatureStore, set_feature_store
+from app.llm_extractor import extract_with_llm
+from app.registry import get_rules
+from app.writers import read_results
+
+letters = read_letters_from_folder("examples/")
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    monkeypatch.setenv("FEATURE_STORE", "1")
+    store = FeatureStore(str(tmp_path / "features.sqlite3"))
+    set_feature_store(store)
+    yield store
+    set_feature_store(None)
+
+def _new_rules(tmp_path) -> str:
+    text = open("business_rules.yaml", encoding="utf-8").read()
+    path = tmp_path / "new_rules.yaml"
+    path.write_text(text.replace('min_credit_rating: "Buena"', 'min_credit_rating: "Mala"'), encoding="utf-8")
+    return str(path)
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_rescore_matches_batch_without_extracting(store, tmp_path, monkeypatch, columnar):
+    """Las decisiones sobre lo guardado coinciden con un lote completo, y el diff cuenta los cambios."""
+    before = evaluate_batch(letters, columnar=columnar)
+    assert store.get(letters[0]["id"]) == extract_with_llm(letters[0]["letter"])
+
+    new_rules = _new_rules(tmp_path)
+    output = tmp_path / "rescored.ndjson"
+    summary = store.rescore(get_rules(new_rules), new_rules, diff=True, output_path=str(output), chunksize=2)
+    monkeypatch.setenv("FEATURE_STORE", "0")
+    after = evaluate_batch(letters, rules_path=new_rules)
+
+    assert summary["rows"] == len(letters)
+    assert summary["approved"] == int(after["approved"].sum())
+    result = read_results(str(output)).set_index("id").loc[after["id"]]
+    assert result["approved"].tolist() == after["approved"].tolist()
+    assert [", ".join(rules) for rules in result["failed_rules"]] == after["failed_rules"].tolist()
+
+    diff = summary["diff"]
+    changed = before["approved"] != after["approved"]
+    assert diff["compared"] == len(letters)
+    assert diff["rejected_to_approved"] == int((~before["approved"] & after["approved"]).sum()) > 0
+    assert diff["approved_to_rejected"] == int((before["approved"] & ~after["approved"]).sum())
+    assert diff["failed_rules_changed"] == int((before["failed_rules"] != after["failed_rules"]).sum())
+    assert sorted(c["id"] for c in diff["changes"]) == sorted(before.loc[changed, "id"])
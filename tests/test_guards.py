@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+
+import pytest
+
+from app import metrics
+from app.guards import CircuitBreaker, ProviderGuard, RateLimiter, get_guard, guards_status, set_guard
+from app.llm_extractor import extract_with_fallback, extract_with_llm
+
+LETTER = open("examples/aprobado.txt", encoding="utf-8").read()
+
+@pytest.fixture
+def providers_env(fake_provider):
+    """Gemini y OpenAI falsos (Gemini falla mientras `down[0]`), sin caché; registran las cartas recibidas."""
+    down = [True]
+
+    def gemini(letter, model_name, api_key):
+        if down[0]:
+            raise ConnectionError("503")
+        return extract_with_fallback(letter)
+
+    return {"gemini": fake_provider(gemini, provider="gemini"), "openai": fake_provider()}, down
+
+def test_open_breaker_routes_to_other_provider_then_recovers(providers_env):
+    """Tras N errores el breaker se abre: Gemini deja de recibir llamadas y se usa OpenAI; pasado el cooldown, una prueba lo cierra."""
+    calls, down = providers_env
+    set_guard("gemini", ProviderGuard("gemini", CircuitBreaker(failures=3, window=60, cooldown=0.2), RateLimiter()))
+    for _ in range(10):
+        extract_with_llm(LETTER)
+    assert len(calls["gemini"]) == 3
+    assert len(calls["openai"]) == 7  # las 3 primeras caen al fallback por regex; las 7 siguientes van directo a OpenAI
+    assert guards_status()["gemini"]["state"] == "open"
+    assert metrics.LLM_BREAKER_STATE.value(provider="gemini") == 2
+
+    time.sleep(0.25)
+    down[0] = False
+    extract_with_llm(LETTER)
+    extract_with_llm(LETTER)
+    assert len(calls["gemini"]) == 5
+    assert guards_status()["gemini"]["state"] == "closed"
+
+def test_both_breakers_open_go_straight_to_regex(providers_env, monkeypatch):
+    calls, _ = providers_env
+    monkeypatch.delenv("OPENAI_API_KEY")
+    set_guard("gemini", ProviderGuard("gemini", CircuitBreaker(failures=1, cooldown=60), RateLimiter()))
+    fallbacks = metrics.LLM_FALLBACKS.value(provider="gemini")
+    for _ in range(5):
+        assert extract_with_llm(LETTER) == extract_with_fallback(LETTER)
+    assert len(calls["gemini"]) == 1
+    assert metrics.LLM_FALLBACKS.value(provider="gemini") == fallbacks + 1
+
+def test_limiter_caps_requests_per_second_and_reports_queue(providers_env, monkeypatch):
+    """Con 20 solicitudes/s y ráfaga de 20, 40 cartas desde 8 hilos tardan ~1 s; las que exceden la espera van al fallback."""
+    calls, _ = providers_env
+    monkeypatch.delenv("GOOGLE_API_KEY")
+    guard = ProviderGuard("openai", CircuitBreaker(), RateLimiter(rps=20, tpm=0, max_wait=5))
+    set_guard("openai", guard)
+    depths = []
+
+    def sample():
+        while not done.is_set():
+            depths.append(guard.limiter.waiting)
+            time.sleep(0.01)
+
+    done = threading.Event()
+    watcher = threading.Thread(target=sample)
+    watcher.start()
+    start = time.perf_counter()
+    threads = [threading.Thread(target=lambda: [extract_with_llm(LETTER) for _ in range(5)]) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    done.set()
+    watcher.join()
+    assert len(calls["openai"]) == 40
+    assert 0.9 < elapsed < 3
+    assert max(depths) > 0 and guard.limiter.waiting == 0
+
+    set_guard("openai", ProviderGuard("openai", CircuitBreaker(), RateLimiter(rps=1, tpm=0, max_wait=0.1)))
+    extract_with_llm(LETTER)
+    assert extract_with_llm(LETTER) == extract_with_fallback(LETTER)
+    assert len(calls["openai"]) == 41
+    assert get_guard("openai").breaker.state == "closed"
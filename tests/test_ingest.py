@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+import tarfile
+import zipfile
+
+import pytest
+
+from app.ingest import iter_letters, read_ahead
+
+def _write_tree(root):
+    (root / "sub" / "inner").mkdir(parents=True)
+    files = {"a.txt": "carta a", "sub/b.txt": "carta b", "sub/inner/c.txt": "carta c",
+             "sub/notas.md": "no es carta", "grande.txt": "x" * 100}
+    for name, text in files.items():
+        (root / name).write_text(text, encoding="utf-8")
+    return files
+
+def test_folder_and_archives_yield_same_letters(tmp_path):
+    """Carpeta recursiva, tar.gz y zip devuelven las mismas cartas, omitiendo las que superan el límite."""
+    root = tmp_path / "cartas"
+    files = _write_tree(root)
+    expected = [{"id": "a.txt", "letter": "carta a"}, {"id": "sub/b.txt", "letter": "carta b"},
+                {"id": "sub/inner/c.txt", "letter": "carta c"}]
+    assert list(iter_letters(str(root), limit=50)) == expected
+    assert list(iter_letters(str(root), limit=50, recursive=False)) == expected[:1]
+
+    with tarfile.open(tmp_path / "cartas.tgz", "w:gz") as tar:
+        for name in files:
+            tar.add(root / name, arcname=name)
+    with zipfile.ZipFile(tmp_path / "cartas.zip", "w") as archive:
+        for name in files:
+            archive.write(root / name, arcname=name)
+    for archive_path in ("cartas.tgz", "cartas.zip"):
+        letters = list(iter_letters(str(tmp_path / archive_path), limit=50, prefetch=2))
+        assert sorted(letters, key=lambda item: item["id"]) == expected
+
+def test_read_ahead_keeps_order_and_propagates_errors():
+    def items():
+        yield from range(100)
+        raise ValueError("archivo dañado")
+
+    consumed = []
+    with pytest.raises(ValueError, match="archivo dañado"):
+        for item in read_ahead(items(), size=4):
+            consumed.append(item)
+    assert consumed == list(range(100))
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+import time
+
+import pandas as pd
+import pytest
+
+import app.batch as batch_module
+from app.batch import evaluate_batch, read_letters_from_folder
+from app.jobs import JobManager
+from app.llm_extractor import extract_with_fallback
+
+letters = read_letters_from_folder("examples/")
+
+def _wait(manager, job_id, statuses=("completed", "failed", "cancelled"), timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = manager.status(job_id)
+        if status["status"] in statuses:
+            return status
+        time.sleep(0.02)
+    raise AssertionError(f"El trabajo no terminó: {manager.status(job_id)}")
+
+@pytest.fixture
+def slow_extract(monkeypatch):
+    """Extracción local con un poco de latencia, para poder cancelar o detener a mitad de camino."""
+    def extract(letter, **kwargs):
+        time.sleep(0.005)
+        return extract_with_fallback(letter)
+    monkeypatch.setattr(batch_module, "extract_with_llm", extract)
+
+def test_job_processes_large_batch_and_pages_results(tmp_path, slow_extract):
+    """Un lote de más de 100 ítems se procesa en segundo plano y sus resultados se leen por páginas."""
+    items = [{"id": f"L{i}", "letter": letters[i % len(letters)]["letter"]} for i in range(250)]
+    manager = JobManager(str(tmp_path / "jobs.sqlite3"), workers=2, block_size=40)
+    manager.start(poll_interval=0.05)
+    try:
+        job_id = manager.submit(items=items, concurrency=4)
+        status = _wait(manager, job_id)
+    finally:
+        manager.stop()
+
+    assert status["status"] == "completed"
+    assert status["done"] == status["total"] == 250
+    rows = manager.results(job_id, offset=0, limit=100) + manager.results(job_id, offset=100, limit=200)
+    expected = evaluate_batch(items)
+    assert [r["id"] for r in rows] == expected["id"].tolist()
+    assert [r["failed_rules"] for r in rows] == expected["failed_rules"].tolist()
+
+def test_job_resumes_after_restart_and_can_be_cancelled(tmp_path, slow_extract):
+    """Un trabajo interrumpido se retoma desde la última fila guardada; uno cancelado deja de avanzar."""
+    path = str(tmp_path / "jobs.sqlite3")
+    csv_path = tmp_path / "letters.csv"
+    pd.DataFrame([letters[i % len(letters)] for i in range(300)]).to_csv(csv_path, index=False)
+
+    manager = JobManager(path, workers=1, block_size=20, csv_dir=str(tmp_path))
+    manager.start(poll_interval=0.05)
+    job_id = manager.submit(csv_path=str(csv_path))
+    _wait(manager, job_id, statuses=("running",))
+    while manager.status(job_id)["done"] < 40:
+        time.sleep(0.01)
+    manager.stop()
+    interrupted = manager.status(job_id)["done"]
+    assert 40 <= interrupted < 300
+
+    restarted = JobManager(path, workers=1, block_size=20, csv_dir=str(tmp_path))
+    restarted.start(poll_interval=0.05)
+    try:
+        status = _wait(restarted, job_id)
+        assert status["status"] == "completed" and status["done"] == 300
+        assert [r["id"] for r in restarted.results(job_id, limit=1000)] == [letters[i % len(letters)]["id"] for i in range(300)]
+
+        other = restarted.submit(csv_path=str(csv_path))
+        _wait(restarted, other, statuses=("running",))
+        assert restarted.cancel(other)["status"] == "cancelled"
+        time.sleep(0.2)
+        done = restarted.status(other)["done"]
+        time.sleep(0.2)
+        assert restarted.status(other)["done"] == done < 300
+    finally:
+        restarted.stop()
+
+def test_csv_outside_allowed_dir_is_rejected(tmp_path):
+    manager = JobManager(str(tmp_path / "jobs.sqlite3"), csv_dir=str(tmp_path / "data"))
+    with pytest.raises(ValueError):
+        manager.submit(csv_path="/etc/passwd")
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+import re
+
+from fastapi.testclient import TestClient
+
+from app import metrics
+from app.llm_extractor import extract_with_llm
+from app.main import api
+
+LETTER = open("examples/aprobado.txt", encoding="utf-8").read()
+
+def _sample(text: str, series: str) -> float:
+    match = re.search(rf"^{re.escape(series)} (\S+)$", text, re.MULTILINE)
+    return float(match.group(1)) if match else 0.0
+
+def test_metrics_endpoint_reports_stages_routes_and_batches(monkeypatch):
+    monkeypatch.delenv("GOOGLE_API_KEY", raising=False)
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    client = TestClient(api)
+    before = client.get("/metrics").text
+
+    assert client.post("/decision", json={"letter": LETTER}).status_code == 200
+    assert client.post("/batch_decision", json={"items": [{"id": "1", "letter": LETTER}] * 3}).status_code == 200
+    response = client.get("/metrics")
+    after = response.text
+
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    for series, delta in [('credit_extraction_seconds_count{provider="regex"}', 4),
+                          ('credit_stage_seconds_count{stage="rules"}', 4),
+                          ('credit_stage_seconds_count{stage="serialization"}', 2),
+                          ('credit_http_request_seconds_count{method="POST",route="/decision"}', 1),
+                          ('credit_batch_size_bucket{endpoint="/batch_decision",le="5"}', 1)]:
+        assert _sample(after, series) - _sample(before, series) == delta, series
+    # La solicitud a /metrics en curso es la única en vuelo.
+    assert _sample(after, "credit_http_requests_in_flight") == 1
+
+def test_llm_error_counts_a_fallback(fake_provider):
+    def failing_call(letter, model_name, api_key):
+        raise ConnectionError("proveedor caído")
+
+    fake_provider(failing_call)
+
+    fallbacks = metrics.LLM_FALLBACKS.value(provider="openai")
+    failures = metrics.EXTRACTION_SECONDS.count(provider="openai")
+    extracted = extract_with_llm(LETTER)
+    assert extracted.applicant.full_name == "Juan Pérez"
+    assert metrics.LLM_FALLBACKS.value(provider="openai") == fallbacks + 1
+    assert metrics.EXTRACTION_SECONDS.count(provider="openai") == failures + 1
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+import asyncio
+
+from app import providers
+from app.llm_extractor import extract_many_with_llm, extract_with_llm, extract_with_llm_async, pack_letters
+
+LETTER = open("examples/aprobado.txt", encoding="utf-8").read()
+
+def test_openai_client_is_reused_across_calls(mock_openai):
+    """Varias cartas seguidas usan el mismo cliente y la misma conexión keep-alive."""
+    for _ in range(3):
+        extracted = extract_with_llm(LETTER)
+        assert extracted.applicant.full_name == "Juan Pérez"
+    assert mock_openai.requests == 3
+    assert mock_openai.connections == 1
+    assert providers.get_openai_client("test-key") is providers.get_openai_client("test-key")
+    assert providers.get_openai_client("other-key") is not providers.get_openai_client("test-key")
+
+def test_async_client_is_reused_within_a_loop(mock_openai):
+    async def run():
+        await asyncio.gather(*(extract_with_llm_async(LETTER) for _ in range(4)))
+        first = providers.get_async_openai_client("test-key")
+        await extract_with_llm_async(LETTER)
+        assert providers.get_async_openai_client("test-key") is first
+        await providers.aclose_clients()
+
+    # Cada `asyncio.run` tiene su propio loop y, por lo tanto, su propio cliente.
+    asyncio.run(run())
+    asyncio.run(run())
+    assert mock_openai.requests == 10
+
+def test_packed_extraction_reextracts_only_missing_letters(mock_openai):
+    """Una solicitud por grupo; solo las cartas sin elemento válido se vuelven a pedir una por una."""
+    import json
+    import re
+    from benchmarks.mock_provider import EXTRACTION
+
+    def respond(body):
+        ids = re.findall(r'<letter id="(\d+)">', body["messages"][0]["content"])
+        if not ids:
+            return json.dumps(EXTRACTION)
+        # Falta la última carta y la segunda trae un tipo inválido.
+        elements = [{"id": i, **EXTRACTION} for i in ids[:-1]]
+        elements[1]["applicant"] = {"full_name": "X", "age_years": "no sé"}
+        return "```json\n" + json.dumps(elements) + "\n```"
+
+    mock_openai.respond = respond
+    letters = [f"{LETTER}\n(copia {i})" for i in range(5)]
+    extracts = extract_many_with_llm(letters)
+
+    assert [ex.raw_letter for ex in extracts] == letters
+    assert all(ex.applicant.full_name == "Juan Pérez" for ex in extracts)
+    assert mock_openai.requests == 1 + 2
+
+def test_pack_size_adapts_to_token_budget():
+    short = [{"id": str(i), "letter": "carta corta"} for i in range(30)]
+    long = [{"id": str(i), "letter": LETTER * 4} for i in range(30)]
+    short_groups = list(pack_letters(short, token_budget=8000, max_letters=50))
+    long_groups = list(pack_letters(long, token_budget=8000, max_letters=50))
+    assert len(short_groups) == 1
+    assert len(long_groups) > 5 and all(len(group) >= 1 for group in long_groups)
+    assert [item for group in long_groups for item in group] == long
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+import os
+import time
+
+from app.llm_extractor import extract_with_llm
+from app.registry import RulesetRegistry
+from app.rules import evaluate
+
+RULES = open("business_rules.yaml", encoding="utf-8").read()
+LETTER = open("examples/aprobado.txt", encoding="utf-8").read()
+
+def _touch(path, content):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+    # Fuerza un mtime distinto aunque el sistema de archivos tenga poca resolución.
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+def test_cached_until_file_changes(tmp_path):
+    """El plan se reutiliza mientras el archivo no cambie y se recarga cuando cambia."""
+    path = tmp_path / "rules.yaml"
+    _touch(path, RULES)
+    registry = RulesetRegistry()
+
+    first = registry.get(str(path))
+    assert registry.get(str(path)) is first
+
+    _touch(path, RULES.replace("min_age: 21", "min_age: 40"))
+    second = registry.get(str(path))
+    assert second is not first
+    assert second.version != first.version
+    assert evaluate(extract_with_llm(LETTER), second).ruleset_version == second.version
+
+def test_watcher_swaps_plan(tmp_path):
+    """Con el vigilante activo, un cambio en el YAML se aplica sin intervención."""
+    path = tmp_path / "rules.yaml"
+    _touch(path, RULES)
+    registry = RulesetRegistry()
+    registry.preload([str(path)])
+    first = registry.get(str(path))
+    registry.start_watching(interval=0.05)
+    try:
+        _touch(path, RULES.replace("min_age: 21", "min_age: 40"))
+        deadline = time.time() + 5
+        while registry.get(str(path)) is first and time.time() < deadline:
+            time.sleep(0.05)
+        assert registry.get(str(path)).thresholds["min_age"] == 40
+    finally:
+        registry.stop_watching()
@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 import pytest
 from app.llm_extractor import extract_with_llm
-from app.rules import load_rules, evaluate
+from app.rules import load_rules, evaluate, compile_rules
 
 # Contenido de las cartas de prueba (copiado de examples/)
 aprobado_letter_content = """Solicitud de Crédito Personal
@@ -64,3 +64,49 @@ def test_rejected_case():
         "rejections_max"
     ]
     assert set(failed_rule_ids) == set(expected_failed_rule_ids)
+
+def test_declarative_rule_from_yaml():
+    """Una regla nueva declarada solo en YAML (campo/operador/umbral) se evalúa sin cambios de código."""
+    cfg = {
+        "thresholds": {"max_expenses": 500000},
+        "decision": {"logic": "all"},
+        "rules": [
+            {"id": "expenses_max", "desc": "Gastos mensuales ≤ 500.000", "field": "financials.expenses_monthly",
+             "op": "<=", "threshold": "max_expenses"},
+        ],
+    }
+    plan = compile_rules(cfg)
+    extracted_data = extract_with_llm(aprobado_letter_content)
+    extracted_data.financials.expenses_monthly = 800000
+    decision = evaluate(extracted_data, plan)
+
+    assert decision.approved is False
+    assert decision.rule_results[0].value == "800000 <= 500000"
+    assert decision.rationale == ["Gastos mensuales ≤ 500.000"]
+
+@pytest.mark.parametrize("logic", ["all", "any"])
+def test_fast_decide_matches_evaluate(logic):
+    """`decide` da el mismo veredicto que `evaluate` y ordena primero las reglas que más seguido deciden."""
+    import app.rules as rules_module
+    from app.batch import extract_all
+    from app.rules import decide, rule_stats
+    from benchmarks.letters import generate_letters
+
+    plan = load_rules("business_rules.yaml")
+    cfg = dict(plan.config)
+    cfg["decision"] = {"logic": logic}
+    plan = compile_rules(cfg)
+    extracts = [ex for _, ex, _ in extract_all(generate_letters(300, seed=1, max_chars=5_000))]
+    for ex in extracts:
+        fast, full = decide(ex, plan), evaluate(ex, plan)
+        assert fast.approved == full.approved
+        if fast.decisive_rule is not None:
+            passed = {r.id: r.passed for r in full.rule_results}
+            assert passed[fast.decisive_rule] == (logic == "any")
+        assert fast.rule_results == full.rule_results
+
+    stats = rule_stats(plan)
+    assert stats.samples == -(-len(extracts) // rules_module.DECIDE_SAMPLE_EVERY)
+    # La primera regla del orden es una de las que más seguido deciden.
+    snapshot = stats.snapshot()
+    assert snapshot[0]["decisive_rate"] == max(rule["decisive_rate"] for rule in snapshot)
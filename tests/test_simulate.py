@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+from app.batch import extract_all, read_letters_from_folder
+from app.rules import compile_rules, evaluate, load_rules
+from app.simulate import parse_grid, population_from_extracts, simulate
+
+plan = load_rules("business_rules.yaml")
+extracts = [ex for _, ex, _ in extract_all(read_letters_from_folder("examples/"))]
+
+def test_simulation_matches_recompiled_rulesets():
+    """Cada configuración de la grilla da lo mismo que recompilar el YAML con esos umbrales y evaluar carta por carta."""
+    grid = {"min_income": [900_000, 1_600_000, 2_000_000], "max_amount_income_ratio": [0.2, 0.3, 2.0],
+            "min_credit_rating": ["Mala", "Buena"], "min_experience_months": [0, 12, 36]}
+    result = simulate(population_from_extracts(extracts, plan), plan, grid, block_cells=50)
+    assert len(result) == 3 * 3 * 2 * 3
+
+    for _, row in result.iterrows():
+        cfg = dict(plan.config)
+        cfg["thresholds"] = {**plan.thresholds, **{key: row[key] for key in grid}}
+        decisions = [evaluate(ex, compile_rules(cfg)) for ex in extracts]
+        assert row["approved"] == sum(d.approved for d in decisions)
+        risks = [round(d.risk_score, 3) for d in decisions]
+        for level in {1 - i / len(plan.rules) for i in range(len(plan.rules) + 1)}:
+            assert row[f"risk={level:.3f}"] == risks.count(round(level, 3))
+        assert row["risk_mean"] == pytest.approx(np.mean([d.risk_score for d in decisions]))
+        for r, rule in enumerate(plan.rules):
+            assert row[f"failed.{rule.id}"] == sum(not d.rule_results[r].passed for d in decisions)
+    assert result["approved"].nunique() > 1
+
+def test_grid_parsing_and_validation():
+    assert parse_grid(["min_income=1000000:1200000:100000", "min_credit_rating=Regular,Buena"]) == {
+        "min_income": [1000000, 1100000, 1200000], "min_credit_rating": ["Regular", "Buena"]}
+    assert parse_grid(["max_amount_income_ratio=0.3:0.35:0.05"]) == {"max_amount_income_ratio": [0.3, 0.35]}
+    columns = population_from_extracts(extracts, plan)
+    with pytest.raises(ValueError):
+        simulate(columns, plan, {"min_salary": [1]})
+    with pytest.raises(ValueError):
+        simulate(columns, plan, {"allow_mora_last_6m": [True]})
+    with pytest.raises(ValueError):
+        simulate(columns, plan, {"min_credit_rating": ["Excelentísima"]})
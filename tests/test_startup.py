@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+from benchmarks.bench_startup import HEAVY_MODULES, TARGETS, forbidden_loaded, parse_importtime, run_target
+
+def test_cli_does_not_import_heavy_dependencies():
+    entries = run_target(TARGETS["cli.letter"])
+    assert {"app.llm_extractor", "app.rules"} <= {name for name, *_ in entries}
+    assert forbidden_loaded(entries, HEAVY_MODULES + ("fastapi", "uvicorn")) == []
+
+def test_parse_importtime_reads_levels_and_times():
+    stderr = ("import time: self [us] | cumulative | imported package\n"
+              "import time:       120 |        300 |   json.decoder\n"
+              "import time:        80 |        380 | json\n")
+    assert parse_importtime(stderr) == [("json.decoder", 1, 120, 300), ("json", 0, 80, 380)]
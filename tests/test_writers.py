@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+import json
+
+import pandas as pd
+import pytest
+
+import app.batch as batch_module
+from app.batch import evaluate_batch, evaluate_csv_stream, evaluate_to_file, read_letters_from_folder
+from app.writers import read_results
+
+letters = read_letters_from_folder("examples/")
+
+@pytest.mark.parametrize("extension", ["ndjson", "parquet", "arrow"])
+def test_typed_formats_keep_types_and_rule_lists(tmp_path, extension):
+    """Los formatos tipados guardan `failed_rules` como lista y el detalle del parse_error aparte."""
+    items = letters[:5] + [{"id": "rota", "letter": None}] + letters[5:]
+    expected = evaluate_batch(items)
+    for columnar in (False, True):
+        path = tmp_path / f"decisions_{columnar}.{extension}"
+        summary = evaluate_to_file(items, str(path), chunksize=4, columnar=columnar)
+        result = read_results(str(path))
+        assert summary["rows"] == len(items)
+        assert result["id"].tolist() == expected["id"].tolist()
+        assert result["approved"].tolist() == expected["approved"].tolist()
+        assert [", ".join(rules) for rules in result["failed_rules"].iloc[:5]] == expected["failed_rules"].iloc[:5].tolist()
+        assert list(result.loc[5, "failed_rules"]) == ["parse_error"]
+        assert result.loc[5, "error"] == expected.loc[5, "failed_rules"].removeprefix("parse_error: ")
+        assert result["income"].iloc[:5].tolist() == expected["income"].iloc[:5].astype(int).tolist()
+
+@pytest.mark.parametrize("extension", ["ndjson", "arrow"])
+def test_appendable_formats_resume_after_crash(monkeypatch, tmp_path, extension):
+    """NDJSON y Arrow se reanudan desde el checkpoint igual que el CSV: mismo archivo que sin cortes."""
+    input_path = tmp_path / "letters.csv"
+    pd.DataFrame(letters * 2).to_csv(input_path, index=False)
+    expected_path = tmp_path / f"expected.{extension}"
+    evaluate_csv_stream(str(input_path), str(expected_path), chunksize=4)
+
+    calls = []
+    real_extract = batch_module.extract_with_llm
+
+    def crashing_extract(letter, **kwargs):
+        calls.append(letter)
+        if len(calls) == 10:
+            raise KeyboardInterrupt
+        return real_extract(letter, **kwargs)
+
+    output_path = tmp_path / f"decisions.{extension}"
+    monkeypatch.setattr(batch_module, "extract_with_llm", crashing_extract)
+    with pytest.raises(KeyboardInterrupt):
+        evaluate_csv_stream(str(input_path), str(output_path), chunksize=4)
+    assert json.loads((tmp_path / f"decisions.{extension}.checkpoint").read_text())["rows_done"] == 8
+
+    monkeypatch.setattr(batch_module, "extract_with_llm", real_extract)
+    summary = evaluate_csv_stream(str(input_path), str(output_path), chunksize=4)
+    assert summary["resumed_from"] == 8
+    assert output_path.read_bytes() == expected_path.read_bytes()
+    assert len(read_results(str(output_path))) == len(letters) * 2
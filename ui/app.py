@@ -85,15 +85,35 @@ with tab2:
                     st.warning(f"No se encontraron archivos .txt en la carpeta '{examples_folder}'.")
                 else:
                     st.info(f"Enviando {len(letters_data)} cartas a la API para procesamiento por lotes...")
-                    batch_response = requests.post(f"{API_BASE_URL}/batch_decision", json={"items": letters_data,
-                    "rules_path": "business_rules.yaml"})
-                    batch_response.raise_for_status()
-                    batch_result = batch_response.json()
+                    # /batch_decision/stream devuelve una fila NDJSON por carta apenas se decide:
+                    # la tabla se va llenando sin esperar a la carta más lenta.
+                    rows = []
+                    st.subheader("Resultados del Lote")
+                    progress = st.progress(0.0)
+                    table = st.empty()
+                    with requests.post(f"{API_BASE_URL}/batch_decision/stream", params={"ordered": "false"},
+                                       json={"items": letters_data, "rules_path": "business_rules.yaml"},
+                                       stream=True) as batch_response:
+                        batch_response.raise_for_status()
+                        for line in batch_response.iter_lines():
+                            if not line:
+                                continue
+                            row = json.loads(line)
+                            rows.append({
+                                "id": row["id"],
+                                "approved": row["approved"],
+                                "risk_score": row["risk_score"],
+                                "failed_rules": ", ".join(row["failed_rules"]),
+                                "error": row.get("error"),
+                            })
+                            progress.progress(len(rows) / len(letters_data))
+                            table.dataframe(pd.DataFrame(rows))
 
-                    if batch_result and "rows" in batch_result:
-                        df_results = pd.DataFrame(batch_result["rows"])
-                        st.subheader("Resultados del Lote")
-                        st.dataframe(df_results)
+                    if rows:
+                        # Las filas llegan en el orden en que terminan; se muestran y exportan en el orden de envío.
+                        order = {item["id"]: i for i, item in enumerate(letters_data)}
+                        df_results = pd.DataFrame(sorted(rows, key=lambda r: order.get(r["id"], len(order))))
+                        table.dataframe(df_results)
 
                         csv_output = df_results.to_csv(index=False).encode('utf-8')
                         st.download_button(